@@ -0,0 +1,49 @@
+"""user_role cascade
+
+Revision ID: 5b1e0c7d9a42
+Revises: 0038c75dbe51
+Create Date: 2026-10-18 10:12:31.402187
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5b1e0c7d9a42"
+down_revision: Union[str, None] = "0038c75dbe51"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_constraint("user_role_user_id_fkey", "user_role", type_="foreignkey")
+    op.drop_constraint("user_role_role_id_fkey", "user_role", type_="foreignkey")
+    op.create_foreign_key(
+        "user_role_user_id_fkey",
+        "user_role",
+        "users",
+        ["user_id"],
+        ["id"],
+        ondelete="CASCADE",
+    )
+    op.create_foreign_key(
+        "user_role_role_id_fkey",
+        "user_role",
+        "roles",
+        ["role_id"],
+        ["id"],
+        ondelete="CASCADE",
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("user_role_user_id_fkey", "user_role", type_="foreignkey")
+    op.drop_constraint("user_role_role_id_fkey", "user_role", type_="foreignkey")
+    op.create_foreign_key(
+        "user_role_user_id_fkey", "user_role", "users", ["user_id"], ["id"]
+    )
+    op.create_foreign_key(
+        "user_role_role_id_fkey", "user_role", "roles", ["role_id"], ["id"]
+    )
@@ -0,0 +1,48 @@
+"""keyset pagination indexes
+
+Revision ID: 9c4f2a6e1d83
+Revises: 5b1e0c7d9a42
+Create Date: 2026-10-18 11:40:05.913264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9c4f2a6e1d83"
+down_revision: Union[str, None] = "5b1e0c7d9a42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Ключ курсора не может быть NULL, иначе строка выпадет из выдачи.
+    op.execute(
+        sa.text("UPDATE users SET created_at = now() WHERE created_at IS NULL")
+    )
+    op.execute(
+        sa.text(
+            "UPDATE login_history SET login_datetime = now() "
+            "WHERE login_datetime IS NULL"
+        )
+    )
+    op.alter_column("users", "created_at", nullable=False)
+    op.alter_column("login_history", "login_datetime", nullable=False)
+    op.create_index("ix_users_created_at_id", "users", ["created_at", "id"])
+    op.create_index(
+        "ix_login_history_user_id_login_datetime_id",
+        "login_history",
+        ["user_id", "login_datetime", "id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_login_history_user_id_login_datetime_id", table_name="login_history"
+    )
+    op.drop_index("ix_users_created_at_id", table_name="users")
+    op.alter_column("login_history", "login_datetime", nullable=True)
+    op.alter_column("users", "created_at", nullable=True)
@@ -0,0 +1,39 @@
+"""role bits
+
+Revision ID: a4d8c1f7e235
+Revises: e27d5b8f3a10
+Create Date: 2026-10-18 17:52:09.318274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a4d8c1f7e235"
+down_revision: Union[str, None] = "e27d5b8f3a10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        sa.schema.CreateSequence(sa.Sequence("roles_bit_seq", start=0, minvalue=0))
+    )
+    op.add_column("roles", sa.Column("bit", sa.Integer(), nullable=True))
+    op.execute(sa.text("UPDATE roles SET bit = nextval('roles_bit_seq')"))
+    op.alter_column(
+        "roles",
+        "bit",
+        nullable=False,
+        server_default=sa.text("nextval('roles_bit_seq')"),
+    )
+    op.create_unique_constraint("roles_bit_key", "roles", ["bit"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("roles_bit_key", "roles", type_="unique")
+    op.drop_column("roles", "bit")
+    op.execute(sa.schema.DropSequence(sa.Sequence("roles_bit_seq")))
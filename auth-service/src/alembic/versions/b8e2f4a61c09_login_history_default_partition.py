@@ -0,0 +1,36 @@
+"""login_history default partition
+
+Revision ID: b8e2f4a61c09
+Revises: f3a9d2c6b871
+Create Date: 2026-10-18 19:41:26.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from db import partitions
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b8e2f4a61c09"
+down_revision: Union[str, None] = "f3a9d2c6b871"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Входы за месяц без партиции (ротация отстала) не теряются, а ждут
+    # переноса в DEFAULT, см. db.partitions.
+    op.execute(sa.text(partitions.create_default_partition_sql()))
+
+
+def downgrade() -> None:
+    op.execute(
+        sa.text(
+            f"ALTER TABLE {partitions.TABLE} "
+            f"DETACH PARTITION {partitions.DEFAULT_PARTITION}"
+        )
+    )
+    op.drop_table(partitions.DEFAULT_PARTITION)
@@ -0,0 +1,30 @@
+"""drop users.refresh_token
+
+Revision ID: c61f3b8e04d7
+Revises: a4d8c1f7e235
+Create Date: 2026-10-18 18:21:44.905117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c61f3b8e04d7"
+down_revision: Union[str, None] = "a4d8c1f7e235"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Refresh-токены хранятся в Redis, см. services.refresh_tokens.
+    op.drop_column("users", "refresh_token")
+
+
+def downgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column("refresh_token", sa.String(length=1000), nullable=True),
+    )
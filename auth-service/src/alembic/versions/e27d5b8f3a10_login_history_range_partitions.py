@@ -0,0 +1,109 @@
+"""login_history range partitions
+
+Revision ID: e27d5b8f3a10
+Revises: 9c4f2a6e1d83
+Create Date: 2026-10-18 13:05:47.120938
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from core.config import settings
+from db import partitions
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e27d5b8f3a10"
+down_revision: Union[str, None] = "9c4f2a6e1d83"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX = "ix_login_history_user_id_login_datetime_id"
+
+
+def replace_table(partition_by: str, primary_key: list[str], *columns) -> None:
+    """
+    Переименовывает текущую login_history и создает на ее месте пустую
+    таблицу с новой схемой партиционирования.
+    """
+    op.drop_index(INDEX, table_name="login_history")
+    op.rename_table("login_history", "login_history_old")
+    op.execute(
+        sa.text(
+            "ALTER TABLE login_history_old "
+            "RENAME CONSTRAINT login_history_pkey TO login_history_old_pkey"
+        )
+    )
+    op.create_table(
+        "login_history",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("user_id", sa.UUID(), nullable=True),
+        sa.Column("login_datetime", sa.DateTime(), nullable=False),
+        *columns,
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint(*primary_key),
+        postgresql_partition_by=partition_by,
+    )
+
+
+def copy_and_drop_old(columns: str, values: str) -> None:
+    op.execute(
+        sa.text(
+            f"INSERT INTO login_history ({columns}) "
+            f"SELECT {values} FROM login_history_old"
+        )
+    )
+    op.drop_table("login_history_old")
+    op.create_index(INDEX, "login_history", ["user_id", "login_datetime", "id"])
+
+
+def upgrade() -> None:
+    replace_table("RANGE (login_datetime)", ["id", "login_datetime"])
+    # Партиции на весь период имеющейся истории и на несколько месяцев вперед,
+    # дальше их создает и удаляет db.partitions.
+    first, last = (
+        op.get_bind()
+        .execute(
+            sa.text(
+                "SELECT min(login_datetime), max(login_datetime) "
+                "FROM login_history_old"
+            )
+        )
+        .one()
+    )
+    today = datetime.now().date()
+    ahead = partitions.add_months(
+        partitions.month_start(today), settings.login_history_partitions_ahead
+    )
+    first = first.date() if first else today
+    last = max(last.date(), ahead) if last else ahead
+    for month in partitions.months_between(first, last):
+        op.execute(sa.text(partitions.create_partition_sql(month)))
+    copy_and_drop_old("id, user_id, login_datetime", "id, user_id, login_datetime")
+
+
+def downgrade() -> None:
+    replace_table(
+        "LIST (random_tag)",
+        ["id", "random_tag"],
+        sa.Column("random_tag", sa.String(length=50), nullable=False),
+    )
+    op.execute(
+        sa.text(
+            "CREATE TABLE login_history_1 PARTITION OF login_history "
+            "FOR VALUES IN ('left')"
+        )
+    )
+    op.execute(
+        sa.text(
+            "CREATE TABLE login_history_2 PARTITION OF login_history "
+            "FOR VALUES IN ('right')"
+        )
+    )
+    copy_and_drop_old(
+        "id, user_id, login_datetime, random_tag",
+        "id, user_id, login_datetime, 'left'",
+    )
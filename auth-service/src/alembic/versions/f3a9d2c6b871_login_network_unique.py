@@ -0,0 +1,38 @@
+"""unique login_network (user_id, network)
+
+Revision ID: f3a9d2c6b871
+Revises: c61f3b8e04d7
+Create Date: 2026-10-18 19:02:13.408527
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f3a9d2c6b871"
+down_revision: Union[str, None] = "c61f3b8e04d7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Привязка сети создается upsert'ом по этой паре, дубли от прежних
+    # гонок удаляются.
+    op.execute(
+        """
+        DELETE FROM login_network a
+        USING login_network b
+        WHERE a.user_id = b.user_id
+          AND a.network = b.network
+          AND a.id > b.id
+        """
+    )
+    op.create_unique_constraint(
+        "_user_network_uc", "login_network", ["user_id", "network"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("_user_network_uc", "login_network", type_="unique")
@@ -1,39 +1,42 @@
-import aiohttp
-import random
-import string
+import asyncio
 
 from http import HTTPStatus
-from fastapi import Depends, APIRouter, HTTPException, Request
-from fastapi_limiter.depends import RateLimiter
+from fastapi import Depends, APIRouter, HTTPException, Request, Response
 from async_fastapi_jwt_auth import AuthJWT
-from async_fastapi_jwt_auth.auth_jwt import AuthJWTBearer
-from datetime import datetime
-from opentelemetry import trace
-from urllib.parse import urlencode
 
 from core.config import settings
-from core.check_auth import check_roles, CustomError
+from core.check_auth import (
+    CustomError,
+    check_roles,
+    introspect_tokens,
+    require_service,
+    token_uuid,
+)
+from core.keys import KeyRingAuthJWTBearer, get_keyring
 from schemas.auth import (
     Login,
     LoginResponse,
-    AccessToken,
     AuthURL,
     AuthToken,
     Success,
     CheckRoles,
-    YandexResponse,
+    CheckAuthBatch,
+    CheckAuthBatchResponse,
+    RevokedTokens,
+    JWKS,
 )
-from schemas.login_history import LoginHistoryCreateSchema
 from schemas.users import UserRolesSchema
+from services import oauth
 from services.auth import AuthService, get_auth_service
 from services.cache import CacheServise, get_cache_service
-from services.users import UsersService, get_users_service
 from services.login_history import LoginHistoryService, get_login_history_service
-from schemas.users import UserCreateSchema
+from services.refresh_tokens import RefreshTokenStore, get_refresh_token_store
+from services.rate_limit import RateLimit, client_ip, principal
+from services.login_attempts import LoginAttempts, get_login_attempts
 
 
 router = APIRouter()
-auth_dep = AuthJWTBearer()
+auth_dep = KeyRingAuthJWTBearer()
 
 
 @AuthJWT.load_config
@@ -41,127 +44,124 @@ def get_config():
     return settings
 
 
-@router.post("/login",
-             dependencies=[Depends(RateLimiter(times=10, seconds=1))])
-async def login(
+async def authenticate(
     user: Login,
     request: Request,
-    authorize: AuthJWT = Depends(auth_dep),
-    auth_service: AuthService = Depends(get_auth_service),
-    login_service: LoginHistoryService = Depends(get_login_history_service),
-) -> LoginResponse:
-    request_id = request.headers.get("X-Request-Id")
-    tracer = trace.get_tracer(__name__)
-    span = tracer.start_span(__name__)
-    span.set_attribute("http.request_id", request_id)
-
-    with tracer.start_as_current_span("get_user"):
-        get_user = await auth_service.get(user)
+    auth_service: AuthService,
+    attempts: LoginAttempts,
+) -> UserRolesSchema:
+    # Заблокированный логин или адрес отклоняется до БД и хеширования.
+    ip = client_ip(request)
+    await attempts.check(user.login, ip)
+    get_user = await auth_service.get(user)
     if not get_user:
+        await attempts.failed(user.login, ip)
         raise HTTPException(
             status_code=HTTPStatus.UNAUTHORIZED, detail="Bad username or password"
         )
+    await attempts.succeeded(user.login)
+    return get_user
 
-    subject = f"{get_user.login}"
-    user_for_claims = get_user.model_dump(mode="json")
-    claims = {"uuid": user_for_claims["uuid"], "roles": user_for_claims["roles"]}
 
-    with tracer.start_as_current_span("create_login_history"):
-        await login_service.create(LoginHistoryCreateSchema(user_id=get_user.uuid))
+@router.post("/login",
+             dependencies=[Depends(RateLimit(times=10, seconds=1))])
+async def login(
+    user: Login,
+    request: Request,
+    authorize: AuthJWT = Depends(auth_dep),
+    auth_service: AuthService = Depends(get_auth_service),
+    login_service: LoginHistoryService = Depends(get_login_history_service),
+    refresh_store: RefreshTokenStore = Depends(get_refresh_token_store),
+    attempts: LoginAttempts = Depends(get_login_attempts),
+) -> LoginResponse:
+    get_user = await authenticate(user, request, auth_service, attempts)
 
-    with tracer.start_as_current_span("create_tokens"):
-        access_token = await authorize.create_access_token(
-            subject=subject, user_claims=claims
-        )
-        refresh_token = await authorize.create_refresh_token(
-            subject=subject, user_claims=claims
-        )
+    await login_service.record(get_user.uuid)
 
-    with tracer.start_as_current_span("update_refresh_token"):
-        await auth_service.update(get_user.uuid, refresh_token)
-    span.end()
-    return LoginResponse(access_token=access_token, refresh_token=refresh_token)
+    # Каждый вход начинает свое семейство refresh-токенов (устройство).
+    family = refresh_store.new_family()
+    tokens = await auth_service.create_tokens(get_user, authorize, family)
+    await refresh_store.start(get_user.uuid, family, tokens.refresh_token)
+    return tokens
 
 
 @router.post("/admin_login",
-             dependencies=[Depends(RateLimiter(times=10, seconds=1))])
+             dependencies=[Depends(RateLimit(times=10, seconds=1))])
 async def admin_login(
     user: Login,
+    request: Request,
     auth_service: AuthService = Depends(get_auth_service),
     login_service: LoginHistoryService = Depends(get_login_history_service),
+    attempts: LoginAttempts = Depends(get_login_attempts),
 ) -> UserRolesSchema:
-    get_user = await auth_service.get(user)
-    if not get_user:
-        raise HTTPException(
-            status_code=HTTPStatus.UNAUTHORIZED, detail="Bad username or password"
-        )
-    await login_service.create(LoginHistoryCreateSchema(user_id=get_user.uuid))
+    get_user = await authenticate(user, request, auth_service, attempts)
+    await login_service.record(get_user.uuid)
     return get_user
 
 
 @router.get("/refresh",
-            dependencies=[Depends(RateLimiter(times=10, seconds=1))])
+            dependencies=[
+                Depends(RateLimit(times=10, seconds=1, identifier=principal))
+            ])
 async def refresh(
     request: Request,
     authorize: AuthJWT = Depends(auth_dep),
     auth_service: AuthService = Depends(get_auth_service),
-) -> AccessToken:
-    request_id = request.headers.get("X-Request-Id")
-    tracer = trace.get_tracer(__name__)
-    span = tracer.start_span(__name__)
-    span.set_attribute("http.request_id", request_id)
-    with tracer.start_as_current_span("check_token"):
-        await authorize.jwt_refresh_token_required()
+    refresh_store: RefreshTokenStore = Depends(get_refresh_token_store),
+) -> LoginResponse:
+    await authorize.jwt_refresh_token_required()
     refresh_token = request.headers["Authorization"].split(" ")[1]
     current_user = await authorize.get_raw_jwt(refresh_token)
-    user_uuid = current_user["uuid"]
-    with tracer.start_as_current_span("get_refresh_token"):
-        refresh_token_user = await auth_service.get_refresh_token(user_uuid)
-    if refresh_token != refresh_token_user:
+    user_uuid = token_uuid(current_user)
+    family = current_user.get("sid")
+    if not family:
         raise CustomError(
             status_code=HTTPStatus.UNAUTHORIZED,
             message="Ранее был зарегистрирован выход из системы.",
         )
-    user_sub = current_user["sub"]
-    claims = {"uuid": user_uuid, "roles": current_user["roles"]}
-    with tracer.start_as_current_span("create_access_token"):
-        new_access_token = await authorize.create_access_token(
-            subject=user_sub, user_claims=claims
+    # Роли берутся из актуального снимка пользователя, а не из refresh-токена.
+    get_user = await auth_service.get_claims(user_uuid)
+    if not get_user:
+        raise CustomError(
+            status_code=HTTPStatus.UNAUTHORIZED,
+            message="Пользователь не найден.",
         )
-    span.end()
-    return AccessToken(access_token=new_access_token)
+    tokens = await auth_service.create_tokens(get_user, authorize, family)
+    rotated = await refresh_store.rotate(
+        family, refresh_token, tokens.refresh_token
+    )
+    if not rotated:
+        raise CustomError(
+            status_code=HTTPStatus.UNAUTHORIZED,
+            message="Ранее был зарегистрирован выход из системы.",
+        )
+    return tokens
 
 
 @router.get("/logout", status_code=HTTPStatus.NO_CONTENT,
-            dependencies=[Depends(RateLimiter(times=10, seconds=1))])
+            dependencies=[
+                Depends(RateLimit(times=10, seconds=1, identifier=principal))
+            ])
 async def logout(
-    request: Request,
+    all_devices: bool = False,
     authorize: AuthJWT = Depends(auth_dep),
-    auth_service: AuthService = Depends(get_auth_service),
     cache: CacheServise = Depends(get_cache_service),
+    refresh_store: RefreshTokenStore = Depends(get_refresh_token_store),
 ):
-    request_id = request.headers.get("X-Request-Id")
-    tracer = trace.get_tracer(__name__)
-    span = tracer.start_span(__name__)
-    span.set_attribute("http.request_id", request_id)
     await authorize.jwt_required()
 
     claims = await authorize.get_raw_jwt()
     token_id = claims["jti"]
     token_exp = claims["exp"]
-    user_sub = claims["uuid"]
-    # Выставление refresh_token=None
-
-    with tracer.start_as_current_span("update_refresh_token"):
-        await auth_service.update(user_sub, None)
-    dt_to_unix = datetime.now().timestamp()
-    with tracer.start_as_current_span("set_token_redis"):
-        await cache.set_key(token_id, token_exp - int(dt_to_unix))
-    span.end()
+    if all_devices:
+        await refresh_store.revoke_all(token_uuid(claims))
+    elif claims.get("sid"):
+        await refresh_store.revoke(claims["sid"])
+    await cache.revoke_token(token_id, token_exp)
 
 
 @router.post("/check_auth",
-             dependencies=[Depends(RateLimiter(times=10, seconds=1))])
+             dependencies=[Depends(RateLimit(times=10, seconds=1))])
 async def check_auth(
     body: CheckRoles,
     authorize: AuthJWT = Depends(auth_dep),
@@ -171,56 +171,65 @@ async def check_auth(
     return Success(success=True)
 
 
+@router.post("/check_auth_batch",
+             dependencies=[
+                 Depends(RateLimit(times=10, seconds=1)),
+                 Depends(require_service),
+             ])
+async def check_auth_batch(
+    body: CheckAuthBatch,
+    cache: CacheServise = Depends(get_cache_service),
+) -> CheckAuthBatchResponse:
+    results = await introspect_tokens(cache, body.tokens, body.roles)
+    return CheckAuthBatchResponse(results=results)
+
+
+@router.get("/revoked",
+            dependencies=[
+                Depends(RateLimit(times=10, seconds=1)),
+                Depends(require_service),
+            ])
+async def revoked(
+    cache: CacheServise = Depends(get_cache_service),
+) -> RevokedTokens:
+    tokens = await cache.get_revoked_tokens()
+    return RevokedTokens(tokens=tokens)
+
+
+@router.get("/jwks",
+            dependencies=[Depends(RateLimit(times=10, seconds=1))])
+async def jwks(response: Response) -> JWKS:
+    # Открытые ключи меняются только при ротации, проверяющие их кешируют.
+    response.headers["Cache-Control"] = f"public, max-age={settings.jwks_max_age}"
+    return JWKS(**get_keyring().jwks())
+
+
 @router.get("/network_login",
-            dependencies=[Depends(RateLimiter(times=10, seconds=1))])
+            dependencies=[Depends(RateLimit(times=10, seconds=1))])
 async def network_login(
     request: Request,
     network: str = 'yandex'
 ) -> AuthURL:
-    url = "https://oauth.yandex.ru/authorize?"
-    params = {
-        "response_type": "token",
-        "redirect_uri": "https://oauth.yandex.ru/verification_code",
-        "client_id": settings.yandex_id,
-    }
-    auth_url = url + urlencode(params)
-    return AuthURL(url=auth_url)
+    return AuthURL(url=oauth.get_provider(network).authorize_url())
 
 
 @router.post("/network_redirect",
-             dependencies=[Depends(RateLimiter(times=10, seconds=1))])
+             dependencies=[Depends(RateLimit(times=10, seconds=1))])
 async def network_redirect(
     body: AuthToken,
     network: str = 'yandex',
     auth_service: AuthService = Depends(get_auth_service),
     authorize: AuthJWT = Depends(auth_dep),
     login_service: LoginHistoryService = Depends(get_login_history_service),
-    user_service: UsersService = Depends(get_users_service),
-    cache: CacheServise = Depends(get_cache_service),
+    refresh_store: RefreshTokenStore = Depends(get_refresh_token_store),
 ) -> LoginResponse:
-    if network == 'yandex':
-        user_info = await auth_service.get_yandex_token(body.token)
-    else:
-        raise CustomError(
-            status_code=HTTPStatus.BAD_REQUEST,
-            message="Выберете network из списка [yandex, ].",
-        )
-    if not user_info.login:
-        letters = string.ascii_lowercase
-        user_info.login = ''.join(random.choice(letters) for i in range(10))
-        user = None
-    else:
-        user = await auth_service.get_by_login(user_info.login)
-    if not user:
-        user_model = UserCreateSchema(
-            login=user_info.login,
-            password="default",
-            first_name=user_info.first_name,
-            last_name=user_info.last_name,
-        )
-        user = await user_service.create(user_model)
-    await auth_service.create_network(user.uuid, network)
-    tokens = await auth_service.create_tokens(user, authorize)
-    await auth_service.update(user.uuid, tokens.refresh_token)
-    await login_service.create(LoginHistoryCreateSchema(user_id=user.uuid))
+    user_info = await oauth.get_userinfo(network, body.token)
+    user = await auth_service.upsert_network_user(network, user_info)
+    family = refresh_store.new_family()
+    tokens = await auth_service.create_tokens(user, authorize, family)
+    # Redis и история входов друг от друга не зависят.
+    await asyncio.gather(
+        refresh_store.start(user.uuid, family, tokens.refresh_token),
+        login_service.record(user.uuid),
+    )
     return tokens
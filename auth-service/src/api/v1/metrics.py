@@ -0,0 +1,59 @@
+from async_fastapi_jwt_auth import AuthJWT
+from fastapi import APIRouter, Depends
+
+from api.v1.auth import auth_dep
+from core import hashing
+from core.check_auth import check_roles
+from core.config import settings
+from db.postgres import engine
+from services import login_events
+from services.cache import CacheServise, get_cache_service
+from schemas.metrics import DbPoolMetrics, HashingMetrics, LoginHistoryMetrics
+
+
+router = APIRouter()
+
+
+@router.get(
+    "/hashing",
+    response_model=HashingMetrics,
+    summary="Пул хеширования паролей",
+    description="Загрузка и очередь пула хеширования паролей текущего воркера",
+    response_description="Метрики пула хеширования",
+)
+async def hashing_metrics(
+    authorize: AuthJWT = Depends(auth_dep),
+    cache: CacheServise = Depends(get_cache_service),
+) -> HashingMetrics:
+    await check_roles(authorize, cache, settings.roles_view_data)
+    return HashingMetrics(**hashing.hasher.stats())
+
+
+@router.get(
+    "/login_history",
+    response_model=LoginHistoryMetrics,
+    summary="Запись истории входов",
+    description="Буфер и пакетная запись истории входов текущего воркера",
+    response_description="Метрики записи истории входов",
+)
+async def login_history_metrics(
+    authorize: AuthJWT = Depends(auth_dep),
+    cache: CacheServise = Depends(get_cache_service),
+) -> LoginHistoryMetrics:
+    await check_roles(authorize, cache, settings.roles_view_data)
+    return LoginHistoryMetrics(**login_events.writer.stats())
+
+
+@router.get(
+    "/db_pool",
+    response_model=DbPoolMetrics,
+    summary="Пул соединений с БД",
+    description="Занятость пула соединений и ожидание соединения текущего воркера",
+    response_description="Метрики пула соединений",
+)
+async def db_pool_metrics(
+    authorize: AuthJWT = Depends(auth_dep),
+    cache: CacheServise = Depends(get_cache_service),
+) -> DbPoolMetrics:
+    await check_roles(authorize, cache, settings.roles_view_data)
+    return DbPoolMetrics(**engine.pool.stats())
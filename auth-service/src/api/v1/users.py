@@ -1,15 +1,13 @@
 from http import HTTPStatus
-from async_fastapi_jwt_auth import AuthJWT
-from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi_limiter.depends import RateLimiter
-from uuid import UUID
-from opentelemetry import trace
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from uuid import UUID, uuid4
 
-from api.v1.auth import auth_dep
-from core.check_auth import check_roles
+from core.check_auth import authenticated, can_change, can_view
 from core.config import settings
-from services.cache import CacheServise, get_cache_service
+from core.pagination import NEXT_CURSOR_HEADER
 from services.login_history import LoginHistoryService, get_login_history_service
+from services.rate_limit import RateLimit, principal
+from services.user_import import UserImportService, get_user_import_service
 from services.users import UsersService, get_users_service
 from schemas.users import (
     UserSchema,
@@ -18,6 +16,10 @@ from schemas.users import (
     UserRolesSchema,
     LoginHistorySchema,
     SecondaryUserRole,
+    BulkUserRole,
+    BulkUserRoleResult,
+    UserImportProgress,
+    UserImportResult,
 )
 
 
@@ -29,27 +31,25 @@ router = APIRouter()
     response_model=list[UserRolesSchema],
     response_model_by_alias=False,
     summary="Список пользователей",
-    description="Получить список пользователей",
+    description=(
+        "Получить список пользователей. Курсор следующей страницы "
+        "возвращается в заголовке X-Next-Cursor."
+    ),
     response_description="Список пользователей",
-    dependencies=[Depends(RateLimiter(times=10, seconds=1))]
+    dependencies=[
+        Depends(RateLimit(times=10, seconds=1, identifier=principal)),
+        Depends(can_view),
+    ]
 )
 async def roles(
-    request: Request,
-    limit: int = 20,
-    offset: int = 0,
+    response: Response,
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = None,
     user_service: UsersService = Depends(get_users_service),
-    authorize: AuthJWT = Depends(auth_dep),
-    cache: CacheServise = Depends(get_cache_service),
 ) -> list[UserRolesSchema]:
-    request_id = request.headers.get("X-Request-Id")
-    tracer = trace.get_tracer(__name__)
-    span = tracer.start_span(__name__)
-    span.set_attribute("http.request_id", request_id)
-    with tracer.start_as_current_span("check_auth"):
-        await check_roles(authorize, cache, settings.roles_view_data)
-    with tracer.start_as_current_span("get_list"):
-        users_list = await user_service.get_list(limit, offset)
-    span.end()
+    users_list, next_cursor = await user_service.get_page(limit, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return users_list
 
 
@@ -60,32 +60,83 @@ async def roles(
     summary="Создание пользователя",
     description="Создать нового пользователя",
     response_description="Объект нового пользователя",
-    dependencies=[Depends(RateLimiter(times=10, seconds=1))]
+    dependencies=[
+        Depends(RateLimit(times=10, seconds=1, identifier=principal)),
+        Depends(can_change),
+    ]
 )
 async def create_user(
     body: UserCreateSchema,
-    request: Request,
     user_service: UsersService = Depends(get_users_service),
-    authorize: AuthJWT = Depends(auth_dep),
-    cache: CacheServise = Depends(get_cache_service),
 ) -> UserSchema:
-    request_id = request.headers.get("X-Request-Id")
-    tracer = trace.get_tracer(__name__)
-    span = tracer.start_span(__name__)
-    span.set_attribute("http.request_id", request_id)
-    with tracer.start_as_current_span("check_auth"):
-        await check_roles(authorize, cache, settings.roles_change_data)
-    with tracer.start_as_current_span("create_user"):
-        new_user = await user_service.create(body)
+    new_user = await user_service.create(body)
     if not new_user:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail="Пользователь с таким login уже существует.",
         )
-    span.end()
     return new_user
 
 
+@router.post(
+    "/import",
+    response_model=UserImportResult,
+    summary="Импорт пользователей",
+    description=(
+        "Потоковый импорт пользователей из NDJSON (application/x-ndjson) или "
+        "CSV с заголовком (text/csv) с полями login, password, first_name, "
+        "last_name. Прогресс доступен по X-Request-Id запроса."
+    ),
+    response_description="Итог импорта и ошибки по строкам",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/x-ndjson": {"schema": {"type": "string"}},
+                "text/csv": {"schema": {"type": "string"}},
+            },
+        }
+    },
+    dependencies=[
+        Depends(RateLimit(times=10, seconds=1, identifier=principal)),
+        Depends(can_change),
+    ]
+)
+async def import_users(
+    request: Request,
+    import_service: UserImportService = Depends(get_user_import_service),
+) -> UserImportResult:
+    request_id = request.headers.get("X-Request-Id")
+    content_type = request.headers.get("Content-Type", "")
+    fmt = "csv" if content_type.startswith("text/csv") else "ndjson"
+    result = await import_service.import_users(
+        request_id or str(uuid4()), request.stream(), fmt
+    )
+    return result
+
+
+@router.get(
+    "/import/{import_id}",
+    response_model=UserImportProgress,
+    summary="Прогресс импорта пользователей",
+    description="Прогресс импорта по X-Request-Id запроса импорта",
+    response_description="Число обработанных строк, созданных и ошибок",
+    dependencies=[
+        Depends(RateLimit(times=10, seconds=1, identifier=principal)),
+        Depends(can_change),
+    ]
+)
+async def import_users_progress(
+    import_id: str,
+    request: Request,
+    import_service: UserImportService = Depends(get_user_import_service),
+) -> UserImportProgress:
+    progress = await import_service.get_progress(import_id)
+    if not progress:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="import not found")
+    return progress
+
+
 @router.post(
     "/update/{user_uuid}",
     response_model=UserSchema,
@@ -93,25 +144,17 @@ async def create_user(
     summary="Обновить данные пользователя",
     description="Обновить данные пользователя",
     response_description="Объект обновленной пользователя",
-    dependencies=[Depends(RateLimiter(times=10, seconds=1))]
+    dependencies=[
+        Depends(RateLimit(times=10, seconds=1, identifier=principal)),
+        Depends(can_change),
+    ]
 )
 async def update_user(
     user_uuid: UUID,
     body: UserUpdateSchema,
-    request: Request,
     user_service: UsersService = Depends(get_users_service),
-    authorize: AuthJWT = Depends(auth_dep),
-    cache: CacheServise = Depends(get_cache_service),
 ) -> UserSchema:
-    request_id = request.headers.get("X-Request-Id")
-    tracer = trace.get_tracer(__name__)
-    span = tracer.start_span(__name__)
-    span.set_attribute("http.request_id", request_id)
-    with tracer.start_as_current_span("check_auth"):
-        await check_roles(authorize, cache, settings.roles_change_data)
-    with tracer.start_as_current_span("update_by_id"):
-        updated_user = await user_service.update_by_id(user_uuid, body)
-    span.end()
+    updated_user = await user_service.update_by_id(user_uuid, body)
     return updated_user
 
 
@@ -120,24 +163,16 @@ async def update_user(
     summary="Удалить пользователя",
     description="Удаление пользователя",
     status_code=HTTPStatus.NO_CONTENT,
-    dependencies=[Depends(RateLimiter(times=10, seconds=1))]
+    dependencies=[
+        Depends(RateLimit(times=10, seconds=1, identifier=principal)),
+        Depends(can_change),
+    ]
 )
 async def remove_role(
     user_uuid: UUID,
-    request: Request,
     user_service: UsersService = Depends(get_users_service),
-    authorize: AuthJWT = Depends(auth_dep),
-    cache: CacheServise = Depends(get_cache_service),
 ) -> None:
-    request_id = request.headers.get("X-Request-Id")
-    tracer = trace.get_tracer(__name__)
-    span = tracer.start_span(__name__)
-    span.set_attribute("http.request_id", request_id)
-    with tracer.start_as_current_span("check_auth"):
-        await check_roles(authorize, cache, settings.roles_change_data)
-    with tracer.start_as_current_span("remove_by_id"):
-        removed = await user_service.remove_by_id(user_uuid)
-    span.end()
+    removed = await user_service.remove_by_id(user_uuid)
     if not removed:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="role not found")
 
@@ -147,28 +182,25 @@ async def remove_role(
     response_model=list[LoginHistorySchema],
     response_model_by_alias=False,
     summary="История входов",
-    description="Получить историю входов пользователя",
+    description=(
+        "Получить историю входов пользователя, новые сначала. Курсор "
+        "следующей страницы возвращается в заголовке X-Next-Cursor."
+    ),
     response_description="Список времени входа",
-    dependencies=[Depends(RateLimiter(times=10, seconds=1))]
+    dependencies=[Depends(RateLimit(times=10, seconds=1, identifier=principal))]
 )
 async def login_history_user_by_token(
-    request: Request,
-    limit: int = 20,
-    offset: int = 0,
+    response: Response,
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = None,
+    user_uuid: str = Depends(authenticated),
     login_service: LoginHistoryService = Depends(get_login_history_service),
-    authorize: AuthJWT = Depends(auth_dep),
-    cache: CacheServise = Depends(get_cache_service),
 ) -> list[LoginHistorySchema]:
-    request_id = request.headers.get("X-Request-Id")
-    tracer = trace.get_tracer(__name__)
-    span = tracer.start_span(__name__)
-    span.set_attribute("http.request_id", request_id)
-    await check_roles(authorize, cache)
-    with tracer.start_as_current_span("check_auth"):
-        user_uuid = await check_roles(authorize, cache)
-    with tracer.start_as_current_span("get_list"):
-        history = await login_service.get_list(user_uuid, limit, offset)
-    span.end()
+    history, next_cursor = await login_service.get_page(
+        user_uuid, limit, cursor
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return history
 
 
@@ -177,28 +209,28 @@ async def login_history_user_by_token(
     response_model=list[LoginHistorySchema],
     response_model_by_alias=False,
     summary="История входов",
-    description="Получить историю входов пользователя",
+    description=(
+        "Получить историю входов пользователя, новые сначала. Курсор "
+        "следующей страницы возвращается в заголовке X-Next-Cursor."
+    ),
     response_description="Список времени входа",
-    dependencies=[Depends(RateLimiter(times=10, seconds=1))]
+    dependencies=[
+        Depends(RateLimit(times=10, seconds=1, identifier=principal)),
+        Depends(can_view),
+    ]
 )
 async def login_history_user(
     user_uuid: UUID,
-    request: Request,
-    limit: int = 20,
-    offset: int = 0,
+    response: Response,
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = None,
     login_service: LoginHistoryService = Depends(get_login_history_service),
-    authorize: AuthJWT = Depends(auth_dep),
-    cache: CacheServise = Depends(get_cache_service),
 ) -> list[LoginHistorySchema]:
-    request_id = request.headers.get("X-Request-Id")
-    tracer = trace.get_tracer(__name__)
-    span = tracer.start_span(__name__)
-    span.set_attribute("http.request_id", request_id)
-    with tracer.start_as_current_span("check_auth"):
-        await check_roles(authorize, cache, settings.roles_view_data)
-    with tracer.start_as_current_span("get_list"):
-        history = await login_service.get_list(user_uuid, limit, offset)
-    span.end()
+    history, next_cursor = await login_service.get_page(
+        user_uuid, limit, cursor
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return history
 
 
@@ -209,30 +241,24 @@ async def login_history_user(
     summary="Назначить роль пользователю",
     description="Назначить роль пользователю",
     response_description="Созданное отношение",
-    dependencies=[Depends(RateLimiter(times=10, seconds=1))]
+    dependencies=[
+        Depends(RateLimit(times=10, seconds=1, identifier=principal)),
+        Depends(can_change),
+    ]
 )
 async def set_user_role(
     body: SecondaryUserRole,
-    request: Request,
     user_service: UsersService = Depends(get_users_service),
-    authorize: AuthJWT = Depends(auth_dep),
-    cache: CacheServise = Depends(get_cache_service),
 ) -> UserRolesSchema:
-    request_id = request.headers.get("X-Request-Id")
-    tracer = trace.get_tracer(__name__)
-    span = tracer.start_span(__name__)
-    span.set_attribute("http.request_id", request_id)
-    with tracer.start_as_current_span("check_auth"):
-        await check_roles(authorize, cache, settings.roles_change_data)
     if body.role_id == settings.superrole_uuid:
         raise HTTPException(
             status_code=HTTPStatus.UNAUTHORIZED, detail="invalid role uuid"
         )
-    with tracer.start_as_current_span("set_role"):
-        updated_user = await user_service.set_secondary(body)
+    updated_user = await user_service.set_secondary(body)
+    if updated_user is None:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="user not found")
     if isinstance(updated_user, str):
         raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=updated_user)
-    span.end()
     return updated_user
 
 
@@ -243,28 +269,73 @@ async def set_user_role(
     summary="Назначить роль пользователю",
     description="Назначить роль пользователю",
     response_description="Созданное отношение",
-    dependencies=[Depends(RateLimiter(times=10, seconds=1))]
+    dependencies=[
+        Depends(RateLimit(times=10, seconds=1, identifier=principal)),
+        Depends(can_change),
+    ]
 )
 async def deprive_user_role(
     body: SecondaryUserRole,
-    request: Request,
     user_service: UsersService = Depends(get_users_service),
-    authorize: AuthJWT = Depends(auth_dep),
-    cache: CacheServise = Depends(get_cache_service),
 ) -> UserRolesSchema:
-    request_id = request.headers.get("X-Request-Id")
-    tracer = trace.get_tracer(__name__)
-    span = tracer.start_span(__name__)
-    span.set_attribute("http.request_id", request_id)
-    with tracer.start_as_current_span("check_auth"):
-        await check_roles(authorize, cache, settings.roles_change_data)
     if body.role_id == settings.superrole_uuid:
         raise HTTPException(
             status_code=HTTPStatus.UNAUTHORIZED, detail="invalid role uuid"
         )
-    with tracer.start_as_current_span("deprive_secondary"):
-        updated_user = await user_service.deprive_secondary(body)
+    updated_user = await user_service.deprive_secondary(body)
+    if updated_user is None:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="user not found")
     if isinstance(updated_user, str):
         raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=updated_user)
-    span.end()
     return updated_user
+
+
+@router.post(
+    "/bulk_set_role",
+    response_model=BulkUserRoleResult,
+    summary="Назначить роль списку пользователей",
+    description=(
+        "Назначить роль до 10000 пользователей одним запросом. "
+        "Уже имеющие роль и несуществующие пользователи пропускаются."
+    ),
+    response_description="Число пользователей, получивших роль",
+    dependencies=[
+        Depends(RateLimit(times=10, seconds=1, identifier=principal)),
+        Depends(can_change),
+    ]
+)
+async def bulk_set_user_role(
+    body: BulkUserRole,
+    user_service: UsersService = Depends(get_users_service),
+) -> BulkUserRoleResult:
+    if str(body.role_id) == settings.superrole_uuid:
+        raise HTTPException(
+            status_code=HTTPStatus.UNAUTHORIZED, detail="invalid role uuid"
+        )
+    result = await user_service.set_role_bulk(body)
+    if isinstance(result, str):
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=result)
+    return result
+
+
+@router.post(
+    "/bulk_deprive_role",
+    response_model=BulkUserRoleResult,
+    summary="Отозвать роль у списка пользователей",
+    description="Отозвать роль у до 10000 пользователей одним запросом",
+    response_description="Число пользователей, лишенных роли",
+    dependencies=[
+        Depends(RateLimit(times=10, seconds=1, identifier=principal)),
+        Depends(can_change),
+    ]
+)
+async def bulk_deprive_user_role(
+    body: BulkUserRole,
+    user_service: UsersService = Depends(get_users_service),
+) -> BulkUserRoleResult:
+    if str(body.role_id) == settings.superrole_uuid:
+        raise HTTPException(
+            status_code=HTTPStatus.UNAUTHORIZED, detail="invalid role uuid"
+        )
+    result = await user_service.deprive_role_bulk(body)
+    return result
@@ -0,0 +1,89 @@
+"""
+Подбор стоимости хеширования паролей под целевое время проверки.
+
+Пример:
+    python3 -m benchmarks.hashing --target-ms 100 --peak 50
+
+Для каждого алгоритма выводит самую дорогую строку метода, укладывающуюся
+в target-ms на этом CPU, и число ядер, нужное на пиковый поток логинов.
+"""
+import argparse
+import os
+import time
+
+from core.hashing import HASHERS, get_hasher
+
+PASSWORD = "benchmark-password"
+
+
+def measure(method: str, repeat: int) -> float:
+    hasher = get_hasher(method)
+    pwhash = hasher.hash(PASSWORD)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        hasher.verify(pwhash, PASSWORD)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def calibrate_pbkdf2(target_ms: float, repeat: int) -> tuple[str, float]:
+    # Время PBKDF2 линейно зависит от числа итераций.
+    base = 100_000
+    per_iteration = measure(f"pbkdf2:sha256:{base}", repeat) / base
+    iterations = max(int(target_ms / per_iteration), 1)
+    method = f"pbkdf2:sha256:{iterations}"
+    return method, measure(method, repeat)
+
+
+def calibrate_scrypt(target_ms: float, repeat: int) -> tuple[str, float]:
+    # N должно быть степенью двойки, берем наибольшее в пределах бюджета.
+    method, elapsed = "scrypt:1024:8:1", measure("scrypt:1024:8:1", repeat)
+    n = 2048
+    while True:
+        candidate = f"scrypt:{n}:8:1"
+        candidate_ms = measure(candidate, repeat)
+        if candidate_ms > target_ms:
+            return method, elapsed
+        method, elapsed = candidate, candidate_ms
+        n *= 2
+
+
+def calibrate_argon2(target_ms: float, repeat: int) -> tuple[str, float]:
+    method, elapsed = "argon2:1:65536:4", measure("argon2:1:65536:4", repeat)
+    time_cost = 2
+    while True:
+        candidate = f"argon2:{time_cost}:65536:4"
+        candidate_ms = measure(candidate, repeat)
+        if candidate_ms > target_ms:
+            return method, elapsed
+        method, elapsed = candidate, candidate_ms
+        time_cost += 1
+
+
+CALIBRATORS = {
+    "pbkdf2": calibrate_pbkdf2,
+    "scrypt": calibrate_scrypt,
+    "argon2": calibrate_argon2,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--target-ms", type=float, default=100, help="мс CPU на логин")
+    parser.add_argument("--peak", type=float, default=0, help="логинов в секунду в пик")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--hasher", choices=CALIBRATORS, action="append")
+    args = parser.parse_args()
+
+    names = [name for name in args.hasher or CALIBRATORS if name in HASHERS]
+    print(f"CPU: {os.cpu_count()}, бюджет: {args.target_ms} мс на проверку пароля")
+    for name in names:
+        method, elapsed = CALIBRATORS[name](args.target_ms, args.repeat)
+        line = f"{name}: PASSWORD_HASH_METHOD={method} ({elapsed:.1f} мс"
+        line += f", {1000 / elapsed:.1f} логинов/с на ядро"
+        if args.peak:
+            line += f", ядер на пик: {args.peak * elapsed / 1000:.1f}"
+        print(line + ")")
+
+
+if __name__ == "__main__":
+    main()
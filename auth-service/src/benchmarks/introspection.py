@@ -0,0 +1,80 @@
+"""
+Сравнение проверки N токенов через /check_auth и одним /check_auth_batch.
+
+Пример (против запущенного сервиса, лимиты RateLimit учитываются):
+    python3 -m benchmarks.introspection --url http://localhost:8200 -n 100
+
+Логин и пароль берутся из SUPERUSER_LOGIN и SUPERUSER_PASSWORD,
+секрет сервиса для /check_auth_batch - из SERVICE_TOKEN.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+
+import aiohttp
+
+
+async def login(session: aiohttp.ClientSession, url: str) -> str:
+    body = {
+        "login": os.environ.get("SUPERUSER_LOGIN"),
+        "password": os.environ.get("SUPERUSER_PASSWORD"),
+    }
+    async with session.post(url + "/api/v1/auth/login", data=json.dumps(body)) as resp:
+        resp.raise_for_status()
+        return (await resp.json())["access_token"]
+
+
+async def check_single(
+    session: aiohttp.ClientSession, url: str, tokens: list[str]
+) -> tuple[float, dict]:
+    statuses = {}
+    start = time.perf_counter()
+    for token in tokens:
+        async with session.post(
+            url + "/api/v1/auth/check_auth",
+            data=json.dumps({"roles": []}),
+            headers={"Authorization": "Bearer " + token},
+        ) as resp:
+            statuses[resp.status] = statuses.get(resp.status, 0) + 1
+    return time.perf_counter() - start, statuses
+
+
+async def check_batch(
+    session: aiohttp.ClientSession, url: str, tokens: list[str]
+) -> tuple[float, dict]:
+    start = time.perf_counter()
+    async with session.post(
+        url + "/api/v1/auth/check_auth_batch",
+        data=json.dumps({"tokens": tokens, "roles": []}),
+        headers={"X-Service-Token": os.environ.get("SERVICE_TOKEN", "")},
+    ) as resp:
+        resp.raise_for_status()
+        body = await resp.json()
+    valid = sum(result["valid"] for result in body["results"])
+    return time.perf_counter() - start, {"valid": valid}
+
+
+async def run(url: str, count: int) -> None:
+    headers = {"Content-Type": "application/json", "X-Request-Id": str(uuid.uuid4())}
+    async with aiohttp.ClientSession(headers=headers) as session:
+        tokens = [await login(session, url)] * count
+        single, statuses = await check_single(session, url, tokens)
+        batch, verdicts = await check_batch(session, url, tokens)
+    print(f"/check_auth x{count}: {single * 1000:.1f} мс, статусы {statuses}")
+    print(f"/check_auth_batch: {batch * 1000:.1f} мс, {verdicts}")
+    print(f"ускорение: {single / batch:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://localhost:8200")
+    parser.add_argument("-n", "--count", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Задержка запроса userinfo: новая aiohttp.ClientSession на каждый вход
+(как было раньше) против общего пула HttpClient.
+
+Пример:
+    python3 -m benchmarks.oauth_client -n 200 --delay-ms 5
+    python3 -m benchmarks.oauth_client --url https://login.example/info
+
+Без --url поднимается локальная заглушка userinfo с задержкой delay-ms,
+запросы идут через провайдер stub. С --url замер идет против внешнего
+хоста (с TLS разница заметнее: каждая новая сессия заново проходит
+DNS, TCP и TLS).
+"""
+import argparse
+import asyncio
+import time
+
+import aiohttp
+
+from aiohttp import web
+
+from core.http_client import HttpClient
+from services.oauth import StubProvider
+
+
+async def start_stub(delay: float) -> tuple[web.AppRunner, str]:
+    async def userinfo(request: web.Request) -> web.Response:
+        await asyncio.sleep(delay)
+        return web.json_response({"id": "1", "login": "benchmark"})
+
+    app = web.Application()
+    app.router.add_get("/info", userinfo)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/info"
+
+
+async def per_call(url: str, count: int) -> list[float]:
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        timeout = aiohttp.ClientTimeout(total=20)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.get(url) as response:
+                await response.read()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def pooled(url: str, count: int) -> list[float]:
+    client = HttpClient(100, 20, 20, 300, 30, 5, 30)
+    provider = StubProvider(url)
+    timings = []
+    try:
+        for _ in range(count):
+            start = time.perf_counter()
+            try:
+                await provider.userinfo(client, "token")
+            except Exception:
+                # Внешний хост не обязан понимать ответ заглушки.
+                pass
+            timings.append(time.perf_counter() - start)
+    finally:
+        await client.close()
+    return timings
+
+
+def report(name: str, timings: list[float]) -> None:
+    timings = sorted(timings)
+    mean = sum(timings) / len(timings)
+    p95 = timings[int(len(timings) * 0.95)]
+    print(f"{name:>9}: среднее {mean * 1000:.2f} мс, p95 {p95 * 1000:.2f} мс")
+
+
+async def run(args) -> None:
+    runner = None
+    url = args.url
+    if not url:
+        runner, url = await start_stub(args.delay_ms / 1000)
+    try:
+        report("per-call", await per_call(url, args.count))
+        report("pooled", await pooled(url, args.count))
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--count", type=int, default=200)
+    parser.add_argument("--delay-ms", type=float, default=5)
+    parser.add_argument("--url", default="")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Обращения к Redis на проверку лимита: скрипт на каждый запрос (как
+в fastapi-limiter, который использовался раньше) против локальных
+корзин HybridRateLimiter со сверкой раз в sync-interval.
+
+Пример (Redis из настроек сервиса):
+    python3 -m benchmarks.rate_limit -n 5000 --rps 2000 --keys 100
+
+Запросы равномерно идут по keys ключам с частотой rps. Выводит команды
+Redis (по INFO commandstats) и сетевые обращения на запрос, среднее время
+проверки и число отказов.
+"""
+import argparse
+import asyncio
+import time
+
+from redis.asyncio import Redis
+
+from core.config import settings
+from services.rate_limit import HybridRateLimiter
+
+# Скрипт fastapi-limiter: фиксированное окно, один EVALSHA на запрос.
+FIXED_WINDOW_SCRIPT = """
+local current = tonumber(redis.call('get', KEYS[1]) or "0")
+if current > 0 then
+    if current + 1 > tonumber(ARGV[1]) then
+        return redis.call("PTTL", KEYS[1])
+    end
+    redis.call("INCR", KEYS[1])
+    return 0
+end
+redis.call("SET", KEYS[1], 1, "px", ARGV[2])
+return 0
+"""
+
+
+async def commands(redis: Redis) -> int:
+    stats = await redis.info("commandstats")
+    return sum(stat["calls"] for stat in stats.values())
+
+
+async def paced(count: int, rps: float):
+    start = time.perf_counter()
+    for i in range(count):
+        delay = start + i / rps - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        yield i
+
+
+async def run_script(redis: Redis, args) -> tuple[int, int, float, int]:
+    sha = await redis.script_load(FIXED_WINDOW_SCRIPT)
+    before = await commands(redis)
+    spent, rejected = 0.0, 0
+    async for i in paced(args.count, args.rps):
+        start = time.perf_counter()
+        pexpire = await redis.evalsha(
+            sha, 1, f"benchmark:script:{i % args.keys}", args.times, args.period * 1000
+        )
+        spent += time.perf_counter() - start
+        rejected += pexpire != 0
+    # Минус сам INFO.
+    return await commands(redis) - before - 1, args.count, spent, rejected
+
+
+async def run_local(redis: Redis, args) -> tuple[int, int, float, int]:
+    limiter = HybridRateLimiter(redis, args.sync_interval)
+    syncs = 0
+
+    async def sync():
+        nonlocal syncs
+        while True:
+            await asyncio.sleep(args.sync_interval)
+            if any(bucket.pending for bucket in limiter.buckets.values()):
+                syncs += 1
+            await limiter.sync()
+
+    before = await commands(redis)
+    syncer = asyncio.create_task(sync())
+    spent, rejected = 0.0, 0
+    async for i in paced(args.count, args.rps):
+        start = time.perf_counter()
+        retry_after = limiter.acquire(
+            f"benchmark:local:{i % args.keys}", args.times, args.period
+        )
+        spent += time.perf_counter() - start
+        rejected += retry_after != 0
+    syncer.cancel()
+    await limiter.sync()
+    syncs += 1
+    return await commands(redis) - before - 1, syncs, spent, rejected
+
+
+async def run(args) -> None:
+    redis = Redis(host=settings.redis_host, port=settings.redis_port)
+    try:
+        for name, runner in [("script", run_script), ("local", run_local)]:
+            ops, trips, spent, rejected = await runner(redis, args)
+            print(
+                f"{name:>6}: команд/запрос {ops / args.count:.3f}, "
+                f"обращений/запрос {trips / args.count:.3f}, "
+                f"проверка {spent / args.count * 1e6:.1f} мкс, "
+                f"отказов {rejected}"
+            )
+    finally:
+        await redis.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--count", type=int, default=5000)
+    parser.add_argument("--rps", type=float, default=2000)
+    parser.add_argument("--keys", type=int, default=100)
+    parser.add_argument("--times", type=int, default=10)
+    parser.add_argument("--period", type=int, default=1)
+    parser.add_argument(
+        "--sync-interval", type=float, default=settings.rate_limit_sync_interval
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Накладные расходы проверки X-Request-Id: прежний before_request на
+BaseHTTPMiddleware (проверка после обработчика) против
+RequestContextMiddleware (чистый ASGI, проверка до маршрутизации).
+
+Пример:
+    python3 -m benchmarks.request_context -n 5000
+
+Запросы идут через httpx.ASGITransport без сети, так что разница -
+это стоимость самой middleware. Для запросов без заголовка отдельно
+выводится, сколько раз при этом выполнился обработчик.
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from fastapi import FastAPI, Request, status
+from fastapi.responses import ORJSONResponse
+
+from core.request_context import RequestContextMiddleware
+
+
+def make_app(kind: str) -> FastAPI:
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.state.calls = 0
+
+    @app.get("/ping")
+    async def ping() -> dict:
+        app.state.calls += 1
+        return {}
+
+    if kind == "asgi":
+        app.add_middleware(RequestContextMiddleware)
+        return app
+
+    @app.middleware("http")
+    async def before_request(request: Request, call_next):
+        response = await call_next(request)
+        request_id = request.headers.get("X-Request-Id")
+        if not request_id:
+            return ORJSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={"detail": "X-Request-Id is required"},
+            )
+        return response
+
+    return app
+
+
+async def measure(app: FastAPI, count: int, headers: dict) -> list[float]:
+    transport = httpx.ASGITransport(app=app)
+    timings = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for _ in range(count):
+            start = time.perf_counter()
+            await client.get("/ping", headers=headers)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name: str, timings: list[float]) -> None:
+    timings = sorted(timings)
+    mean = sum(timings) / len(timings)
+    p95 = timings[int(len(timings) * 0.95)]
+    print(f"{name:>18}: среднее {mean * 1e6:.0f} мкс, p95 {p95 * 1e6:.0f} мкс")
+
+
+async def run(args) -> None:
+    for kind in ("base_http", "asgi"):
+        app = make_app(kind)
+        # Прогрев: сборка стека middleware и первого ответа.
+        await measure(app, 10, {"X-Request-Id": "warmup"})
+        report(kind, await measure(app, args.count, {"X-Request-Id": "id"}))
+        app.state.calls = 0
+        report(f"{kind} (без id)", await measure(app, args.count, {}))
+        print(f"{'':>18}  вызовов обработчика без id: {app.state.calls}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--count", type=int, default=5000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Размер токена и время подписи и проверки для профилей claims.
+
+Пример:
+    python3 -m benchmarks.token_claims --roles 1 10 50 --repeat 2000
+
+Для каждого профиля (full, compact) и числа ролей выводит длину access-токена,
+заголовка Authorization и среднее время jwt.encode / проверки decode_token
+с ключом и алгоритмом из настроек сервиса.
+"""
+import argparse
+import time
+import uuid
+
+from datetime import datetime
+
+import jwt
+
+from core.check_auth import decode_token
+from core.config import settings
+from schemas.roles import RoleSchema
+from schemas.users import UserRolesSchema
+from services.auth import build_claims
+
+PROFILES = ["full", "compact"]
+
+
+def make_user(roles: int) -> UserRolesSchema:
+    return UserRolesSchema(
+        id=uuid.uuid4(),
+        login="benchmark",
+        first_name="first",
+        last_name="last",
+        created_at=datetime.now(),
+        roles=[
+            RoleSchema(id=uuid.uuid4(), name=f"role_{i}", service="movies")
+            for i in range(roles)
+        ],
+    )
+
+
+def make_payload(user: UserRolesSchema, profile: str) -> dict:
+    # Стандартные claims, которые добавляет AuthJWT.create_access_token.
+    now = int(time.time())
+    bits = (1 << len(user.roles)) - 1
+    return {
+        "sub": user.login,
+        "iat": now,
+        "nbf": now,
+        "jti": str(uuid.uuid4()),
+        "exp": now + settings.authjwt_access_token_expires,
+        "type": "access",
+        "fresh": False,
+        **build_claims(user, bits, profile),
+    }
+
+
+def measure(payload: dict, repeat: int) -> tuple[str, float, float]:
+    key, algorithm = settings.authjwt_secret_key, settings.authjwt_algorithm
+    start = time.perf_counter()
+    for _ in range(repeat):
+        token = jwt.encode(payload, key, algorithm=algorithm)
+    sign = (time.perf_counter() - start) / repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        decode_token(token)
+    verify = (time.perf_counter() - start) / repeat
+    return token, sign * 1e6, verify * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--roles", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"алгоритм: {settings.authjwt_algorithm}, повторов: {args.repeat}")
+    for roles in args.roles:
+        user = make_user(roles)
+        for profile in PROFILES:
+            token, sign, verify = measure(make_payload(user, profile), args.repeat)
+            header = len(f"Authorization: Bearer {token}")
+            print(
+                f"{profile:>7}, ролей {roles:>3}: токен {len(token):>5} байт, "
+                f"заголовок {header:>5} байт, подпись {sign:.1f} мкс, "
+                f"проверка {verify:.1f} мкс"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Пропускная способность /api/v1/users/import в сравнении с /users/create.
+
+Пример (против запущенного сервиса):
+    python3 -m benchmarks.user_import --url http://localhost:8200 -n 100000
+
+Файл генерируется на лету и отправляется потоком, в конце печатается
+число строк в секунду. Для сравнения --single N создает N пользователей
+по одному запросу (RateLimit /users/create ограничивает его 10 rps).
+Логин и пароль берутся из SUPERUSER_LOGIN и SUPERUSER_PASSWORD.
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+import aiohttp
+
+from benchmarks.introspection import login
+
+
+def make_user(prefix: str, number: int) -> dict:
+    return {
+        "login": f"{prefix}_{number}",
+        "password": f"password_{number}",
+        "first_name": "bench",
+        "last_name": "bench",
+    }
+
+
+async def ndjson_rows(prefix: str, count: int, chunk: int = 1000):
+    for start in range(0, count, chunk):
+        lines = (
+            json.dumps(make_user(prefix, number)) + "\n"
+            for number in range(start, min(start + chunk, count))
+        )
+        yield "".join(lines).encode()
+
+
+async def csv_rows(prefix: str, count: int, chunk: int = 1000):
+    yield b"login,password,first_name,last_name\n"
+    for start in range(0, count, chunk):
+        lines = (
+            ",".join(make_user(prefix, number).values()) + "\n"
+            for number in range(start, min(start + chunk, count))
+        )
+        yield "".join(lines).encode()
+
+
+async def bulk_import(
+    session: aiohttp.ClientSession, url: str, count: int, fmt: str
+) -> tuple[float, dict]:
+    prefix = uuid.uuid4().hex[:8]
+    rows = csv_rows if fmt == "csv" else ndjson_rows
+    content_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    start = time.perf_counter()
+    async with session.post(
+        url + "/api/v1/users/import",
+        data=rows(prefix, count),
+        headers={"Content-Type": content_type, "X-Request-Id": prefix},
+    ) as resp:
+        resp.raise_for_status()
+        body = await resp.json()
+    return time.perf_counter() - start, body
+
+
+async def single_create(
+    session: aiohttp.ClientSession, url: str, count: int
+) -> float:
+    prefix = uuid.uuid4().hex[:8]
+    start = time.perf_counter()
+    for number in range(count):
+        async with session.post(
+            url + "/api/v1/users/create", data=json.dumps(make_user(prefix, number))
+        ) as resp:
+            resp.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def run(url: str, count: int, fmt: str, single: int) -> None:
+    headers = {"Content-Type": "application/json", "X-Request-Id": str(uuid.uuid4())}
+    timeout = aiohttp.ClientTimeout(total=None)
+    async with aiohttp.ClientSession(headers=headers, timeout=timeout) as session:
+        token = await login(session, url)
+        session.headers["Authorization"] = "Bearer " + token
+        elapsed, body = await bulk_import(session, url, count, fmt)
+        print(
+            f"/users/import ({fmt}) x{count}: {elapsed:.1f} с, "
+            f"{count / elapsed:.0f} строк/с, создано {body['created']}, "
+            f"ошибок {body['failed']}"
+        )
+        if single:
+            elapsed = await single_create(session, url, single)
+            print(
+                f"/users/create x{single}: {elapsed:.1f} с, "
+                f"{single / elapsed:.0f} пользователей/с"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://localhost:8200")
+    parser.add_argument("-n", "--count", type=int, default=10000)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--single", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.count, args.format, args.single))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,16 @@
+import jwt
+import secrets
+
+from http import HTTPStatus
+
 from async_fastapi_jwt_auth import AuthJWT
 from async_fastapi_jwt_auth.exceptions import AuthJWTException
+from fastapi import Depends, Header, Request
 
 from core.config import settings
-from services.cache import CacheServise
+from core.keys import get_keyring
+from services import revocation, role_catalog
+from services.cache import CacheServise, get_cache_service
 
 
 class CustomError(AuthJWTException):
@@ -15,30 +23,104 @@ class CustomError(AuthJWTException):
         self.message = message
 
 
+async def is_revoked(cache: CacheServise, token_id: str) -> bool:
+    # Без актуального локального кеша (вне приложения, до первого снимка
+    # или при потере канала) спрашиваем Redis напрямую.
+    local = revocation.revoked_tokens
+    if local is None or not local.loaded:
+        return bool(await cache.get_by_key(token_id))
+    return local.is_revoked(token_id)
+
+
+def decode_token(token: str) -> dict:
+    return get_keyring().decode(token)
+
+
+def token_uuid(claims: dict) -> str:
+    # В компактном профиле uuid лежит под ключом "u".
+    return claims["uuid"] if "uuid" in claims else claims["u"]
+
+
+def has_roles(claims: dict, allowed_roles: list, service: str | None = None) -> bool:
+    if not allowed_roles:
+        return True
+    catalog = role_catalog.catalog
+    bits = claims.get("rb", claims.get("role_bits"))
+    if catalog is not None and catalog.loaded and bits is not None:
+        return catalog.allows(role_catalog.decode_bits(bits), allowed_roles, service)
+    if "roles" not in claims:
+        if catalog is not None and bits is not None:
+            # Каталог еще не загружен: это не отказ в доступе.
+            raise CustomError(
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                message="Каталог ролей недоступен, повторите попытку позже.",
+            )
+        # Компактный токен вне приложения проверить нечем.
+        return False
+    # Токены без маски ролей и проверка вне приложения.
+    user_roles = {role["name"] for role in claims["roles"]}
+    if settings.superrole_name in user_roles:
+        return True
+    if service:
+        user_roles = {
+            role["name"] for role in claims["roles"] if role["service"] == service
+        }
+    return not user_roles.isdisjoint(allowed_roles)
+
+
+async def introspect_tokens(
+    cache: CacheServise, tokens: list[str], allowed_roles: list = []
+) -> list[dict]:
+    """
+    Проверка пачки токенов: подпись и срок локально,
+    отзыв всех jti одним MGET.
+    """
+    results = []
+    valid = []
+    for token in tokens:
+        try:
+            claims = decode_token(token)
+        except jwt.InvalidTokenError as error:
+            results.append({"valid": False, "detail": str(error)})
+            continue
+        if claims.get("type") != "access":
+            results.append({"valid": False, "detail": "Only access tokens are allowed"})
+            continue
+        result = {"valid": True, "uuid": token_uuid(claims)}
+        results.append(result)
+        valid.append((result, claims))
+
+    await role_catalog.ensure_loaded()
+    revoked = await cache.get_by_keys([claims["jti"] for _, claims in valid])
+    for (result, claims), logout_token in zip(valid, revoked):
+        if logout_token:
+            result["detail"] = "Ранее был зарегистрирован выход из системы."
+        else:
+            try:
+                if not has_roles(claims, allowed_roles):
+                    result["detail"] = "Данный ресурс не доступен для вашей роли."
+            except CustomError as error:
+                # Роли не проверить - отказ только этому токену, не всей пачке.
+                result["detail"] = error.message
+        result["valid"] = result.get("detail") is None
+    return results
+
+
 async def check_roles(
     authorize: AuthJWT, cache: CacheServise, allowed_roles: list = []
 ) -> bool:
     await authorize.jwt_required()
     claims = await authorize.get_raw_jwt()
     token_id = claims["jti"]
-    logout_token = await cache.get_by_key(token_id)
-    if logout_token:
+    if await is_revoked(cache, token_id):
         raise CustomError(
             status_code=401,
             message="Ранее был зарегистрирован выход из системы.",
         )
 
-    user_roles = [role["name"] for role in claims["roles"]]
-    user_uuid = claims["uuid"]
-    if not allowed_roles:
-        return user_uuid
-
-    if settings.superrole_name in user_roles:
-        return user_uuid
-
-    for role in allowed_roles:
-        if role in user_roles:
-            return user_uuid
+    await role_catalog.ensure_loaded()
+    if has_roles(claims, allowed_roles):
+        return token_uuid(claims)
 
     raise CustomError(
         status_code=401,
@@ -46,45 +128,88 @@ async def check_roles(
     )
 
 
-async def check_services_and_roles(
-    authorize: AuthJWT,
-    cache: CacheServise,
-    allowed_roles: list = [],
-    service: str = None,
-) -> bool:
-    await authorize.jwt_required()
-    claims = await authorize.get_raw_jwt()
-    token_id = claims["jti"]
-    logout_token = await cache.get_by_key(token_id)
-    user_uuid = claims["uuid"]
-    if logout_token:
-        raise CustomError(
-            status_code=401,
-            message="Ранее был зарегистрирован выход из системы.",
-        )
-    user_roles = claims["roles"]
-    user_roles_name = [role["name"] for role in user_roles]
-
-    if not allowed_roles:
-        return user_uuid
-    if settings.superrole_name in user_roles_name:
-        return user_uuid
-
-    if service:
-        for role in allowed_roles:
-            if role in user_roles_name and role["service"] == service:
-                return user_uuid
+def request_token(request: Request) -> tuple[dict | None, str | None]:
+    """
+    Claims токена из Authorization (подпись и срок проверены) или причина
+    отказа. Токен разбирается один раз за запрос, результат хранится
+    в request.state.
+    """
+    cached = getattr(request.state, "token", None)
+    if cached is None:
+        _, _, token = request.headers.get("Authorization", "").partition(" ")
+        if not token:
+            cached = None, "Missing Authorization Header"
+        else:
+            try:
+                cached = decode_token(token), None
+            except jwt.InvalidTokenError as error:
+                cached = None, str(error)
+        request.state.token = cached
+    return cached
+
+
+class RequireRoles:
+    """
+    Зависимость маршрута: access-токен с одной из ролей allowed_roles
+    (пустой список - любой пользователь). Ставится в dependencies маршрута
+    и разрешается раньше сервисов, так что отказ не открывает сессию БД.
+    Возвращает uuid пользователя.
+    """
 
+    def __init__(self, allowed_roles: list = []):
+        self.allowed_roles = allowed_roles
+
+    async def __call__(
+        self, request: Request, cache: CacheServise = Depends(get_cache_service)
+    ) -> str:
+        claims, error = request_token(request)
+        if claims is None:
+            raise CustomError(status_code=HTTPStatus.UNAUTHORIZED, message=error)
+        if claims.get("type") != "access":
+            raise CustomError(
+                status_code=HTTPStatus.UNAUTHORIZED,
+                message="Only access tokens are allowed",
+            )
+        if await is_revoked(cache, claims["jti"]):
+            raise CustomError(
+                status_code=HTTPStatus.UNAUTHORIZED,
+                message="Ранее был зарегистрирован выход из системы.",
+            )
+        await role_catalog.ensure_loaded()
+        if not has_roles(claims, self.allowed_roles):
+            raise CustomError(
+                status_code=HTTPStatus.FORBIDDEN,
+                message="Данный ресурс не доступен для вашей роли.",
+            )
+        return token_uuid(claims)
+
+
+authenticated = RequireRoles()
+can_view = RequireRoles(settings.roles_view_data)
+can_change = RequireRoles(settings.roles_change_data)
+
+
+def check_service(request: Request, allowed_roles: list, service: str) -> None:
+    """
+    Роль для конкретного сервиса, когда он известен только из тела запроса
+    или БД. Вызывается после RequireRoles с теми же ролями.
+    """
+    claims, _ = request_token(request)
+    if not has_roles(claims, allowed_roles, service):
         raise CustomError(
-            status_code=401,
+            status_code=HTTPStatus.FORBIDDEN,
             message="Данный ресурс не доступен для вашей роли или сервиса.",
         )
 
-    for role in allowed_roles:
-        if role in user_roles_name:
-            return user_uuid
 
-    raise CustomError(
-        status_code=401,
-        message="Данный ресурс не доступен для вашей роли.",
-    )
+def require_service(
+    service_token: str = Header("", alias="X-Service-Token"),
+) -> None:
+    """Зависимость служебных маршрутов: вызов от сервиса с общим секретом."""
+    if not settings.service_token or not secrets.compare_digest(
+        service_token.encode(), settings.service_token.encode()
+    ):
+        raise CustomError(
+            status_code=HTTPStatus.FORBIDDEN,
+            message="Доступно только сервисам.",
+        )
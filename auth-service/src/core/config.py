@@ -22,13 +22,32 @@ class Settings(BaseSettings):
     pstg_host: str = Field("127.0.0.1", alias="POSTGRES_HOST")
     pstg_port: int = Field(5432, alias="POSTGRES_PORT")
     pstg_db_name: str = Field("postgres_db_name", alias="POSTGRES_DB")
+    # Пул соединений у каждого воркера свой: всего до
+    # workers * (pool_size + max_overflow) соединений с БД.
+    pstg_pool_size: int = Field(5, alias="POSTGRES_POOL_SIZE")
+    pstg_max_overflow: int = Field(10, alias="POSTGRES_MAX_OVERFLOW")
+    pstg_pool_timeout: float = Field(30, alias="POSTGRES_POOL_TIMEOUT")
+    pstg_pool_pre_ping: bool = Field(False, alias="POSTGRES_POOL_PRE_PING")
+    pstg_statement_cache_size: int = Field(100, alias="POSTGRES_STATEMENT_CACHE_SIZE")
+    pstg_echo: bool = Field(False, alias="POSTGRES_ECHO")
 
     redis_host: str = Field("127.0.0.1", alias="REDIS_HOST")
     redis_port: int = Field(6379, alias="REDIS_PORT")
 
     authjwt_secret_key: str = Field("secret", alias="SECRET")
+    # HS256 - общий SECRET, RS256 или EdDSA - ключи из jwt_keys_dir, см. core.keys
+    authjwt_algorithm: str = Field("HS256", alias="JWT_ALGORITHM")
+    jwt_keys_dir: str = Field("keys", alias="JWT_KEYS_DIR")
+    jwt_active_kid: str = Field("", alias="JWT_ACTIVE_KID")
+    jwks_max_age: int = Field(300, alias="JWKS_MAX_AGE")
     authjwt_access_token_expires: int = 3600
     authjwt_refresh_token_expires: int = 864000
+    # full - uuid и список ролей в токене, compact - только "u" (uuid) и "rb"
+    # (маска ролей, см. services.role_catalog). Проверяются оба формата.
+    token_claims_profile: str = Field("full", alias="TOKEN_CLAIMS_PROFILE")
+    # Общий секрет сервисов (заголовок X-Service-Token) для списка
+    # отозванных токенов. Пусто - список не выдается никому.
+    service_token: str = Field("", alias="SERVICE_TOKEN")
 
     superrole_name: str = os.environ.get("SUPERROLE_NAME")
     superuser_uuid: str = os.environ.get("SUPERUSER_UUID")
@@ -44,7 +63,89 @@ class Settings(BaseSettings):
     yandex_secret: str = Field("yandex_secret", alias="YANDEX_SECRET")
     yandex_redirect: str = Field("yandex_redirect", alias="YANDEX_REDIRECT")
 
+    # Исходящие запросы к OAuth-провайдерам: соединений всего и на хост,
+    # таймаут запроса, время жизни DNS-кеша и простаивающего соединения,
+    # после скольких ошибок подряд и на сколько секунд хост отключается
+    http_client_limit: int = Field(100, alias="HTTP_CLIENT_LIMIT")
+    http_client_limit_per_host: int = Field(20, alias="HTTP_CLIENT_LIMIT_PER_HOST")
+    http_client_timeout: float = Field(10.0, alias="HTTP_CLIENT_TIMEOUT")
+    http_client_dns_ttl: int = Field(300, alias="HTTP_CLIENT_DNS_TTL")
+    http_client_keepalive: float = Field(30.0, alias="HTTP_CLIENT_KEEPALIVE")
+    http_client_max_failures: int = Field(5, alias="HTTP_CLIENT_MAX_FAILURES")
+    http_client_reset_timeout: float = Field(30.0, alias="HTTP_CLIENT_RESET_TIMEOUT")
+    # Сколько секунд хранить ответ userinfo провайдера по хешу токена
+    oauth_userinfo_cache_expire: int = Field(60, alias="OAUTH_USERINFO_CACHE_EXPIRE")
+    # Адрес заглушки userinfo для провайдера stub (только для замеров)
+    oauth_stub_url: str = Field("", alias="OAUTH_STUB_URL")
+
     enable_tracer: int = Field(1, alias="TRACER")
+    # Доля трассируемых запросов (решение принимается на входе и
+    # наследуется из traceparent), лимиты атрибутов спана и вывод
+    # спанов в консоль (только для отладки)
+    tracer_sample_ratio: float = Field(0.1, alias="TRACER_SAMPLE_RATIO")
+    tracer_max_attributes: int = Field(32, alias="TRACER_MAX_ATTRIBUTES")
+    tracer_max_attribute_length: int = Field(
+        256, alias="TRACER_MAX_ATTRIBUTE_LENGTH"
+    )
+    tracer_console: bool = Field(False, alias="TRACER_CONSOLE")
+
+    # Блокировка входа после неудачных попыток: сколько ошибок допустимо
+    # для логина и для адреса, первая блокировка в секундах (дальше
+    # удваивается), ее предел и сколько секунд помнить ошибки
+    login_max_failures: int = Field(5, alias="LOGIN_MAX_FAILURES")
+    login_ip_max_failures: int = Field(50, alias="LOGIN_IP_MAX_FAILURES")
+    login_lockout_base: float = Field(1.0, alias="LOGIN_LOCKOUT_BASE")
+    login_lockout_max: float = Field(900.0, alias="LOGIN_LOCKOUT_MAX")
+    login_failures_window: int = Field(3600, alias="LOGIN_FAILURES_WINDOW")
+
+    # Как часто воркер сверяет локальные лимиты запросов с общими
+    # счетчиками в Redis, в секундах
+    rate_limit_sync_interval: float = Field(0.5, alias="RATE_LIMIT_SYNC_INTERVAL")
+    # Сети прокси через запятую (CIDR), которым доверяется X-Forwarded-For.
+    # Пусто - адрес клиента берется из соединения.
+    trusted_proxies: str = Field("", alias="TRUSTED_PROXIES")
+
+    # Период полной сверки локального списка отозванных токенов с Redis
+    revoked_resync_interval: int = Field(60, alias="REVOKED_RESYNC_INTERVAL")
+
+    # Партиции login_history по месяцам: сколько создавать заранее и сколько
+    # месяцев хранить (0 - бессрочно)
+    login_history_partitions_ahead: int = Field(
+        3, alias="LOGIN_HISTORY_PARTITIONS_AHEAD"
+    )
+    login_history_retention_months: int = Field(
+        12, alias="LOGIN_HISTORY_RETENTION_MONTHS"
+    )
+    partitions_check_interval: int = Field(6 * 3600, alias="PARTITIONS_CHECK_INTERVAL")
+
+    # Пакетная запись истории входов: размер пачки, период сброса в секундах
+    # и предел буфера на время недоступности БД
+    login_history_batch_size: int = Field(500, alias="LOGIN_HISTORY_BATCH_SIZE")
+    login_history_flush_interval: float = Field(
+        1.0, alias="LOGIN_HISTORY_FLUSH_INTERVAL"
+    )
+    login_history_max_buffer: int = Field(10000, alias="LOGIN_HISTORY_MAX_BUFFER")
+
+    # Импорт пользователей: строк в пачке (одно хеширование пулом, один COPY)
+    # и сколько ошибок по строкам возвращать в ответе
+    user_import_batch_size: int = Field(1000, alias="USER_IMPORT_BATCH_SIZE")
+    user_import_max_errors: int = Field(1000, alias="USER_IMPORT_MAX_ERRORS")
+
+    # Снимки пользователя с ролями для выпуска токенов: записей в локальном
+    # LRU воркера и время жизни снимка в Redis в секундах
+    claims_cache_size: int = Field(10000, alias="CLAIMS_CACHE_SIZE")
+    claims_cache_expire: int = Field(3600, alias="CLAIMS_CACHE_EXPIRE")
+    # Как часто воркер сверяет версию каталога ролей в Redis, в секундах
+    role_catalog_check_interval: float = Field(
+        5.0, alias="ROLE_CATALOG_CHECK_INTERVAL"
+    )
+
+    # thread - хеширование в потоках (hashlib отпускает GIL), process - в процессах
+    hash_executor: str = Field("thread", alias="HASH_EXECUTOR")
+    hash_workers: int = Field(os.cpu_count() or 1, alias="HASH_WORKERS")
+    hash_max_pending: int = Field(64, alias="HASH_MAX_PENDING")
+    # Алгоритм и стоимость хеширования, подобрать: python3 -m benchmarks.hashing
+    password_hash_method: str = Field("scrypt:32768:8:1", alias="PASSWORD_HASH_METHOD")
 
 
 settings = Settings()
@@ -0,0 +1,249 @@
+import asyncio
+import functools
+import secrets
+import time
+
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from http import HTTPStatus
+
+from fastapi import HTTPException
+from werkzeug.security import check_password_hash, generate_password_hash
+
+try:
+    import argon2
+except ImportError:
+    argon2 = None
+
+# Пароли импорта хешируются частями такого размера: проверка пароля при
+# входе ждет в очереди пула не дольше одной части.
+IMPORT_CHUNK_SIZE = 4
+
+
+class PasswordHasher(ABC):
+    """
+    Алгоритм хеширования с параметрами стоимости.
+
+    Параметры задаются строкой метода, например scrypt:32768:8:1,
+    pbkdf2:sha256:600000 или argon2:3:65536:4.
+    """
+
+    name: str
+
+    def __init__(self, method: str):
+        self.method = method
+
+    @abstractmethod
+    def hash(self, password: str) -> str:
+        pass
+
+    @abstractmethod
+    def verify(self, pwhash: str, password: str) -> bool:
+        pass
+
+    @abstractmethod
+    def needs_rehash(self, pwhash: str) -> bool:
+        pass
+
+
+class WerkzeugHasher(PasswordHasher):
+    def __init__(self, method: str):
+        # Werkzeug дополняет сокращенный метод (scrypt, pbkdf2:sha256)
+        # параметрами по умолчанию, с ними и сравниваются хеши.
+        super().__init__(generate_password_hash("", method=method).split("$", 1)[0])
+
+    def hash(self, password: str) -> str:
+        return generate_password_hash(password, method=self.method)
+
+    def verify(self, pwhash: str, password: str) -> bool:
+        return check_password_hash(pwhash, password)
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        return pwhash.split("$", 1)[0] != self.method
+
+
+class Pbkdf2Hasher(WerkzeugHasher):
+    name = "pbkdf2"
+
+
+class ScryptHasher(WerkzeugHasher):
+    name = "scrypt"
+
+
+class Argon2Hasher(PasswordHasher):
+    name = "argon2"
+
+    def __init__(self, method: str):
+        super().__init__(method)
+        names = ("time_cost", "memory_cost", "parallelism")
+        params = dict(zip(names, map(int, method.split(":")[1:])))
+        self.hasher = argon2.PasswordHasher(**params)
+
+    def hash(self, password: str) -> str:
+        return self.hasher.hash(password)
+
+    def verify(self, pwhash: str, password: str) -> bool:
+        try:
+            return self.hasher.verify(pwhash, password)
+        except argon2.exceptions.VerifyMismatchError:
+            return False
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        return self.hasher.check_needs_rehash(pwhash)
+
+
+HASHERS: dict[str, type[PasswordHasher]] = {
+    Pbkdf2Hasher.name: Pbkdf2Hasher,
+    ScryptHasher.name: ScryptHasher,
+}
+if argon2 is not None:
+    HASHERS[Argon2Hasher.name] = Argon2Hasher
+
+
+@functools.lru_cache(maxsize=32)
+def get_hasher(method: str) -> PasswordHasher:
+    name = method.split(":", 1)[0]
+    if name not in HASHERS:
+        raise ValueError(f"Неизвестный алгоритм хеширования: {name}")
+    return HASHERS[name](method)
+
+
+def identify(pwhash: str) -> PasswordHasher:
+    # У argon2 параметры хранятся в самом хеше, для проверки хватает имени.
+    if pwhash.startswith("$argon2"):
+        return get_hasher(Argon2Hasher.name)
+    return get_hasher(pwhash.split("$", 1)[0])
+
+
+def hash_password(method: str, password: str) -> str:
+    return get_hasher(method).hash(password)
+
+
+def hash_many(method: str, passwords: list[str]) -> list[str]:
+    hasher = get_hasher(method)
+    return [hasher.hash(password) for password in passwords]
+
+
+def verify_and_update(
+    method: str, pwhash: str, password: str
+) -> tuple[bool, str | None]:
+    """
+    Проверяет пароль хешером, которым создан pwhash. Если хеш создан
+    не текущим методом, возвращает новый хеш для сохранения.
+    """
+    try:
+        stored = identify(pwhash)
+    except ValueError:
+        # Хеш неизвестной схемы (например, унаследованный) не совпадает.
+        return False, None
+    if not stored.verify(pwhash, password):
+        return False, None
+    hasher = get_hasher(method)
+    if hasher.needs_rehash(pwhash):
+        return True, hasher.hash(password)
+    return True, None
+
+
+class HashingExecutor:
+    """
+    Пул для хеширования и проверки паролей вне event loop.
+
+    Число задач в работе и в очереди ограничено max_pending,
+    при переполнении запрос сразу получает 503. Импорт занимает не
+    больше половины потоков пула и не получает 503, а ждет.
+    """
+
+    def __init__(self, kind: str, workers: int, max_pending: int, method: str):
+        if kind == "process":
+            self.executor: Executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            self.executor: Executor = ThreadPoolExecutor(max_workers=workers)
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self.import_slots = asyncio.Semaphore(max(workers // 2, 1))
+        self.method = get_hasher(method).method
+        self.dummy_hash: str | None = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+
+    async def run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                detail="Сервис перегружен, повторите попытку позже.",
+                headers={"Retry-After": "1"},
+            )
+        return await self.submit(func, *args)
+
+    async def submit(self, func, *args):
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+            self.total_seconds += time.perf_counter() - start
+
+    async def hash_password(self, password: str) -> str:
+        return await self.run(hash_password, self.method, password)
+
+    async def hash_passwords(self, passwords: list[str]) -> list[str]:
+        async def hash_chunk(chunk: list[str]) -> list[str]:
+            async with self.import_slots:
+                return await self.submit(hash_many, self.method, chunk)
+
+        chunks = [
+            passwords[i:i + IMPORT_CHUNK_SIZE]
+            for i in range(0, len(passwords), IMPORT_CHUNK_SIZE)
+        ]
+        results = await asyncio.gather(*(hash_chunk(chunk) for chunk in chunks))
+        return [pwhash for chunk in results for pwhash in chunk]
+
+    async def check_password(self, pwhash: str, password: str) -> bool:
+        verified, _ = await self.verify_and_update(pwhash, password)
+        return verified
+
+    async def verify_and_update(
+        self, pwhash: str, password: str
+    ) -> tuple[bool, str | None]:
+        return await self.run(verify_and_update, self.method, pwhash, password)
+
+    async def verify_dummy(self, password: str) -> bool:
+        """
+        Проверка для несуществующего логина: столько же работы, сколько
+        для существующего, чтобы логины нельзя было перебрать по времени.
+        """
+        pwhash = await self.get_dummy_hash()
+        await self.run(verify_and_update, self.method, pwhash, password)
+        return False
+
+    async def get_dummy_hash(self) -> str:
+        """Хеш случайного пароля текущим методом, один на воркер."""
+        if self.dummy_hash is None:
+            self.dummy_hash = await self.hash_password(secrets.token_hex(16))
+        return self.dummy_hash
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "method": self.method,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "queued": max(self.pending - self.workers, 0),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_seconds": self.total_seconds / self.completed if self.completed else 0,
+        }
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
+
+
+hasher: HashingExecutor | None = None
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import time
+
+from http import HTTPStatus
+from math import ceil
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from fastapi import HTTPException
+
+from core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Размыкатель для одного хоста.
+
+    После max_failures ошибок подряд запросы к хосту сразу получают 503
+    на reset_timeout секунд, затем пропускается один пробный запрос:
+    успех замыкает цепь, ошибка снова размыкает.
+    """
+
+    def __init__(self, max_failures: int, reset_timeout: float):
+        self.max_failures = max_failures
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probing = False
+
+    def retry_after(self) -> float:
+        """0, если запрос можно отправить."""
+        if self.opened_at is None:
+            return 0
+        remaining = self.opened_at + self.reset_timeout - time.monotonic()
+        if remaining > 0:
+            return remaining
+        if self.probing:
+            return self.reset_timeout
+        self.probing = True
+        return 0
+
+    def succeeded(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def failed(self) -> None:
+        self.failures += 1
+        self.probing = False
+        if self.opened_at is not None or self.failures >= self.max_failures:
+            self.opened_at = time.monotonic()
+
+
+class HttpClient:
+    """
+    Общий на воркер клиент для запросов к внешним сервисам.
+
+    Соединения переиспользуются (keep-alive), их число ограничено в целом
+    и на хост, DNS кешируется. Ошибки сети, таймауты и ответы 5xx
+    считаются размыкателем своего хоста.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        limit_per_host: int,
+        timeout: float,
+        dns_ttl: int,
+        keepalive_timeout: float,
+        max_failures: int,
+        reset_timeout: float,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.max_failures = max_failures
+        self.reset_timeout = reset_timeout
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self.session: aiohttp.ClientSession | None = None
+
+    def get_session(self) -> aiohttp.ClientSession:
+        # Сессия создается в работающем event loop.
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector, timeout=self.timeout
+            )
+        return self.session
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        host = urlsplit(url).netloc
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker(
+                self.max_failures, self.reset_timeout
+            )
+        return self.breakers[host]
+
+    async def get_json(self, url: str, **kwargs) -> dict:
+        """
+        GET с разбором JSON. Ответы 4xx поднимают ClientResponseError,
+        недоступность хоста - HTTPException 503.
+        """
+        breaker = self.breaker(url)
+        retry_after = breaker.retry_after()
+        if retry_after:
+            raise HTTPException(
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                detail="Внешний сервис недоступен, повторите попытку позже.",
+                headers={"Retry-After": str(ceil(retry_after))},
+            )
+        # При разомкнутой цепи пропускается только пробный запрос.
+        probe = breaker.opened_at is not None
+        try:
+            async with self.get_session().get(url, **kwargs) as response:
+                if response.status >= 500:
+                    response.raise_for_status()
+                if response.status >= 400:
+                    # Хост отвечает, отказ относится к запросу.
+                    breaker.succeeded()
+                    response.raise_for_status()
+                data = await response.json(content_type=None)
+        except aiohttp.ClientResponseError as error:
+            if error.status < 500:
+                raise
+            breaker.failed()
+            raise self.unavailable(url, error)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as error:
+            # ValueError - ответ не JSON.
+            breaker.failed()
+            raise self.unavailable(url, error)
+        finally:
+            # Пробный запрос, прерванный отменой или другой ошибкой, не
+            # должен оставить цепь разомкнутой навсегда. Запросы, начатые
+            # до размыкания, флаг чужой пробы не трогают.
+            if probe:
+                breaker.probing = False
+        breaker.succeeded()
+        return data
+
+    @staticmethod
+    def unavailable(url: str, error: Exception) -> HTTPException:
+        logger.warning("Ошибка запроса к %s: %r", urlsplit(url).netloc, error)
+        return HTTPException(
+            status_code=HTTPStatus.BAD_GATEWAY,
+            detail="Ошибка внешнего сервиса.",
+        )
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+
+
+client: HttpClient | None = None
+
+
+def get_http_client() -> HttpClient:
+    global client
+    if client is None:
+        client = HttpClient(
+            settings.http_client_limit,
+            settings.http_client_limit_per_host,
+            settings.http_client_timeout,
+            settings.http_client_dns_ttl,
+            settings.http_client_keepalive,
+            settings.http_client_max_failures,
+            settings.http_client_reset_timeout,
+        )
+    return client
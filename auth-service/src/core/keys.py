@@ -0,0 +1,196 @@
+"""
+Ключи подписи токенов.
+
+Для HS* токены подписываются общим SECRET, kid не используется. Для RS256
+и EdDSA закрытые ключи лежат в JWT_KEYS_DIR файлами <kid>.pem: токены
+подписывает ключ JWT_ACTIVE_KID (обязателен, если ключей больше одного),
+остальные проверяют ранее выданные токены. Открытые части всех ключей
+публикуются в /api/v1/auth/jwks.
+
+Ротация:
+    # JWT_ACTIVE_KID=<текущий kid>, если еще не задан
+    python3 -m core.keys generate   # новый ключ, печатает его kid
+    # перезапуск: ключ опубликован в JWKS, но еще не подписывает
+    # выждать JWKS_MAX_AGE, чтобы проверяющие сервисы получили новый ключ
+    # JWT_ACTIVE_KID=<новый kid> и перезапуск: подписывает новый ключ
+    # старый файл удаляется, когда истекут подписанные им refresh-токены
+"""
+import argparse
+import json
+import os
+import secrets
+
+from datetime import datetime, timezone
+from pathlib import Path
+
+import jwt
+
+from async_fastapi_jwt_auth import AuthJWT
+from async_fastapi_jwt_auth.auth_jwt import AuthJWTBearer
+from async_fastapi_jwt_auth.exceptions import InvalidHeaderError, JWTDecodeError
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from jwt.algorithms import get_default_algorithms
+
+from core.config import settings
+
+
+SYMMETRIC_ALGORITHMS = {"HS256", "HS384", "HS512"}
+
+
+class KeyRing:
+    def __init__(
+        self, algorithm: str, secret: str, keys_dir: str, active_kid: str = ""
+    ):
+        self.algorithm = algorithm
+        self.symmetric = algorithm in SYMMETRIC_ALGORITHMS
+        self.secret = secret
+        self.private_keys = {}
+        self.kid = None
+        if self.symmetric:
+            return
+
+        implementation = get_default_algorithms()[algorithm]
+        for path in sorted(Path(keys_dir).glob("*.pem")):
+            key = implementation.prepare_key(path.read_text())
+            if not hasattr(key, "public_key"):
+                raise ValueError(f"{path}: нужен закрытый ключ")
+            self.private_keys[path.stem] = key
+        if not self.private_keys:
+            raise ValueError(f"Нет ключей {algorithm} в {keys_dir}")
+        if not active_kid and len(self.private_keys) > 1:
+            # Иначе новый ключ начал бы подписывать до публикации в JWKS.
+            raise ValueError(f"В {keys_dir} несколько ключей, задайте JWT_ACTIVE_KID")
+        self.kid = active_kid or next(iter(self.private_keys))
+        if self.kid not in self.private_keys:
+            raise ValueError(f"Нет ключа {self.kid} в {keys_dir}")
+        self.public_keys = {
+            kid: key.public_key() for kid, key in self.private_keys.items()
+        }
+
+    @property
+    def signing_key(self):
+        return self.secret if self.symmetric else self.private_keys[self.kid]
+
+    @property
+    def headers(self) -> dict:
+        return {} if self.symmetric else {"kid": self.kid}
+
+    def verification_key(self, token: str):
+        if self.symmetric:
+            return self.secret
+        kid = jwt.get_unverified_header(token).get("kid")
+        if kid not in self.public_keys:
+            raise jwt.InvalidTokenError(f"Неизвестный ключ подписи: {kid}")
+        return self.public_keys[kid]
+
+    def decode(self, token: str, **options) -> dict:
+        return jwt.decode(
+            token,
+            self.verification_key(token),
+            algorithms=[self.algorithm],
+            **options,
+        )
+
+    def jwks(self) -> dict:
+        keys = []
+        if not self.symmetric:
+            implementation = get_default_algorithms()[self.algorithm]
+            for kid, key in self.public_keys.items():
+                jwk = implementation.to_jwk(key, as_dict=True)
+                keys.append({**jwk, "kid": kid, "alg": self.algorithm, "use": "sig"})
+        return {"keys": keys}
+
+
+keyring: KeyRing | None = None
+
+
+def get_keyring() -> KeyRing:
+    global keyring
+    if keyring is None:
+        keyring = KeyRing(
+            settings.authjwt_algorithm,
+            settings.authjwt_secret_key,
+            settings.jwt_keys_dir,
+            settings.jwt_active_kid,
+        )
+    return keyring
+
+
+class KeyRingAuthJWT(AuthJWT):
+    """
+    AuthJWT, который подписывает активным ключом с kid в заголовке
+    и проверяет подпись ключом из kid токена.
+    """
+
+    async def _get_secret_key(self, algorithm: str, process: str):
+        return get_keyring().signing_key
+
+    async def _create_token(self, *args, algorithm=None, headers=None, **kwargs):
+        ring = get_keyring()
+        return await super()._create_token(
+            *args,
+            algorithm=ring.algorithm,
+            headers={**(headers or {}), **ring.headers},
+            **kwargs,
+        )
+
+    async def _verified_token(self, encoded_token: str, issuer: str | None = None):
+        try:
+            key = get_keyring().verification_key(encoded_token)
+        except jwt.InvalidTokenError as err:
+            raise InvalidHeaderError(status_code=422, message=str(err))
+        try:
+            return jwt.decode(
+                encoded_token,
+                key,
+                issuer=issuer,
+                audience=self._decode_audience,
+                leeway=self._decode_leeway,
+                algorithms=[get_keyring().algorithm],
+            )
+        except Exception as err:
+            raise JWTDecodeError(status_code=422, message=str(err))
+
+
+class KeyRingAuthJWTBearer(AuthJWTBearer):
+    def __call__(self, req=None, res=None) -> KeyRingAuthJWT:
+        return KeyRingAuthJWT(req=req, res=res)
+
+
+def generate_key(algorithm: str, keys_dir: str) -> str:
+    if algorithm == "EdDSA":
+        key = ed25519.Ed25519PrivateKey.generate()
+    elif algorithm.startswith(("RS", "PS")):
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        raise ValueError(f"Генерация ключей {algorithm} не поддерживается")
+    # Имена упорядочены по времени создания, суффикс исключает совпадения.
+    kid = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{secrets.token_hex(2)}"
+    path = Path(keys_dir) / f"{kid}.pem"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    path.write_bytes(pem)
+    os.chmod(path, 0o600)
+    return kid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("command", choices=["generate", "jwks"])
+    parser.add_argument("--algorithm", default=settings.authjwt_algorithm)
+    parser.add_argument("--keys-dir", default=settings.jwt_keys_dir)
+    args = parser.parse_args()
+    if args.command == "generate":
+        print(generate_key(args.algorithm, args.keys_dir))
+    else:
+        ring = KeyRing(args.algorithm, "", args.keys_dir)
+        print(json.dumps(ring.jwks(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
-LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LOG_FORMAT = (
+    "%(asctime)s - %(name)s - %(levelname)s - %(request_id)s - %(message)s"
+)
 LOG_DEFAULT_HANDLERS = [
     "console",
 ]
@@ -6,6 +8,9 @@ LOG_DEFAULT_HANDLERS = [
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
+    "filters": {
+        "request_id": {"()": "core.request_context.RequestIdFilter"},
+    },
     "formatters": {
         "verbose": {"format": LOG_FORMAT},
         "default": {
@@ -23,6 +28,7 @@ LOGGING = {
             "level": "DEBUG",
             "class": "logging.StreamHandler",
             "formatter": "verbose",
+            "filters": ["request_id"],
         },
         "default": {
             "formatter": "default",
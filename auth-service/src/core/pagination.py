@@ -0,0 +1,30 @@
+import base64
+import binascii
+import json
+
+from datetime import datetime
+from http import HTTPStatus
+from uuid import UUID
+
+from fastapi import HTTPException
+
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(moment: datetime, obj_id: UUID) -> str:
+    """
+    Курсор страницы: ключ сортировки (время, id) последней выданной записи.
+    """
+    raw = json.dumps([moment.isoformat(), str(obj_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        moment, obj_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(moment), UUID(obj_id)
+    except (binascii.Error, TypeError, ValueError):
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail="Некорректный курсор."
+        )
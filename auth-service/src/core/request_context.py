@@ -0,0 +1,75 @@
+import logging
+import re
+
+from contextvars import ContextVar
+from http import HTTPStatus
+
+import orjson
+
+HEADER = b"x-request-id"
+# Печатные ASCII без пробелов: $request_id nginx, uuid и т.п.
+VALID_ID = re.compile(rb"[\x21-\x7e]{1,128}")
+
+request_id: ContextVar[str] = ContextVar("request_id", default="-")
+
+
+class RequestIdFilter(logging.Filter):
+    """Добавляет в записи лога X-Request-Id текущего запроса."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+
+class RequestContextMiddleware:
+    """
+    ASGI-middleware: проверяет X-Request-Id до маршрутизации.
+
+    Запрос без заголовка (или с некорректным) получает 400 сразу, не
+    доходя до обработчика, БД и хеширования паролей. Принятый id
+    хранится в request_id на время запроса и возвращается в ответе.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        value = None
+        for key, header in scope["headers"]:
+            if key == HEADER:
+                value = header
+                break
+        if value is None:
+            await reject(send, "X-Request-Id is required")
+            return
+        if not VALID_ID.fullmatch(value):
+            await reject(send, "X-Request-Id is invalid")
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                message["headers"] = [*headers, (HEADER, value)]
+            await send(message)
+
+        token = request_id.set(value.decode("ascii"))
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id.reset(token)
+
+
+async def reject(send, detail: str) -> None:
+    body = orjson.dumps({"detail": detail})
+    await send({
+        "type": "http.response.start",
+        "status": HTTPStatus.BAD_REQUEST,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
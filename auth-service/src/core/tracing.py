@@ -0,0 +1,117 @@
+import functools
+
+from opentelemetry import propagate, trace
+from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import SpanLimits, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBasedTraceIdRatio
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+from core import request_context
+from core.config import settings
+
+tracer = trace.get_tracer("auth_service")
+
+
+def build_tracer_provider(
+    sample_ratio: float, max_attributes: int, max_attribute_length: int
+) -> TracerProvider:
+    """
+    Провайдер с выборкой на входе: решение о трассировке принимается
+    один раз для корневого спана, дочерние и вызовы из других сервисов
+    (traceparent) следуют ему. Неотобранные запросы получают
+    незаписываемые спаны без атрибутов и экспорта.
+    """
+    return TracerProvider(
+        resource=Resource(attributes={"service.name": "auth_service"}),
+        sampler=ParentBasedTraceIdRatio(sample_ratio),
+        span_limits=SpanLimits(
+            max_span_attributes=max_attributes,
+            max_span_attribute_length=max_attribute_length,
+        ),
+    )
+
+
+def configure_tracer() -> None:
+    provider = build_tracer_provider(
+        settings.tracer_sample_ratio,
+        settings.tracer_max_attributes,
+        settings.tracer_max_attribute_length,
+    )
+    jaeger_url = f"http://{settings.jaeger_host}:{settings.jaeger_port}"
+    otlp_exporter = OTLPSpanExporter(endpoint=jaeger_url, insecure=True)
+    provider.add_span_processor(BatchSpanProcessor(otlp_exporter))
+    if settings.tracer_console:
+        provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
+    trace.set_tracer_provider(provider)
+
+
+class TracingMiddleware:
+    """
+    ASGI-middleware: один серверный спан на HTTP-запрос.
+
+    Спан закрывается в любом случае, исключение записывается в него.
+    Имя уточняется шаблоном маршрута после обработки, чтобы
+    /users/{user_uuid} не плодил отдельное имя на каждый uuid.
+    """
+
+    def __init__(self, app, tracer_provider: TracerProvider | None = None):
+        self.app = app
+        self.tracer = trace.get_tracer(__name__, tracer_provider=tracer_provider)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = {
+            key.decode("latin-1"): value.decode("latin-1")
+            for key, value in scope["headers"]
+        }
+        method = scope["method"]
+        with self.tracer.start_as_current_span(
+            f"{method} {scope['path']}",
+            context=propagate.extract(headers),
+            kind=SpanKind.SERVER,
+        ) as span:
+            if not span.is_recording():
+                await self.app(scope, receive, send)
+                return
+            span.set_attributes({
+                "http.method": method,
+                "http.target": scope["path"],
+                "http.request_id": request_context.request_id.get(),
+            })
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    span.set_attribute("http.status_code", status)
+                    if status >= 500:
+                        span.set_status(Status(StatusCode.ERROR))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    span.update_name(f"{method} {route.path}")
+                    span.set_attribute("http.route", route.path)
+
+
+def traced(func=None, *, name: str | None = None):
+    """
+    Декоратор корутины: вызов выполняется в дочернем спане текущего
+    запроса. Имя спана по умолчанию - Класс.метод.
+    """
+    if func is None:
+        return functools.partial(traced, name=name)
+    span_name = name or func.__qualname__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        with tracer.start_as_current_span(span_name):
+            return await func(*args, **kwargs)
+
+    return wrapper
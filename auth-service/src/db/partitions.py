@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import re
+
+from datetime import date, datetime
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+TABLE = "login_history"
+# Принимает строки, для которых еще нет месячной партиции.
+DEFAULT_PARTITION = f"{TABLE}_default"
+PARTITION_RE = re.compile(rf"^{TABLE}_(\d{{4}})_(\d{{2}})$")
+# Ключ advisory-блокировки, чтобы воркеры не обслуживали партиции одновременно.
+LOCK_KEY = 7_310_001
+# DETACH ненадолго блокирует login_history целиком: не ждем в очереди за
+# длинными запросами, а повторяем при следующей проверке.
+DETACH_LOCK_TIMEOUT = "5s"
+
+LIST_PARTITIONS_SQL = f"""
+SELECT child.relname
+FROM pg_inherits
+JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+WHERE parent.relname = '{TABLE}'
+"""
+
+# Отсоединенные, но не удаленные партиции (сбой между DETACH и DROP).
+LIST_DETACHED_SQL = f"""
+SELECT relname
+FROM pg_class
+WHERE relkind = 'r'
+  AND NOT relispartition
+  AND relname ~ '^{TABLE}_[0-9]{{4}}_[0-9]{{2}}$'
+"""
+
+
+def month_start(moment: date) -> date:
+    return date(moment.year, moment.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_{month:%Y_%m}"
+
+
+def create_partition_sql(month: date) -> str:
+    """
+    Партиция login_history за календарный месяц [month, month + 1).
+    """
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {TABLE} "
+        f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+    )
+
+
+def create_default_partition_sql() -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"
+    )
+
+
+def range_condition(month: date) -> str:
+    return f"login_datetime >= '{month}' AND login_datetime < '{add_months(month, 1)}'"
+
+
+def count_default_rows_sql(month: date) -> str:
+    return f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE {range_condition(month)}"
+
+
+def attach_partition_sql(month: date) -> list[str]:
+    """
+    Партиция за месяц, строки которого уже попали в DEFAULT: создать
+    партицию рядом с таблицей нельзя, поэтому строки переносятся в
+    отдельную таблицу, которая затем присоединяется.
+    """
+    name = partition_name(month)
+    return [
+        f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)",
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+        f"WHERE {range_condition(month)} RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved",
+        f"ALTER TABLE {TABLE} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')",
+    ]
+
+
+def months_between(first: date, last: date) -> list[date]:
+    months = []
+    month = month_start(first)
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def expired_partitions(names: list[str], today: date, retention: int) -> list[str]:
+    """
+    Партиции, целиком старше retention месяцев. При retention = 0
+    история хранится бессрочно.
+    """
+    if not retention:
+        return []
+    oldest = add_months(month_start(today), -retention)
+    expired = []
+    for name in names:
+        match = PARTITION_RE.match(name)
+        if match and date(int(match[1]), int(match[2]), 1) < oldest:
+            expired.append(name)
+    return sorted(expired)
+
+
+async def create_partition(conn, month: date) -> None:
+    stray = (await conn.execute(text(count_default_rows_sql(month)))).scalar()
+    if not stray:
+        await conn.execute(text(create_partition_sql(month)))
+        return
+    logger.error(
+        "В %s %s записей за %s: партиции %s создаются с опозданием",
+        DEFAULT_PARTITION, stray, f"{month:%Y-%m}", TABLE,
+    )
+    for sql in attach_partition_sql(month):
+        await conn.execute(text(sql))
+
+
+async def drop_partition(engine: AsyncEngine, name: str, attached: bool) -> None:
+    """
+    Отсоединяет партицию в отдельной короткой транзакции и только потом
+    удаляет, чтобы DROP не держал блокировку login_history.
+    """
+    if attached:
+        async with engine.begin() as conn:
+            await conn.execute(
+                text(f"SET LOCAL lock_timeout = '{DETACH_LOCK_TIMEOUT}'")
+            )
+            await conn.execute(text(f"SELECT pg_advisory_xact_lock({LOCK_KEY})"))
+            current = set((await conn.execute(text(LIST_PARTITIONS_SQL))).scalars())
+            if name in current:
+                await conn.execute(
+                    text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+                )
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+
+
+async def rotate(
+    engine: AsyncEngine, ahead: int, retention: int
+) -> tuple[list[str], list[str]]:
+    """
+    Создает партиции на текущий и ahead следующих месяцев и удаляет
+    устаревшие. Возвращает имена созданных и удаленных партиций.
+    """
+    today = datetime.now().date()
+    async with engine.begin() as conn:
+        await conn.execute(text(f"SELECT pg_advisory_xact_lock({LOCK_KEY})"))
+        existing = set((await conn.execute(text(LIST_PARTITIONS_SQL))).scalars())
+        detached = set((await conn.execute(text(LIST_DETACHED_SQL))).scalars())
+        created = []
+        if DEFAULT_PARTITION not in existing:
+            await conn.execute(text(create_default_partition_sql()))
+            created.append(DEFAULT_PARTITION)
+        for month in months_between(today, add_months(month_start(today), ahead)):
+            if partition_name(month) not in existing:
+                await create_partition(conn, month)
+                created.append(partition_name(month))
+    dropped = expired_partitions(list(existing | detached), today, retention)
+    for name in dropped:
+        await drop_partition(engine, name, name in existing)
+    return created, dropped
+
+
+async def run(engine: AsyncEngine) -> None:
+    while True:
+        try:
+            created, dropped = await rotate(
+                engine,
+                settings.login_history_partitions_ahead,
+                settings.login_history_retention_months,
+            )
+            if created or dropped:
+                logger.info(
+                    "Партиции %s: созданы %s, удалены %s", TABLE, created, dropped
+                )
+        except (DBAPIError, OSError) as error:
+            logger.warning("Не удалось обновить партиции %s: %s", TABLE, error)
+        await asyncio.sleep(settings.partitions_check_interval)
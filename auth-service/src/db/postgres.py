@@ -1,5 +1,9 @@
+import time
+
 from core.config import settings
+from sqlalchemy.exc import TimeoutError
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.ext.asyncio import AsyncSession as _AsyncSession
 from typing import AsyncGenerator
@@ -11,12 +15,98 @@ dsn = (
     f"postgresql+asyncpg://{settings.pstg_user}:{settings.pstg_password}@"
     f"{settings.pstg_host}:{settings.pstg_port}/{settings.pstg_db_name}"
 )
-engine = create_async_engine(dsn, echo=True, future=True)
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, который считает время ожидания соединения,
+    выходы за pool_size и отказы по pool_timeout.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.overflow_events = 0
+        self.timeouts = 0
+
+    def _do_get(self):
+        overflow = self.overflow()
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except TimeoutError:
+            self.timeouts += 1
+            raise
+        wait = time.perf_counter() - start
+        self.checkouts += 1
+        self.wait_seconds += wait
+        self.max_wait_seconds = max(self.max_wait_seconds, wait)
+        if self.overflow() > max(overflow, 0):
+            self.overflow_events += 1
+        return conn
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "max_overflow": self._max_overflow,
+            "in_use": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "checkouts": self.checkouts,
+            "avg_wait_seconds": (
+                self.wait_seconds / self.checkouts if self.checkouts else 0
+            ),
+            "max_wait_seconds": self.max_wait_seconds,
+            "overflow_events": self.overflow_events,
+            "timeouts": self.timeouts,
+        }
+
+
+engine = create_async_engine(
+    dsn,
+    echo=settings.pstg_echo,
+    future=True,
+    poolclass=MeteredPool,
+    pool_size=settings.pstg_pool_size,
+    max_overflow=settings.pstg_max_overflow,
+    pool_timeout=settings.pstg_pool_timeout,
+    pool_pre_ping=settings.pstg_pool_pre_ping,
+    connect_args={"prepared_statement_cache_size": settings.pstg_statement_cache_size},
+)
 async_session = sessionmaker(engine, class_=_AsyncSession, expire_on_commit=False)
 
 
+class UnitOfWork:
+    """
+    Сессия одного запроса с явными границами.
+
+    Сервисы фиксируют изменения сами через commit, все незафиксированное
+    к выходу (ошибка или чтение без записи) откатывается, соединение
+    возвращается в пул при закрытии сессии.
+    """
+
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory or async_session
+        self.session: _AsyncSession | None = None
+
+    async def __aenter__(self) -> _AsyncSession:
+        self.session = self.session_factory()
+        return self.session
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        try:
+            if self.session.in_transaction():
+                await self.session.rollback()
+        finally:
+            await self.session.close()
+            self.session = None
+
+
 async def get_session() -> AsyncGenerator[_AsyncSession, None]:
-    async with async_session() as session:
+    # Новая сессия на каждый запрос, общая для всех сервисов этого запроса.
+    async with UnitOfWork() as session:
         yield session
 
 
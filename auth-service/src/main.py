@@ -1,46 +1,69 @@
+import asyncio
 import os
 import uvicorn
 
 from async_fastapi_jwt_auth.exceptions import AuthJWTException
-from fastapi import FastAPI, Request, status
+from fastapi import FastAPI, Request
 from fastapi.responses import ORJSONResponse
-from fastapi_limiter import FastAPILimiter
 from redis.asyncio import Redis
 from contextlib import asynccontextmanager
-from opentelemetry import trace
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.resources import Resource
-from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
-from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
 
-from api.v1 import users, roles, auth
+from api.v1 import users, roles, auth, metrics
+from core import hashing, http_client, request_context, tracing
 from core.config import settings
-from db import redis
-
-
-def configure_tracer() -> None:
-    resource = Resource(attributes={"service.name": "auth_service"})
-    trace.set_tracer_provider(TracerProvider(resource=resource))
-    jaeger_url = f"http://{settings.jaeger_host}:{settings.jaeger_port}"
-    otlp_exporter = OTLPSpanExporter(endpoint=jaeger_url, insecure=True)
-    span_processor = BatchSpanProcessor(otlp_exporter)
-    trace.get_tracer_provider().add_span_processor(span_processor)
-    trace.get_tracer_provider().add_span_processor(
-        BatchSpanProcessor(ConsoleSpanExporter())
-    )
+from db import partitions, redis
+from db.postgres import async_session, engine
+from services import claims, login_events, rate_limit, revocation, role_catalog
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     redis.redis = Redis(host=settings.redis_host, port=settings.redis_port)
-    await FastAPILimiter.init(redis.redis)
+    rate_limit.limiter = rate_limit.HybridRateLimiter(
+        redis.redis, settings.rate_limit_sync_interval
+    )
+    limits_sync = asyncio.create_task(rate_limit.limiter.run())
+    revocation.revoked_tokens = revocation.RevokedTokensCache(redis.redis)
+    revoked_listener = asyncio.create_task(revocation.revoked_tokens.run())
+    claims.claims_cache = claims.ClaimsCache(
+        redis.redis, settings.claims_cache_size, settings.claims_cache_expire
+    )
+    partitions_rotator = asyncio.create_task(partitions.run(engine))
+    role_catalog.catalog = role_catalog.RoleCatalog(async_session, redis.redis)
+    # Компактные токены проверяются по каталогу: загружаем его до приема
+    # запросов (при ошибке - повторно при первой проверке ролей).
+    await role_catalog.ensure_loaded()
+    catalog_refresher = asyncio.create_task(role_catalog.catalog.run())
+    login_events.writer = login_events.LoginHistoryWriter(
+        async_session,
+        settings.login_history_batch_size,
+        settings.login_history_flush_interval,
+        settings.login_history_max_buffer,
+    )
+    login_writer = asyncio.create_task(login_events.writer.run())
+    # Пул исходящих соединений к провайдерам живет все время работы воркера.
+    http_client.get_http_client().get_session()
+    hashing.hasher = hashing.HashingExecutor(
+        settings.hash_executor,
+        settings.hash_workers,
+        settings.hash_max_pending,
+        settings.password_hash_method,
+    )
     # Раскомментить для локального запуска.
     # os.system('alembic revision --autogenerate -m "Initial tables"')
     # os.system('alembic upgrade head')
     # os.system('python3 create_superuser.py')
     yield
+    background = [revoked_listener, partitions_rotator, catalog_refresher, limits_sync]
+    for task in background:
+        task.cancel()
+    # Дожидаемся отмены, чтобы задачи не обращались к закрытому Redis.
+    await asyncio.gather(*background, return_exceptions=True)
+    # Дописываем накопленную историю входов до остановки воркера.
+    await login_events.writer.close(login_writer)
     await redis.redis.close()
+    await http_client.get_http_client().close()
+    hashing.hasher.shutdown()
 
 
 app = FastAPI(
@@ -53,21 +76,14 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
-if settings.enable_tracer:
-    configure_tracer()
-    FastAPIInstrumentor.instrument_app(app)
 
+if settings.enable_tracer:
+    tracing.configure_tracer()
+    app.add_middleware(tracing.TracingMiddleware)
 
-@app.middleware("http")
-async def before_request(request: Request, call_next):
-    response = await call_next(request)
-    request_id = request.headers.get("X-Request-Id")
-    if not request_id:
-        return ORJSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            content={"detail": "X-Request-Id is required"},
-        )
-    return response
+# Добавлен последним - внешний слой: запрос без X-Request-Id отклоняется
+# до обработчика и трассировки.
+app.add_middleware(request_context.RequestContextMiddleware)
 
 
 @app.exception_handler(AuthJWTException)
@@ -78,6 +94,7 @@ def authjwt_exception_handler(request: Request, exc: AuthJWTException):
 app.include_router(users.router, prefix="/api/v1/users", tags=["Пользователи"])
 app.include_router(roles.router, prefix="/api/v1/roles", tags=["Роли"])
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Авторизация"])
+app.include_router(metrics.router, prefix="/api/v1/metrics", tags=["Метрики"])
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -1,5 +1,4 @@
 # models/entity.py
-import random
 import uuid
 from datetime import datetime
 
@@ -9,26 +8,34 @@ from sqlalchemy import (
     String,
     Table,
     ForeignKey,
+    Index,
+    Integer,
+    Sequence,
     UniqueConstraint,
     PrimaryKeyConstraint,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
-from werkzeug.security import check_password_hash, generate_password_hash
 
 from db.postgres import Base
 
 
+# Номер бита роли в маске ролей токена. Номера не переиспользуются, чтобы
+# выданные до удаления роли токены не получили права новой роли.
+role_bit_seq = Sequence("roles_bit_seq", start=0, minvalue=0)
+
 user_role = Table(
     "user_role",
     Base.metadata,
-    Column("user_id", ForeignKey("users.id"), primary_key=True),
-    Column("role_id", ForeignKey("roles.id"), primary_key=True),
+    Column("user_id", ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    Column("role_id", ForeignKey("roles.id", ondelete="CASCADE"), primary_key=True),
 )
 
 
 class User(Base):
     __tablename__ = "users"
+    # Ключ постраничной выдачи списка пользователей.
+    __table_args__ = (Index("ix_users_created_at_id", "created_at", "id"),)
 
     id = Column(
         UUID(as_uuid=True),
@@ -41,24 +48,27 @@ class User(Base):
     password = Column(String(255), nullable=False)
     first_name = Column(String(50))
     last_name = Column(String(50))
-    created_at = Column(DateTime, default=datetime.now)
-    refresh_token = Column(String(1000))
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    # Связи не загружаются неявно: нужные подгружаются опциями запроса
+    # (selectinload), удаление каскадом выполняет сама БД.
     roles = relationship(
-        "Role", secondary=user_role, back_populates="users", lazy="joined"
+        "Role",
+        secondary=user_role,
+        back_populates="users",
+        lazy="raise",
+        passive_deletes=True,
     )
-    login_history = relationship("LoginHistory", lazy="joined")
+    login_history = relationship("LoginHistory", lazy="raise", passive_deletes=True)
 
     def __init__(
         self, login: str, password: str, first_name: str, last_name: str
     ) -> None:
+        # Пароль приходит уже захешированным, см. core.hashing.
         self.login = login
-        self.password = self.password = generate_password_hash(password)
+        self.password = password
         self.first_name = first_name
         self.last_name = last_name
 
-    def check_password(self, password: str) -> bool:
-        return check_password_hash(self.password, password)
-
     def __repr__(self) -> str:
         return f"<User {self.login}>"
 
@@ -75,8 +85,19 @@ class Role(Base):
     )
     name = Column(String(50))
     service = Column(String(50))
+    bit = Column(
+        Integer,
+        role_bit_seq,
+        server_default=role_bit_seq.next_value(),
+        unique=True,
+        nullable=False,
+    )
     users = relationship(
-        "User", secondary=user_role, back_populates="roles", lazy="joined"
+        "User",
+        secondary=user_role,
+        back_populates="roles",
+        lazy="raise",
+        passive_deletes=True,
     )
 
     __table_args__ = (UniqueConstraint("name", "service", name="_name_service_uc"),)
@@ -92,9 +113,18 @@ class Role(Base):
 class LoginHistory(Base):
     __tablename__ = "login_history"
     __table_args__ = (
-        PrimaryKeyConstraint("id", "random_tag"),
+        # Ключ партиционирования обязан входить в первичный ключ.
+        PrimaryKeyConstraint("id", "login_datetime"),
+        # Ключ постраничной выдачи истории входов пользователя.
+        Index(
+            "ix_login_history_user_id_login_datetime_id",
+            "user_id",
+            "login_datetime",
+            "id",
+        ),
         {
-            "postgresql_partition_by": "LIST (random_tag)",
+            # Партиции по месяцам ведет db.partitions.
+            "postgresql_partition_by": "RANGE (login_datetime)",
         },
     )
 
@@ -104,12 +134,14 @@ class LoginHistory(Base):
         nullable=False,
     )
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
-    login_datetime = Column(DateTime, default=datetime.now)
-    random_tag = Column(String(50), default=random.choice(["left", "right"]))
+    login_datetime = Column(DateTime, default=datetime.now, nullable=False)
 
 
 class LoginNetwork(Base):
     __tablename__ = "login_network"
+    __table_args__ = (
+        UniqueConstraint("user_id", "network", name="_user_network_uc"),
+    )
 
     id = Column(
         UUID(as_uuid=True),
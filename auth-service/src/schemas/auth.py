@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class Login(BaseModel):
@@ -35,6 +35,36 @@ class CheckRoles(BaseModel):
     roles: list = []
 
 
+class CheckAuthBatch(BaseModel):
+    tokens: list[str] = Field(max_length=1000)
+    roles: list = []
+
+
+class TokenVerdict(BaseModel):
+    valid: bool
+    uuid: str | None = None
+    detail: str | None = None
+
+
+class CheckAuthBatchResponse(BaseModel):
+    results: list[TokenVerdict]
+
+
+class RevokedTokens(BaseModel):
+    tokens: dict[str, int]
+
+
+class JWKS(BaseModel):
+    keys: list[dict]
+
+
+class NetworkUser(BaseModel):
+    id: str
+    login: str = ""
+    first_name: str = ""
+    last_name: str = ""
+
+
 class YandexResponse(BaseModel):
     id: str
     login: str
@@ -0,0 +1,36 @@
+from pydantic import BaseModel
+
+
+class HashingMetrics(BaseModel):
+    kind: str
+    method: str
+    workers: int
+    max_pending: int
+    pending: int
+    queued: int
+    completed: int
+    rejected: int
+    avg_seconds: float
+
+
+class LoginHistoryMetrics(BaseModel):
+    buffered: int
+    batch_size: int
+    flush_interval: float
+    written: int
+    flushes: int
+    failed: int
+    dropped: int
+
+
+class DbPoolMetrics(BaseModel):
+    size: int
+    max_overflow: int
+    in_use: int
+    idle: int
+    overflow: int
+    checkouts: int
+    avg_wait_seconds: float
+    max_wait_seconds: float
+    overflow_events: int
+    timeouts: int
@@ -1,5 +1,6 @@
 from datetime import datetime
 from pydantic import BaseModel, Field
+from uuid import UUID
 
 from schemas.base import MyBaseModel
 from schemas.roles import RoleSchema
@@ -38,3 +39,33 @@ class UserLoginsSchema(UserSchema):
 class SecondaryUserRole(BaseModel):
     user_id: str
     role_id: str
+
+
+class BulkUserRole(BaseModel):
+    role_id: UUID
+    user_ids: list[UUID] = Field(min_length=1, max_length=10000)
+
+
+class BulkUserRoleResult(BaseModel):
+    role_id: UUID
+    requested: int
+    changed: int
+
+
+class UserImportError(BaseModel):
+    line: int
+    detail: str
+
+
+class UserImportProgress(BaseModel):
+    processed: int = 0
+    created: int = 0
+    failed: int = 0
+    done: bool = False
+
+
+class UserImportResult(BaseModel):
+    processed: int = 0
+    created: int = 0
+    failed: int = 0
+    errors: list[UserImportError] = []
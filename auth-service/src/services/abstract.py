@@ -44,6 +44,20 @@ class AbstractGetList(ABC):
         pass
 
 
+class AbstractGetPage(ABC):
+    @abstractmethod
+    async def db_table(self, model):
+        pass
+
+    @abstractmethod
+    async def return_model_list(self, model: BaseModel):
+        pass
+
+    @abstractmethod
+    async def get_page(self, limit: int, cursor: str | None):
+        pass
+
+
 class AbstractUpdateById(ABC):
     @abstractmethod
     async def db_table(self, model):
@@ -85,10 +99,6 @@ class AbstractGetUserAndUpdate(ABC):
     async def get(self, login: str, password: str):
         pass
 
-    @abstractmethod
-    async def update(self, obj, refresh_token: str):
-        pass
-
 
 class AbstractCreateSecondary:
     @abstractmethod
@@ -109,8 +119,22 @@ class AbstractGetByKey(ABC):
     async def get_by_key(self, key: str, cache_expire: int):
         pass
 
+    @abstractmethod
+    async def get_by_keys(self, keys: list[str]):
+        pass
+
 
 class AbstractSetKey(ABC):
     @abstractmethod
     async def set_key(self, key: str, seconds: int):
         pass
+
+
+class AbstractRevokeToken(ABC):
+    @abstractmethod
+    async def revoke_token(self, token_id: str, exp: int):
+        pass
+
+    @abstractmethod
+    async def get_revoked_tokens(self):
+        pass
@@ -1,20 +1,43 @@
-import aiohttp
+import secrets
+import string
+import uuid
 
-from functools import lru_cache
+from datetime import datetime
+from functools import partial
+
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import selectinload
 from fastapi import Depends
 from pydantic import BaseModel
 from async_fastapi_jwt_auth import AuthJWT
 
+from core import hashing
+from core.config import settings
+from core.tracing import traced
 from db.postgres import get_session
 from models.entity import User, LoginNetwork
-from schemas.auth import LoginResponse, Login, YandexResponse
-from schemas.users import UserRolesSchema, RoleSchema, UserSchema
+from schemas.auth import LoginResponse, Login, NetworkUser
+from schemas.users import UserRolesSchema, RoleSchema
+from services import claims, role_catalog
 from services.base import BaseLogin
 
 
+def build_claims(user: UserRolesSchema, bits: int | None, profile: str) -> dict:
+    # Компактному профилю нужна маска: без каталога ролей выпускаем полный.
+    if profile == "compact" and bits is not None:
+        return {"u": str(user.uuid), "rb": role_catalog.encode_bits(bits)}
+    user_for_claims = user.model_dump(mode="json")
+    user_claims = {
+        "uuid": user_for_claims["uuid"],
+        "roles": user_for_claims["roles"],
+    }
+    if bits is not None:
+        user_claims["role_bits"] = role_catalog.encode_bits(bits)
+    return user_claims
+
+
 class AuthService(BaseLogin):
     db_table = User
     return_model_login: BaseModel = LoginResponse
@@ -22,29 +45,11 @@ class AuthService(BaseLogin):
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get(self, user: Login) -> UserRolesSchema | None:
-        result = await self.session.execute(
-            select(self.db_table)
-            .where(self.db_table.login == user.login)
-            .options(joinedload(self.db_table.roles))
-        )
-        obj = result.scalars().first()
-        if not obj:
-            return False
-        if obj.check_password(user.password):
-            dict_obj = obj.__dict__
-            roles = []
-            for role in dict_obj["roles"]:
-                roles.append(RoleSchema(**role.__dict__))
-            dict_obj["roles"] = roles
-            return UserRolesSchema(**dict_obj)
-        return False
-
-    async def get_by_login(self, login: str) -> UserRolesSchema | None:
+    async def load_claims(self, condition) -> UserRolesSchema | None:
         result = await self.session.execute(
             select(self.db_table)
-            .where(self.db_table.login == login)
-            .options(joinedload(self.db_table.roles))
+            .where(condition)
+            .options(selectinload(self.db_table.roles))
         )
         obj = result.scalars().first()
         if not obj:
@@ -56,53 +61,117 @@ class AuthService(BaseLogin):
         dict_obj["roles"] = roles
         return UserRolesSchema(**dict_obj)
 
-    async def update(self, user_id: str, refresh_token: str):
-        obj = await self.session.get(self.db_table, user_id)
-        obj.refresh_token = refresh_token
-        await self.session.commit()
+    @traced
+    async def get_claims(self, user_id) -> UserRolesSchema | None:
+        """
+        Пользователь с ролями для выпуска токенов, из кеша снимков,
+        если он запущен.
+        """
+        load = partial(self.load_claims, self.db_table.id == user_id)
+        if claims.claims_cache is None:
+            return await load()
+        return await claims.claims_cache.get(user_id, load)
 
-    async def get_refresh_token(self, obj_id: str) -> str | None:
-        obj = await self.session.get(self.db_table, obj_id)
-        if not obj:
-            return None
-        return obj.refresh_token
-
-    async def get_yandex_token(self, token) -> YandexResponse:
-        url = "https://login.yandex.ru/info"
-        params = {"format": "json"}
-        headers = {"Authorization": f"OAuth {token}"}
-        timeout = aiohttp.ClientTimeout(total=20)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.get(url, headers=headers, params=params) as response:
-                response = await response.json()
-        return YandexResponse(**response)
-
-    async def create_network(self, user_uuid, network) -> None:
+    @traced
+    async def get(self, user: Login) -> UserRolesSchema | None:
         result = await self.session.execute(
-            select(LoginNetwork)
-            .where(LoginNetwork.user_id == user_uuid,
-                   LoginNetwork.network == network)
+            select(self.db_table).where(self.db_table.login == user.login)
         )
-        network_obj = result.scalars().first()
-        if not network_obj:
-            new_obj = LoginNetwork(user_id=user_uuid, network=network)
-            self.session.add(new_obj)
+        obj = result.scalars().first()
+        if not obj:
+            return await hashing.hasher.verify_dummy(user.password)
+        verified, new_hash = await hashing.hasher.verify_and_update(
+            obj.password, user.password
+        )
+        if not verified:
+            return False
+        if new_hash:
+            obj.password = new_hash
             await self.session.commit()
+        return await self.get_claims(obj.id)
+
+    async def get_by_login(self, login: str) -> UserRolesSchema | None:
+        if claims.claims_cache is None:
+            return await self.load_claims(self.db_table.login == login)
+        result = await self.session.execute(
+            select(self.db_table.id).where(self.db_table.login == login)
+        )
+        user_id = result.scalar()
+        if not user_id:
+            return None
+        return await self.get_claims(user_id)
+
+    @traced
+    async def upsert_network_user(
+        self, network: str, user_info: NetworkUser
+    ) -> UserRolesSchema:
+        """
+        Пользователь соцсети по логину: находит или создает его и привязывает
+        сеть одной транзакцией. Созданному пользователю ставится хеш
+        случайного пароля, войти по паролю он не может.
+        """
+        login = user_info.login or "".join(
+            secrets.choice(string.ascii_lowercase) for _ in range(10)
+        )
+        password = await hashing.hasher.get_dummy_hash()
+        user_id = await self.session.scalar(
+            insert(User)
+            .values(
+                id=uuid.uuid4(),
+                login=login,
+                password=password,
+                first_name=user_info.first_name[:50],
+                last_name=user_info.last_name[:50],
+                created_at=datetime.now(),
+            )
+            .on_conflict_do_nothing(index_elements=[User.login])
+            .returning(User.id)
+        )
+        if user_id is None:
+            # Пользователь уже есть: RETURNING пуст, строку не трогаем.
+            user_id = await self.session.scalar(
+                select(User.id).where(User.login == login)
+            )
+        await self.session.execute(
+            insert(LoginNetwork)
+            .values(id=uuid.uuid4(), user_id=user_id, network=network)
+            .on_conflict_do_nothing(
+                index_elements=[LoginNetwork.user_id, LoginNetwork.network]
+            )
+        )
+        await self.session.commit()
+        return await self.get_claims(user_id)
+
+    async def token_claims(self, user: UserRolesSchema) -> dict:
+        """
+        Claims токенов пользователя в профиле token_claims_profile. Маска
+        ролей добавляется, если запущен каталог ролей.
+        """
+        bits = None
+        if role_catalog.catalog is not None:
+            bits = await role_catalog.catalog.role_bits(
+                [role.uuid for role in user.roles]
+            )
+        return build_claims(user, bits, settings.token_claims_profile)
 
-    async def create_tokens(self, user: UserSchema, authorize: AuthJWT) -> YandexResponse:
+    @traced
+    async def create_tokens(
+        self, user: UserRolesSchema, authorize: AuthJWT, family: str
+    ) -> LoginResponse:
+        """
+        Пара токенов семейства family (sid), см. services.refresh_tokens.
+        """
         subject = f"{user.login}"
-        user_for_claims = user.model_dump(mode="json")
-        claims = {"uuid": user_for_claims["uuid"], "roles": user_for_claims["roles"]}
+        user_claims = {**await self.token_claims(user), "sid": family}
 
         access_token = await authorize.create_access_token(
-            subject=subject, user_claims=claims
+            subject=subject, user_claims=user_claims
         )
         refresh_token = await authorize.create_refresh_token(
-            subject=subject, user_claims=claims
+            subject=subject, user_claims=user_claims
         )
         return LoginResponse(access_token=access_token, refresh_token=refresh_token)
 
 
-@lru_cache()
 def get_auth_service(db_session: AsyncSession = Depends(get_session)) -> AuthService:
     return AuthService(db_session)
@@ -1,11 +1,15 @@
+import time
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy import tuple_
 from sqlalchemy.future import select
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import selectinload
 from pydantic import BaseModel
 from redis.asyncio import Redis
-from werkzeug.security import generate_password_hash
-
+from core import hashing
+from core.pagination import decode_cursor, encode_cursor
+from core.tracing import traced
 from db.postgres import Base
 from services import abstract as abs
 
@@ -17,6 +21,7 @@ class BaseGetById(abs.AbstractGetById):
     def __init__(self, session: AsyncSession):
         self.session = session
 
+    @traced
     async def get_by_id(self, obj_id: str) -> BaseModel | None:
         obj = await self.session.get(self.db_table, obj_id)
         if not obj:
@@ -48,6 +53,7 @@ class BaseGetList(abs.AbstractGetList):
     def __init__(self, session: AsyncSession):
         self.session = session
 
+    @traced
     async def get_list(self, limit: int, offset: int) -> list[BaseModel]:
         data = await self.session.execute(
             select(self.db_table).limit(limit).offset(offset)
@@ -56,6 +62,53 @@ class BaseGetList(abs.AbstractGetList):
         return [self.return_model_list(**obj.__dict__) for obj in objs]
 
 
+class BaseGetPage(abs.AbstractGetPage):
+    """
+    Постраничная выдача по ключу (cursor_column, id) вместо OFFSET.
+
+    Страница начинается строго после последней записи предыдущей, поэтому
+    по индексу на ключ любая страница стоит столько же, сколько первая.
+    """
+
+    db_table = Base
+    return_model_list = BaseModel
+    cursor_column = "created_at"
+    descending = False
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    def page_query(self, query, limit: int, cursor: str | None):
+        moment = getattr(self.db_table, self.cursor_column)
+        key = tuple_(moment, self.db_table.id)
+        if cursor:
+            last = decode_cursor(cursor)
+            query = query.where(key < last if self.descending else key > last)
+        if self.descending:
+            query = query.order_by(moment.desc(), self.db_table.id.desc())
+        else:
+            query = query.order_by(moment, self.db_table.id)
+        # Лишняя запись показывает, есть ли следующая страница.
+        return query.limit(limit + 1)
+
+    def next_cursor(self, objs: list, limit: int) -> str | None:
+        if len(objs) <= limit:
+            return None
+        last = objs[limit - 1]
+        return encode_cursor(getattr(last, self.cursor_column), last.id)
+
+    async def get_page(
+        self, limit: int, cursor: str | None, *where
+    ) -> tuple[list[BaseModel], str | None]:
+        # where - условия отбора, общие для всех страниц.
+        data = await self.session.execute(
+            self.page_query(select(self.db_table).where(*where), limit, cursor)
+        )
+        objs = data.scalars().all()
+        page = [self.return_model_list(**obj.__dict__) for obj in objs[:limit]]
+        return page, self.next_cursor(objs, limit)
+
+
 class BaseUpdate(abs.AbstractUpdateById):
     db_table = Base
     return_model_update = BaseModel
@@ -68,8 +121,8 @@ class BaseUpdate(abs.AbstractUpdateById):
         if not obj:
             return None
         for k, v in fields.model_dump().items():
-            if k == "password":
-                v = generate_password_hash(v)
+            if k == "password" and v:
+                v = await hashing.hasher.hash_password(v)
             if v:
                 setattr(obj, k, v)
         await self.session.commit()
@@ -103,23 +156,21 @@ class BaseLogin(abs.AbstractGetUserAndUpdate):
         result = await self.session.execute(
             select(self.db_table)
             .where(self.db_table.login == user.login)
-            .options(joinedload(self.db_table.roles))
+            .options(selectinload(self.db_table.roles))
         )
         obj = result.scalars().first()
-        print(obj)
         if not obj:
             return False
-        if obj.check_password(user.password):
+        verified, new_hash = await hashing.hasher.verify_and_update(
+            obj.password, user.password
+        )
+        if verified:
+            if new_hash:
+                obj.password = new_hash
+                await self.session.commit()
             return obj
         return False
 
-    async def update(self, obj, refresh_token: str):
-        obj.refresh_token = refresh_token
-        await self.session.commit()
-        history = self.db_table_history(user_id=obj.id)
-        self.session.add(history)
-        await self.session.commit()
-
 
 class BaseGetByKey(abs.AbstractGetByKey):
     def __init__(self, redis: Redis):
@@ -129,6 +180,11 @@ class BaseGetByKey(abs.AbstractGetByKey):
         value = await self.redis.get(key)
         return value
 
+    async def get_by_keys(self, keys: list[str]) -> list:
+        if not keys:
+            return []
+        return await self.redis.mget(keys)
+
 
 class BaseSetKey(abs.AbstractSetKey):
     def __init__(self, redis: Redis):
@@ -136,3 +192,28 @@ class BaseSetKey(abs.AbstractSetKey):
 
     async def set_key(self, key: str, seconds: int):
         await self.redis.set(key, 1, seconds)
+
+
+class BaseRevokeToken(abs.AbstractRevokeToken):
+    revoked_key = "revoked_tokens"
+    revoked_channel = "revoked_tokens"
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    async def revoke_token(self, token_id: str, exp: int):
+        # Ключ jti для проверки в check_roles и общий список для
+        # синхронизации сервисов, проверяющих токены локально.
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(token_id, 1, max(exp - int(time.time()), 1))
+            pipe.zadd(self.revoked_key, {token_id: exp})
+            pipe.publish(self.revoked_channel, f"{token_id}:{exp}")
+            await pipe.execute()
+
+    async def get_revoked_tokens(self) -> dict[str, int]:
+        now = int(time.time())
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(self.revoked_key, "-inf", now)
+            pipe.zrangebyscore(self.revoked_key, now, "+inf", withscores=True)
+            _, tokens = await pipe.execute()
+        return {token_id.decode(): int(exp) for token_id, exp in tokens}
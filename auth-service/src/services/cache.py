@@ -3,10 +3,10 @@ from fastapi import Depends
 from redis.asyncio import Redis
 
 from db.redis import get_redis
-from services.base import BaseSetKey, BaseGetByKey
+from services.base import BaseSetKey, BaseGetByKey, BaseRevokeToken
 
 
-class CacheServise(BaseSetKey, BaseGetByKey):
+class CacheServise(BaseSetKey, BaseGetByKey, BaseRevokeToken):
     def __init__(self, redis: Redis):
         self.redis = redis
 
@@ -0,0 +1,101 @@
+import json
+
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from redis.asyncio import Redis
+
+from schemas.users import UserRolesSchema
+
+
+class ClaimsCache:
+    """
+    Снимок пользователя с ролями для выпуска токенов.
+
+    Снимок лежит в Redis и в локальном LRU воркера. Его версия состоит
+    из общей эпохи, которая растет при изменении ролей, и версии
+    пользователя, которая растет при изменении пользователя или его ролей.
+    Снимок с устаревшей версией не используется, поэтому для проверки
+    локальной копии хватает одного MGET двух счетчиков.
+    """
+
+    epoch_key = "claims_epoch"
+    version_key = "claims_version:{}"
+    snapshot_key = "claims:{}"
+
+    def __init__(self, redis: Redis, size: int, expire: int):
+        self.redis = redis
+        self.size = size
+        self.expire = expire
+        self.local: OrderedDict[str, tuple[str, UserRolesSchema]] = OrderedDict()
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    async def version(self, user_id: str) -> str:
+        epoch, version = await self.redis.mget(
+            self.epoch_key, self.version_key.format(user_id)
+        )
+        return f"{int(epoch or 0)}:{int(version or 0)}"
+
+    def remember(self, user_id: str, version: str, snapshot: UserRolesSchema) -> None:
+        self.local[user_id] = (version, snapshot)
+        self.local.move_to_end(user_id)
+        if len(self.local) > self.size:
+            self.local.popitem(last=False)
+
+    async def get(
+        self, user_id, load: Callable[[], Awaitable[UserRolesSchema | None]]
+    ) -> UserRolesSchema | None:
+        user_id = str(user_id)
+        # Версия читается до загрузки: если пользователя изменят во время
+        # загрузки, снимок сохранится со старой версией и не будет использован.
+        version = await self.version(user_id)
+        cached = self.local.get(user_id)
+        if cached and cached[0] == version:
+            self.local.move_to_end(user_id)
+            self.local_hits += 1
+            return cached[1]
+
+        data = await self.redis.get(self.snapshot_key.format(user_id))
+        if data:
+            stored = json.loads(data)
+            if stored["version"] == version:
+                snapshot = UserRolesSchema.model_validate(stored["user"])
+                self.remember(user_id, version, snapshot)
+                self.redis_hits += 1
+                return snapshot
+
+        self.misses += 1
+        snapshot = await load()
+        if snapshot is None:
+            return None
+        data = {"version": version, "user": snapshot.model_dump(mode="json")}
+        await self.redis.set(
+            self.snapshot_key.format(user_id), json.dumps(data), self.expire
+        )
+        self.remember(user_id, version, snapshot)
+        return snapshot
+
+    async def invalidate_users(self, user_ids: list) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.incr(self.version_key.format(user_id))
+            await pipe.execute()
+
+    async def invalidate_all(self) -> None:
+        await self.redis.incr(self.epoch_key)
+
+
+claims_cache: ClaimsCache | None = None
+
+
+async def invalidate_users(*user_ids) -> None:
+    # Без кеша (вне приложения) сбрасывать нечего.
+    if claims_cache is not None and user_ids:
+        await claims_cache.invalidate_users(list(user_ids))
+
+
+async def invalidate_all() -> None:
+    if claims_cache is not None:
+        await claims_cache.invalidate_all()
@@ -0,0 +1,88 @@
+from http import HTTPStatus
+from math import ceil
+
+from fastapi import Depends, HTTPException
+from redis.asyncio import Redis
+
+from core.config import settings
+from db.redis import get_redis
+
+
+class LoginAttempts:
+    """
+    Неудачные входы по логину и по адресу клиента.
+
+    Счетчик живет window секунд с последней ошибки. Когда он доходит до
+    max_failures, ключ блокируется на base секунд, и каждая следующая
+    ошибка удваивает блокировку до max_lockout. Блокировка проверяется до
+    запроса в БД и хеширования пароля. Успешный вход сбрасывает счетчик
+    логина, счетчик адреса истекает сам.
+    """
+
+    failures_key = "login_failures:{}:{}"
+    lock_key = "login_lock:{}:{}"
+
+    def __init__(
+        self,
+        redis: Redis,
+        max_failures: dict[str, int],
+        base: float,
+        max_lockout: float,
+        window: int,
+    ):
+        self.redis = redis
+        self.max_failures = max_failures
+        self.base = base
+        self.max_lockout = max_lockout
+        self.window = window
+
+    def lockout(self, failures: int, max_failures: int) -> float:
+        if failures < max_failures:
+            return 0
+        return min(self.base * 2 ** (failures - max_failures), self.max_lockout)
+
+    async def check(self, login: str, ip: str) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.pttl(self.lock_key.format("login", login))
+            pipe.pttl(self.lock_key.format("ip", ip))
+            ttls = await pipe.execute()
+        # Для логина и для адреса ответ одинаковый, как и для
+        # несуществующего логина.
+        retry_after = max(ttls)
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=HTTPStatus.TOO_MANY_REQUESTS,
+                detail="Слишком много неудачных попыток входа.",
+                headers={"Retry-After": str(ceil(retry_after / 1000))},
+            )
+
+    async def failed(self, login: str, ip: str) -> None:
+        keys = {"login": login, "ip": ip}
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for kind, value in keys.items():
+                pipe.incr(self.failures_key.format(kind, value))
+                pipe.expire(self.failures_key.format(kind, value), self.window)
+            counts = (await pipe.execute())[::2]
+            for (kind, value), failures in zip(keys.items(), counts):
+                lockout = self.lockout(failures, self.max_failures[kind])
+                if lockout:
+                    key = self.lock_key.format(kind, value)
+                    pipe.set(key, 1, px=int(lockout * 1000))
+            if len(pipe):
+                await pipe.execute()
+
+    async def succeeded(self, login: str) -> None:
+        await self.redis.delete(self.failures_key.format("login", login))
+
+
+def get_login_attempts(redis: Redis = Depends(get_redis)) -> LoginAttempts:
+    return LoginAttempts(
+        redis,
+        {
+            "login": settings.login_max_failures,
+            "ip": settings.login_ip_max_failures,
+        },
+        settings.login_lockout_base,
+        settings.login_lockout_max,
+        settings.login_failures_window,
+    )
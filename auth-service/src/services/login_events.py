@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import uuid
+
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+from models.entity import LoginHistory
+
+
+logger = logging.getLogger(__name__)
+
+# Сбои соединения: пачка запишется, когда БД вернется.
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, OSError)
+
+
+class LoginHistoryWriter:
+    """
+    Буфер событий входа, который пишет их в login_history пачками.
+
+    Запись уходит многострочным INSERT по накоплении batch_size событий
+    или раз в flush_interval секунд, поэтому вход не ждет отдельного
+    коммита. Если БД недоступна, события копятся до max_buffer, более
+    старые отбрасываются. Пачка, которую БД отвергает по существу
+    (пользователь удален, нет партиции), пишется по одной строке,
+    отвергнутые строки отбрасываются.
+    """
+
+    def __init__(
+        self, session_factory, batch_size: int, flush_interval: float, max_buffer: int
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.buffer: list[dict] = []
+        self.full = asyncio.Event()
+        self.lock = asyncio.Lock()
+        self.written = 0
+        self.flushes = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def record(self, user_id) -> None:
+        self.buffer.append(
+            {"id": uuid.uuid4(), "user_id": user_id, "login_datetime": datetime.now()}
+        )
+        self.trim()
+        if len(self.buffer) >= self.batch_size:
+            self.full.set()
+
+    def trim(self) -> None:
+        if len(self.buffer) > self.max_buffer:
+            overflow = len(self.buffer) - self.max_buffer
+            del self.buffer[:overflow]
+            self.dropped += overflow
+
+    def requeue(self, rows: list[dict]) -> None:
+        # Вернем незаписанное в начало буфера до следующей попытки.
+        self.buffer[:0] = rows
+        self.trim()
+
+    async def insert(self, rows: list[dict]) -> None:
+        async with self.session_factory() as session:
+            await session.execute(insert(LoginHistory).values(rows))
+            await session.commit()
+
+    async def insert_each(self, rows: list[dict]) -> int:
+        """Пишет строки по одной, возвращает число обработанных до сбоя БД."""
+        for index, row in enumerate(rows):
+            try:
+                await self.insert([row])
+            except TRANSIENT_ERRORS:
+                return index
+            except DBAPIError as error:
+                logger.warning("Отброшена запись истории входов: %s", error)
+                self.dropped += 1
+                continue
+            self.written += 1
+        return len(rows)
+
+    async def flush(self) -> None:
+        async with self.lock:
+            rows, self.buffer = self.buffer, []
+            self.full.clear()
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start:start + self.batch_size]
+                try:
+                    await self.insert(batch)
+                except TRANSIENT_ERRORS as error:
+                    logger.warning("Не удалось записать историю входов: %s", error)
+                    self.failed += 1
+                    self.requeue(rows[start:])
+                    return
+                except DBAPIError as error:
+                    logger.warning("История входов отвергнута БД: %s", error)
+                    self.failed += 1
+                    done = await self.insert_each(batch)
+                    if done < len(batch):
+                        self.requeue(rows[start + done:])
+                        return
+                except Exception:
+                    # Повтор неизвестной ошибки ничего не даст: остаток
+                    # отбрасывается, ошибку пишет run.
+                    self.failed += 1
+                    self.dropped += len(rows) - start
+                    raise
+                else:
+                    self.written += len(batch)
+                self.flushes += 1
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self.full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                # Отмена при остановке не должна терять вынутую из буфера пачку.
+                await asyncio.shield(self.flush())
+            except Exception:
+                # Писатель не должен останавливаться молча: тогда буфер
+                # переполнялся бы без записи в БД.
+                logger.exception("Сбой записи истории входов")
+
+    async def close(self, task: asyncio.Task) -> None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self.buffer),
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "written": self.written,
+            "flushes": self.flushes,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+
+writer: LoginHistoryWriter | None = None
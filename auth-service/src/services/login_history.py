@@ -1,37 +1,41 @@
-from functools import lru_cache
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 from fastapi import Depends
 
+from core.tracing import traced
 from db.postgres import get_session
 from models.entity import LoginHistory
 from schemas.login_history import LoginHistorySchema, LoginHistoryCreateSchema
-from services.base import BaseGetList, BaseCreate
+from services import login_events
+from services.base import BaseGetPage, BaseCreate
 
 
-class LoginHistoryService(BaseGetList, BaseCreate):
+class LoginHistoryService(BaseGetPage, BaseCreate):
     db_table = LoginHistory
     return_model_list = LoginHistorySchema
     return_model_create = LoginHistoryCreateSchema
+    cursor_column = "login_datetime"
+    descending = True
 
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_list(
-        self, user_id: str, limit: int, offset: int
-    ) -> list[LoginHistorySchema]:
-        query = (
-            select(self.db_table)
-            .where(self.db_table.user_id == user_id)
-            .limit(limit)
-            .offset(offset)
+    @traced
+    async def record(self, user_id: str) -> None:
+        # Без фонового писателя (вне приложения) пишем сразу.
+        if login_events.writer is None:
+            await self.create(LoginHistoryCreateSchema(user_id=user_id))
+            return
+        login_events.writer.record(user_id)
+
+    @traced
+    async def get_page(
+        self, user_id: str, limit: int, cursor: str | None
+    ) -> tuple[list[LoginHistorySchema], str | None]:
+        return await super().get_page(
+            limit, cursor, self.db_table.user_id == user_id
         )
-        data = await self.session.execute(query)
-        objs = data.scalars().all()
-        return [self.return_model_list(**obj.__dict__) for obj in objs]
 
 
-@lru_cache()
 def get_login_history_service(
     db_session: AsyncSession = Depends(get_session),
 ) -> LoginHistoryService:
@@ -0,0 +1,127 @@
+import hashlib
+
+from abc import ABC, abstractmethod
+from http import HTTPStatus
+from urllib.parse import urlencode
+
+import aiohttp
+
+from core.check_auth import CustomError
+from core.config import settings
+from core.http_client import HttpClient, get_http_client
+from db import redis
+from schemas.auth import NetworkUser, YandexResponse
+
+
+class OAuthProvider(ABC):
+    """Социальная сеть для входа по OAuth-токену."""
+
+    name: str
+
+    @abstractmethod
+    def authorize_url(self) -> str:
+        pass
+
+    @abstractmethod
+    async def userinfo(self, client: HttpClient, token: str) -> NetworkUser:
+        pass
+
+    async def fetch(self, client: HttpClient, url: str, **kwargs) -> dict:
+        try:
+            return await client.get_json(url, **kwargs)
+        except aiohttp.ClientResponseError:
+            raise CustomError(
+                status_code=HTTPStatus.UNAUTHORIZED,
+                message=f"Токен {self.name} не принят.",
+            )
+
+
+class YandexProvider(OAuthProvider):
+    name = "yandex"
+
+    def authorize_url(self) -> str:
+        params = {
+            "response_type": "token",
+            "redirect_uri": "https://oauth.yandex.ru/verification_code",
+            "client_id": settings.yandex_id,
+        }
+        return "https://oauth.yandex.ru/authorize?" + urlencode(params)
+
+    async def userinfo(self, client: HttpClient, token: str) -> NetworkUser:
+        response = await self.fetch(
+            client,
+            "https://login.yandex.ru/info",
+            params={"format": "json"},
+            headers={"Authorization": f"OAuth {token}"},
+        )
+        info = YandexResponse(**response)
+        return NetworkUser(
+            id=info.id,
+            login=info.login,
+            first_name=info.first_name,
+            last_name=info.last_name,
+        )
+
+
+class StubProvider(OAuthProvider):
+    """
+    Провайдер для локальных замеров: userinfo запрашивается у заглушки
+    по url, ответ - поля NetworkUser.
+    """
+
+    name = "stub"
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def authorize_url(self) -> str:
+        return self.url
+
+    async def userinfo(self, client: HttpClient, token: str) -> NetworkUser:
+        response = await self.fetch(
+            client, self.url, headers={"Authorization": f"Bearer {token}"}
+        )
+        return NetworkUser(**response)
+
+
+providers: dict[str, OAuthProvider] = {}
+
+
+def register(provider: OAuthProvider) -> None:
+    providers[provider.name] = provider
+
+
+register(YandexProvider())
+if settings.oauth_stub_url:
+    register(StubProvider(settings.oauth_stub_url))
+
+
+def get_provider(network: str) -> OAuthProvider:
+    if network not in providers:
+        raise CustomError(
+            status_code=HTTPStatus.BAD_REQUEST,
+            message=f"Выберете network из списка [{', '.join(providers)}].",
+        )
+    return providers[network]
+
+
+userinfo_key = "oauth_userinfo:{}:{}"
+
+
+async def get_userinfo(network: str, token: str) -> NetworkUser:
+    """
+    userinfo провайдера. Ответ кешируется в Redis на несколько секунд по
+    хешу токена: повторные входы тем же токеном не ходят к провайдеру.
+    """
+    provider = get_provider(network)
+    if redis.redis is None:
+        return await provider.userinfo(get_http_client(), token)
+    key = userinfo_key.format(network, hashlib.sha256(token.encode()).hexdigest())
+    cached = await redis.redis.get(key)
+    if cached:
+        return NetworkUser.model_validate_json(cached)
+    user_info = await provider.userinfo(get_http_client(), token)
+    await redis.redis.set(
+        key, user_info.model_dump_json(), ex=settings.oauth_userinfo_cache_expire
+    )
+    return user_info
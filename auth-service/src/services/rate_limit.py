@@ -0,0 +1,192 @@
+import asyncio
+import functools
+import ipaddress
+import logging
+import time
+
+from http import HTTPStatus
+from math import ceil
+from typing import Callable
+
+from fastapi import HTTPException, Request
+from redis.asyncio import Redis
+from redis.exceptions import ConnectionError, TimeoutError
+
+from core.check_auth import request_token, token_uuid
+from core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class Bucket:
+    __slots__ = ("times", "period", "tokens", "updated", "pending")
+
+    def __init__(self, times: int, period: float, now: float):
+        self.times = times
+        self.period = period
+        self.tokens = float(times)
+        self.updated = now
+        # Запросы, еще не учтенные в общем счетчике Redis.
+        self.pending = 0
+
+
+class HybridRateLimiter:
+    """
+    Лимиты запросов на локальных token bucket воркера.
+
+    Решение принимается без обращения к Redis. Раз в sync_interval воркер
+    одним pipeline добавляет свои запросы в общие счетчики окон и урезает
+    локальные корзины до остатка скользящего окна по всем воркерам.
+    Лимит глобальный приближенно: между сверками каждый воркер может
+    пропустить сверх него до times * sync_interval / period запросов.
+    Без Redis лимиты действуют в пределах воркера.
+    """
+
+    window_key = "rate_limit:{}:{}"
+
+    def __init__(self, redis: Redis | None, sync_interval: float):
+        self.redis = redis
+        self.sync_interval = sync_interval
+        self.buckets: dict[str, Bucket] = {}
+
+    def acquire(self, key: str, times: int, period: float) -> float:
+        """0, если запрос пропущен, иначе через сколько секунд повторить."""
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = Bucket(times, period, now)
+        rate = times / period
+        bucket.tokens = min(times, bucket.tokens + (now - bucket.updated) * rate)
+        bucket.updated = now
+        if bucket.tokens < 1:
+            return (1 - bucket.tokens) / rate
+        bucket.tokens -= 1
+        bucket.pending += 1
+        return 0
+
+    async def sync(self) -> None:
+        now = time.monotonic()
+        for key, bucket in list(self.buckets.items()):
+            # Простаивающая корзина уже полна, ее можно создать заново.
+            if not bucket.pending and now - bucket.updated > bucket.period:
+                del self.buckets[key]
+        if self.redis is None:
+            return
+        active = [
+            (key, bucket, bucket.pending)
+            for key, bucket in self.buckets.items()
+            if bucket.pending
+        ]
+        if not active:
+            return
+
+        wall = time.time()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, bucket, sent in active:
+                window = int(wall // bucket.period)
+                current = self.window_key.format(key, window)
+                pipe.incrby(current, sent)
+                pipe.pexpire(current, int(bucket.period * 2000))
+                pipe.get(self.window_key.format(key, window - 1))
+                # При сбое запросы не копятся: иначе после восстановления
+                # они разом попали бы в одно окно и заблокировали ключ.
+                bucket.pending -= sent
+            results = await pipe.execute()
+
+        for i, (key, bucket, sent) in enumerate(active):
+            current, previous = results[3 * i], int(results[3 * i + 2] or 0)
+            elapsed = wall % bucket.period / bucket.period
+            used = previous * (1 - elapsed) + current + bucket.pending
+            bucket.tokens = min(bucket.tokens, max(0.0, bucket.times - used))
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except (ConnectionError, TimeoutError) as error:
+                logger.warning("Не удалось сверить лимиты запросов: %s", error)
+
+
+limiter: HybridRateLimiter | None = None
+
+
+def get_limiter() -> HybridRateLimiter:
+    global limiter
+    if limiter is None:
+        # Вне приложения лимиты только локальные.
+        limiter = HybridRateLimiter(None, settings.rate_limit_sync_interval)
+    return limiter
+
+
+@functools.lru_cache(maxsize=1)
+def trusted_networks(proxies: str) -> tuple:
+    return tuple(
+        ipaddress.ip_network(proxy.strip(), strict=False)
+        for proxy in proxies.split(",")
+        if proxy.strip()
+    )
+
+
+def is_trusted(host: str, networks: tuple) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+def client_ip(request: Request) -> str:
+    """
+    Адрес клиента. X-Forwarded-For учитывается только от доверенного
+    прокси: берется самый правый адрес цепочки вне доверенных сетей,
+    адреса левее него клиент может подставить сам.
+    """
+    host = request.client.host if request.client else ""
+    networks = trusted_networks(settings.trusted_proxies)
+    if not is_trusted(host, networks):
+        return host
+    forwarded = ",".join(request.headers.getlist("X-Forwarded-For"))
+    for hop in reversed(forwarded.split(",")):
+        hop = hop.strip()
+        if hop and not is_trusted(hop, networks):
+            return hop
+    return host
+
+
+def principal(request: Request) -> str:
+    """Пользователь из проверенного токена, без токена - адрес клиента."""
+    claims, _ = request_token(request)
+    if claims is not None and ("uuid" in claims or "u" in claims):
+        return "user:" + token_uuid(claims)
+    return client_ip(request)
+
+
+class RateLimit:
+    """
+    Зависимость маршрута: не больше times запросов за seconds на ключ
+    метод + шаблон пути + identifier (адрес клиента или пользователь).
+    """
+
+    def __init__(
+        self,
+        times: int,
+        seconds: float,
+        identifier: Callable[[Request], str] = client_ip,
+    ):
+        self.times = times
+        self.seconds = seconds
+        self.identifier = identifier
+
+    async def __call__(self, request: Request) -> None:
+        route = request.scope.get("route")
+        path = route.path if route is not None else request.scope["path"]
+        key = f"{request.method}:{path}:{self.identifier(request)}"
+        retry_after = get_limiter().acquire(key, self.times, self.seconds)
+        if retry_after:
+            raise HTTPException(
+                status_code=HTTPStatus.TOO_MANY_REQUESTS,
+                detail="Too Many Requests",
+                headers={"Retry-After": str(ceil(retry_after))},
+            )
@@ -0,0 +1,108 @@
+import hashlib
+import uuid
+
+from fastapi import Depends
+from redis.asyncio import Redis
+from redis.exceptions import WatchError
+
+from core.config import settings
+from core.tracing import traced
+from db.redis import get_redis
+
+
+class RefreshTokenStore:
+    """
+    Семейства refresh-токенов в Redis.
+
+    Семейство (sid в claims) начинается входом на устройстве и живет,
+    пока его refresh-токен обновляется: каждый /refresh выдает новый
+    токен, а предъявленный становится использованным. Повторное
+    предъявление использованного токена означает утечку, и семейство
+    отзывается целиком. Хранится только хеш текущего токена семейства.
+    """
+
+    family_key = "refresh_family:{}"
+    user_key = "refresh_families:{}"
+
+    def __init__(self, redis: Redis, expire: int):
+        self.redis = redis
+        self.expire = expire
+
+    @staticmethod
+    def token_hash(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @staticmethod
+    def new_family() -> str:
+        return uuid.uuid4().hex
+
+    @traced
+    async def start(self, user_id, family: str, token: str) -> None:
+        key = self.family_key.format(family)
+        user_key = self.user_key.format(user_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(
+                key,
+                mapping={"user_id": str(user_id), "current": self.token_hash(token)},
+            )
+            pipe.expire(key, self.expire)
+            pipe.sadd(user_key, family)
+            pipe.expire(user_key, self.expire)
+            await pipe.execute()
+
+    @traced
+    async def rotate(self, family: str, token: str, new_token: str) -> bool:
+        """
+        Заменяет текущий токен семейства новым. False, если семейство
+        завершено или токен уже использован (тогда семейство отзывается).
+        """
+        key = self.family_key.format(family)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(key)
+                stored = await pipe.hgetall(key)
+                if not stored:
+                    return False
+                pipe.multi()
+                if stored[b"current"].decode() != self.token_hash(token):
+                    pipe.delete(key)
+                    user_id = stored[b"user_id"].decode()
+                    pipe.srem(self.user_key.format(user_id), family)
+                    await pipe.execute()
+                    return False
+                pipe.hset(key, "current", self.token_hash(new_token))
+                pipe.expire(key, self.expire)
+                # Список семейств пользователя живет не меньше самих
+                # семейств, иначе revoke_all пропустит активное.
+                user_key = self.user_key.format(stored[b"user_id"].decode())
+                pipe.expire(user_key, self.expire)
+                await pipe.execute()
+            except WatchError:
+                # Тот же токен одновременно обновлен другим запросом.
+                return False
+        return True
+
+    @traced
+    async def revoke(self, family: str) -> None:
+        key = self.family_key.format(family)
+        user_id = await self.redis.hget(key, "user_id")
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            if user_id:
+                pipe.srem(self.user_key.format(user_id.decode()), family)
+            await pipe.execute()
+
+    @traced
+    async def revoke_all(self, user_id) -> None:
+        user_key = self.user_key.format(user_id)
+        families = await self.redis.smembers(user_key)
+        keys = [self.family_key.format(family.decode()) for family in families]
+        await self.redis.delete(user_key, *keys)
+
+    async def families(self, user_id) -> set[str]:
+        families = await self.redis.smembers(self.user_key.format(user_id))
+        return {family.decode() for family in families}
+
+
+def get_refresh_token_store(redis: Redis = Depends(get_redis)) -> RefreshTokenStore:
+    return RefreshTokenStore(redis, settings.authjwt_refresh_token_expires)
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import time
+
+from redis.asyncio import Redis
+from redis.exceptions import ConnectionError, TimeoutError
+
+from core.config import settings
+from services.cache import CacheServise
+
+
+logger = logging.getLogger(__name__)
+
+
+class RevokedTokensCache:
+    """
+    Локальный набор отозванных jti с временем жизни до exp токена.
+
+    Пополняется сообщениями из канала Redis, которые публикует /logout,
+    и периодически сверяется с полным списком в Redis на случай
+    пропущенных сообщений. Пока снимок не загружен или канал потерян
+    (loaded сброшен), набору верить нельзя - проверка идет в Redis.
+    """
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        self.tokens: dict[str, int] = {}
+        self.loaded = False
+
+    def add(self, token_id: str, exp: int) -> None:
+        self.tokens[token_id] = exp
+
+    def is_revoked(self, token_id: str) -> bool:
+        exp = self.tokens.get(token_id)
+        if exp is None:
+            return False
+        if exp <= time.time():
+            self.tokens.pop(token_id, None)
+            return False
+        return True
+
+    async def load(self) -> None:
+        self.tokens = await CacheServise(self.redis).get_revoked_tokens()
+
+    async def listen(self) -> None:
+        pubsub = self.redis.pubsub()
+        try:
+            await pubsub.subscribe(CacheServise.revoked_channel)
+            # Снимок после подписки, чтобы не потерять отзывы между ними.
+            await self.load()
+            self.loaded = True
+            loaded_at = time.monotonic()
+            while True:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+                if message:
+                    token_id, exp = message["data"].decode().split(":")
+                    self.add(token_id, int(exp))
+                if time.monotonic() - loaded_at > settings.revoked_resync_interval:
+                    await self.load()
+                    loaded_at = time.monotonic()
+        finally:
+            self.loaded = False
+            await pubsub.reset()
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.listen()
+            except (ConnectionError, TimeoutError) as error:
+                logger.warning("Потерян канал отзыва токенов: %s", error)
+                await asyncio.sleep(1)
+
+
+revoked_tokens: RevokedTokensCache | None = None
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+
+from redis.asyncio import Redis
+from redis.exceptions import ConnectionError, TimeoutError
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.future import select
+
+from core.config import settings
+from models.entity import Role
+
+
+logger = logging.getLogger(__name__)
+
+
+def encode_bits(bits: int) -> str:
+    return format(bits, "x")
+
+
+def decode_bits(value: str) -> int:
+    return int(value, 16)
+
+
+class RoleCatalog:
+    """
+    Каталог ролей в памяти воркера: имя и сервис роли -> маска битов.
+
+    Токен несет маску ролей пользователя (Role.bit), и проверка доступа
+    сводится к пересечению масок. Изменения ролей увеличивают версию
+    в Redis, по которой каталог перечитывается из БД.
+    """
+
+    version_key = "roles_version"
+
+    def __init__(self, session_factory, redis: Redis):
+        self.session_factory = session_factory
+        self.redis = redis
+        self.loaded = False
+        self.lock = asyncio.Lock()
+        self.version: bytes | None = None
+        self.by_id: dict[str, int] = {}
+        self.by_name: dict[str, int] = {}
+        self.by_service: dict[str, int] = {}
+
+    async def load(self) -> None:
+        # Версия читается до загрузки, чтобы изменение во время загрузки
+        # вызвало еще одну.
+        version = await self.redis.get(self.version_key)
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(Role.id, Role.name, Role.service, Role.bit)
+            )
+        by_id, by_name, by_service = {}, {}, {}
+        for role_id, name, service, bit in result:
+            mask = 1 << bit
+            by_id[str(role_id)] = mask
+            # Имя уникально только в пределах сервиса.
+            by_name[name] = by_name.get(name, 0) | mask
+            by_service[service] = by_service.get(service, 0) | mask
+        self.by_id, self.by_name, self.by_service = by_id, by_name, by_service
+        self.version = version
+        self.loaded = True
+
+    async def refresh(self) -> None:
+        if not self.loaded or await self.redis.get(self.version_key) != self.version:
+            await self.load()
+
+    async def changed(self) -> None:
+        await self.redis.incr(self.version_key)
+        await self.load()
+
+    async def role_bits(self, role_ids: list) -> int:
+        if any(str(role_id) not in self.by_id for role_id in role_ids):
+            # Роль создана в другом воркере после последней загрузки.
+            await self.load()
+        bits = 0
+        for role_id in role_ids:
+            bits |= self.by_id.get(str(role_id), 0)
+        return bits
+
+    def mask(self, names: list[str], service: str | None = None) -> int:
+        mask = 0
+        for name in names:
+            mask |= self.by_name.get(name, 0)
+        if service is not None:
+            mask &= self.by_service.get(service, 0)
+        return mask
+
+    def allows(
+        self, bits: int, allowed_roles: list[str], service: str | None = None
+    ) -> bool:
+        if bits & self.by_name.get(settings.superrole_name, 0):
+            return True
+        return bool(bits & self.mask(allowed_roles, service))
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except (ConnectionError, TimeoutError, DBAPIError, OSError) as error:
+                logger.warning("Не удалось обновить каталог ролей: %s", error)
+            await asyncio.sleep(settings.role_catalog_check_interval)
+
+
+catalog: RoleCatalog | None = None
+
+
+async def ensure_loaded() -> None:
+    """
+    Первая загрузка каталога, если фоновая еще не прошла: до нее
+    компактные токены проверить нечем.
+    """
+    if catalog is None or catalog.loaded:
+        return
+    async with catalog.lock:
+        if catalog.loaded:
+            return
+        try:
+            await catalog.load()
+        except (ConnectionError, TimeoutError, DBAPIError, OSError) as error:
+            logger.warning("Не удалось загрузить каталог ролей: %s", error)
+
+
+async def changed() -> None:
+    # Без каталога (вне приложения) обновлять нечего.
+    if catalog is not None:
+        await catalog.changed()
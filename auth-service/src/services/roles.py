@@ -1,11 +1,12 @@
-from functools import lru_cache
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends
 from pydantic import BaseModel
 
+from core.tracing import traced
 from db.postgres import get_session
 from models.entity import Role
 from schemas.roles import RoleSchema
+from services import claims, role_catalog
 from services.base import BaseCreate, BaseGetList, BaseUpdate, BaseRemove, BaseGetById
 
 
@@ -19,7 +20,31 @@ class RolesService(BaseCreate, BaseGetList, BaseUpdate, BaseRemove, BaseGetById)
     def __init__(self, session: AsyncSession):
         self.session = session
 
+    @traced
+    async def create(self, fields: BaseModel):
+        result = await super().create(fields)
+        if result:
+            await role_catalog.changed()
+        return result
+
+    # Роль входит в снимки многих пользователей, поэтому ее изменение
+    # сбрасывает все снимки сразу.
+    @traced
+    async def update_by_id(self, obj_id: str, fields: BaseModel):
+        result = await super().update_by_id(obj_id, fields)
+        if result:
+            await claims.invalidate_all()
+            await role_catalog.changed()
+        return result
+
+    @traced
+    async def remove_by_id(self, obj_id: str):
+        result = await super().remove_by_id(obj_id)
+        if result:
+            await claims.invalidate_all()
+            await role_catalog.changed()
+        return result
+
 
-@lru_cache()
 def get_roles_service(db_session: AsyncSession = Depends(get_session)) -> RolesService:
     return RolesService(db_session)
@@ -0,0 +1,202 @@
+import csv
+import json
+import uuid
+
+from datetime import datetime
+from typing import AsyncIterator
+
+from fastapi import Depends
+from pydantic import ValidationError
+from redis.asyncio import Redis
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import hashing
+from core.config import settings
+from core.tracing import traced
+from db.postgres import get_session
+from db.redis import get_redis
+from schemas.users import (
+    UserCreateSchema,
+    UserImportError,
+    UserImportProgress,
+    UserImportResult,
+)
+
+
+COLUMNS = ["id", "login", "password", "first_name", "last_name", "created_at"]
+
+# Временная таблица живет до конца транзакции пачки.
+STAGING_SQL = """
+CREATE TEMP TABLE users_import (
+    line integer,
+    id uuid,
+    login varchar(255),
+    password varchar(255),
+    first_name varchar(50),
+    last_name varchar(50),
+    created_at timestamp
+) ON COMMIT DROP
+"""
+
+# Порядок по номеру строки: из повторов login в файле создается первый.
+MERGE_SQL = """
+INSERT INTO users (id, login, password, first_name, last_name, created_at)
+SELECT id, login, password, first_name, last_name, created_at
+FROM users_import
+ORDER BY line
+ON CONFLICT (login) DO NOTHING
+RETURNING login
+"""
+
+
+def decode(line: bytes) -> str | None:
+    try:
+        return line.decode()
+    except UnicodeDecodeError:
+        return None
+
+
+async def read_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str | None]:
+    """Строки файла; None - строка не в UTF-8."""
+    tail = b""
+    async for chunk in chunks:
+        lines = (tail + chunk).split(b"\n")
+        tail = lines.pop()
+        for line in lines:
+            yield decode(line)
+    if tail:
+        yield decode(tail)
+
+
+async def parse_rows(
+    lines: AsyncIterator[str | None], fmt: str
+) -> AsyncIterator[tuple[int, UserCreateSchema | str]]:
+    """
+    Разбирает строки NDJSON или CSV (первая строка - заголовок) и
+    возвращает номер строки и пользователя либо текст ошибки.
+    """
+    header = None
+    number = 0
+    async for line in lines:
+        number += 1
+        if line is None:
+            yield number, "Строка не в кодировке UTF-8"
+            continue
+        line = line.rstrip("\r")
+        if not line.strip():
+            continue
+        if fmt == "csv":
+            values = next(csv.reader([line]))
+            if header is None:
+                header = values
+                continue
+            row = dict(zip(header, values))
+        else:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield number, "Некорректный JSON"
+                continue
+        try:
+            yield number, UserCreateSchema.model_validate(row)
+        except ValidationError as error:
+            detail = error.errors()[0]
+            field = ".".join(map(str, detail["loc"]))
+            message = f"{field}: {detail['msg']}" if field else detail["msg"]
+            yield number, message
+
+
+class UserImportService:
+    """
+    Потоковый импорт пользователей.
+
+    Строки копятся пачками по user_import_batch_size: пароли пачки
+    хешируются пулом, пачка загружается COPY во временную таблицу и
+    переносится в users одним INSERT ... ON CONFLICT DO NOTHING.
+    Прогресс после каждой пачки доступен в Redis по id импорта.
+    """
+
+    progress_key = "user_import:{}"
+    progress_expire = 24 * 3600
+
+    def __init__(self, session: AsyncSession, redis: Redis):
+        self.session = session
+        self.redis = redis
+
+    @traced
+    async def import_users(
+        self, import_id: str, chunks: AsyncIterator[bytes], fmt: str
+    ) -> UserImportResult:
+        result = UserImportResult()
+        batch = []
+        async for line, row in parse_rows(read_lines(chunks), fmt):
+            result.processed += 1
+            if isinstance(row, str):
+                self.add_error(result, line, row)
+                continue
+            batch.append((line, row))
+            if len(batch) >= settings.user_import_batch_size:
+                await self.write_batch(batch, result)
+                await self.save_progress(import_id, result, done=False)
+                batch = []
+        if batch:
+            await self.write_batch(batch, result)
+        await self.save_progress(import_id, result, done=True)
+        return result
+
+    def add_error(self, result: UserImportResult, line: int, detail: str) -> None:
+        result.failed += 1
+        if len(result.errors) < settings.user_import_max_errors:
+            result.errors.append(UserImportError(line=line, detail=detail))
+
+    async def write_batch(
+        self, batch: list[tuple[int, UserCreateSchema]], result: UserImportResult
+    ) -> None:
+        hashes = await hashing.hasher.hash_passwords([row.password for _, row in batch])
+        now = datetime.now()
+        records = [
+            (line, uuid.uuid4(), row.login, pwhash, row.first_name, row.last_name, now)
+            for (line, row), pwhash in zip(batch, hashes)
+        ]
+        await self.session.execute(text(STAGING_SQL))
+        connection = await self.session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            "users_import", records=records, columns=["line", *COLUMNS]
+        )
+        created = set((await self.session.execute(text(MERGE_SQL))).scalars())
+        await self.session.commit()
+        result.created += len(created)
+        for line, row in batch:
+            if row.login in created:
+                created.discard(row.login)
+            else:
+                self.add_error(
+                    result, line, "Пользователь с таким login уже существует."
+                )
+
+    async def save_progress(
+        self, import_id: str, result: UserImportResult, done: bool
+    ) -> None:
+        key = self.progress_key.format(import_id)
+        progress = UserImportProgress(
+            processed=result.processed,
+            created=result.created,
+            failed=result.failed,
+            done=done,
+        )
+        await self.redis.set(key, progress.model_dump_json(), self.progress_expire)
+
+    async def get_progress(self, import_id: str) -> UserImportProgress | None:
+        data = await self.redis.get(self.progress_key.format(import_id))
+        if not data:
+            return None
+        return UserImportProgress.model_validate_json(data)
+
+
+def get_user_import_service(
+    db_session: AsyncSession = Depends(get_session),
+    redis: Redis = Depends(get_redis),
+) -> UserImportService:
+    return UserImportService(db_session, redis)
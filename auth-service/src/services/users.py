@@ -1,16 +1,35 @@
-from functools import lru_cache
+from sqlalchemy import any_, bindparam, delete, exists, literal
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, selectinload
 from sqlalchemy.future import select
+from sqlalchemy.sql.elements import BindParameter
 from fastapi import Depends
+from pydantic import BaseModel
 
+from core import hashing
+from core.tracing import traced
 from db.postgres import get_session
-from models.entity import User, Role
-from schemas.users import UserSchema, UserRolesSchema, RoleSchema, SecondaryUserRole
-from services.base import BaseCreate, BaseGetList, BaseUpdate, BaseRemove
+from models.entity import User, Role, user_role
+from schemas.users import (
+    UserSchema,
+    UserCreateSchema,
+    UserRolesSchema,
+    RoleSchema,
+    SecondaryUserRole,
+    BulkUserRole,
+    BulkUserRoleResult,
+)
+from services import claims
+from services.base import BaseCreate, BaseGetPage, BaseUpdate, BaseRemove
 
 
-class UsersService(BaseCreate, BaseGetList, BaseUpdate, BaseRemove):
+def array_param(values: list) -> BindParameter:
+    # Один параметр-массив вместо тысяч параметров в IN (...).
+    return bindparam("ids", values, type_=ARRAY(UUID(as_uuid=True)))
+
+
+class UsersService(BaseCreate, BaseGetPage, BaseUpdate, BaseRemove):
     db_table = User
     return_model_create = UserSchema
     return_model_list = UserRolesSchema
@@ -21,80 +40,168 @@ class UsersService(BaseCreate, BaseGetList, BaseUpdate, BaseRemove):
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_list(self, limit: int, offset: int) -> list[UserRolesSchema]:
-        query = (
-            select(self.db_table)
-            .limit(limit)
-            .offset(offset)
-            .options(joinedload(self.db_table.roles))
+    @traced
+    async def create(self, fields: UserCreateSchema) -> UserSchema | None:
+        password = await hashing.hasher.hash_password(fields.password)
+        return await super().create(fields.model_copy(update={"password": password}))
+
+    @traced
+    async def update_by_id(self, obj_id: str, fields: BaseModel):
+        result = await super().update_by_id(obj_id, fields)
+        if result:
+            await claims.invalidate_users(obj_id)
+        return result
+
+    @traced
+    async def remove_by_id(self, obj_id: str):
+        result = await super().remove_by_id(obj_id)
+        if result:
+            await claims.invalidate_users(obj_id)
+        return result
+
+    @traced
+    async def get_page(
+        self, limit: int, cursor: str | None
+    ) -> tuple[list[UserRolesSchema], str | None]:
+        query = self.page_query(
+            select(self.db_table).options(selectinload(self.db_table.roles)),
+            limit,
+            cursor,
         )
         data = await self.session.execute(query)
-        objs = data.scalars().unique()
+        objs = data.scalars().all()
         result = []
-        for obj in objs:
+        for obj in objs[:limit]:
             dict_obj = obj.__dict__
             roles = []
             for role in dict_obj["roles"]:
                 roles.append(RoleSchema(**role.__dict__))
             dict_obj["roles"] = roles
             result.append(self.return_model_list(**dict_obj))
-        return result
+        return result, self.next_cursor(objs, limit)
 
-    async def set_secondary(
-        self, secondary_obj: SecondaryUserRole
-    ) -> UserRolesSchema | str:
+    async def get_with_roles(self, user_id) -> UserRolesSchema | None:
+        # Один пользователь: роли одним запросом через join.
         result = await self.session.execute(
             select(self.db_table)
-            .where(self.db_table.id == secondary_obj.user_id)
+            .where(self.db_table.id == user_id)
             .options(joinedload(self.db_table.roles))
+            .execution_options(populate_existing=True)
         )
-        user_obj = result.scalars().first()
-        if not user_obj:
-            return "Пользователь не найден"
-        role_obj = await self.session.get(self.db_table_right, secondary_obj.role_id)
-        if not role_obj:
-            return "Роль не найдена"
-        if role_obj in user_obj.roles:
-            return "Пользователю уже присвоена эта роль"
-        user_obj.roles.append(role_obj)
-        await self.session.commit()
-
+        user_obj = result.unique().scalars().one_or_none()
+        # Пользователя могли удалить между изменением ролей и чтением.
+        if user_obj is None:
+            return None
         dict_obj = user_obj.__dict__
         roles = []
         for role in dict_obj["roles"]:
             roles.append(RoleSchema(**role.__dict__))
         dict_obj["roles"] = roles
-
         return self.return_model_secondary(**dict_obj)
 
-    async def deprive_secondary(
-        self, secondary_obj: SecondaryUserRole
-    ) -> UserRolesSchema | str:
+    async def missing_secondary(self, secondary_obj: SecondaryUserRole) -> str | None:
         result = await self.session.execute(
-            select(self.db_table)
-            .where(self.db_table.id == secondary_obj.user_id)
-            .options(joinedload(self.db_table.roles))
+            select(
+                exists().where(self.db_table.id == secondary_obj.user_id),
+                exists().where(self.db_table_right.id == secondary_obj.role_id),
+            )
         )
-        user_obj = result.scalars().first()
-        if not user_obj:
+        user_exists, role_exists = result.one()
+        if not user_exists:
             return "Пользователь не найден"
-        role_obj = await self.session.get(self.db_table_right, secondary_obj.role_id)
-        if not role_obj:
+        if not role_exists:
             return "Роль не найдена"
-        if role_obj not in user_obj.roles:
-            return "Пользователю не присвоена эта роль"
-        user_obj.roles.remove(role_obj)
+        return None
+
+    @traced
+    async def set_secondary(
+        self, secondary_obj: SecondaryUserRole
+    ) -> UserRolesSchema | str | None:
+        # Пользователь и роль отбираются в том же запросе, поэтому
+        # несуществующие id дают пустой результат, а не ошибку внешнего ключа.
+        query = (
+            insert(user_role)
+            .from_select(
+                ["user_id", "role_id"],
+                select(self.db_table.id, self.db_table_right.id).where(
+                    self.db_table.id == secondary_obj.user_id,
+                    self.db_table_right.id == secondary_obj.role_id,
+                ),
+            )
+            .on_conflict_do_nothing()
+            .returning(user_role.c.user_id)
+        )
+        inserted = (await self.session.execute(query)).first()
         await self.session.commit()
+        if not inserted:
+            missing = await self.missing_secondary(secondary_obj)
+            return missing or "Пользователю уже присвоена эта роль"
+        await claims.invalidate_users(secondary_obj.user_id)
+        return await self.get_with_roles(secondary_obj.user_id)
 
-        dict_obj = user_obj.__dict__
-        roles = []
-        for role in dict_obj["roles"]:
-            roles.append(RoleSchema(**role.__dict__))
-        dict_obj["roles"] = roles
+    @traced
+    async def deprive_secondary(
+        self, secondary_obj: SecondaryUserRole
+    ) -> UserRolesSchema | str | None:
+        query = (
+            delete(user_role)
+            .where(
+                user_role.c.user_id == secondary_obj.user_id,
+                user_role.c.role_id == secondary_obj.role_id,
+            )
+            .returning(user_role.c.user_id)
+        )
+        deleted = (await self.session.execute(query)).first()
+        await self.session.commit()
+        if not deleted:
+            missing = await self.missing_secondary(secondary_obj)
+            return missing or "Пользователю не присвоена эта роль"
+        await claims.invalidate_users(secondary_obj.user_id)
+        return await self.get_with_roles(secondary_obj.user_id)
 
-        return self.return_model_secondary(**dict_obj)
+    @traced
+    async def set_role_bulk(self, bulk: BulkUserRole) -> BulkUserRoleResult | str:
+        """
+        Назначает роль всем существующим пользователям из списка одним
+        INSERT ... SELECT. Уже имеющие роль и неизвестные id пропускаются.
+        """
+        if not await self.session.get(self.db_table_right, bulk.role_id):
+            return "Роль не найдена"
+        query = (
+            insert(user_role)
+            .from_select(
+                ["user_id", "role_id"],
+                select(self.db_table.id, literal(bulk.role_id, UUID)).where(
+                    self.db_table.id == any_(array_param(bulk.user_ids))
+                ),
+            )
+            .on_conflict_do_nothing()
+            .returning(user_role.c.user_id)
+        )
+        changed = (await self.session.execute(query)).scalars().all()
+        await self.session.commit()
+        await claims.invalidate_users(*changed)
+        return BulkUserRoleResult(
+            role_id=bulk.role_id, requested=len(bulk.user_ids), changed=len(changed)
+        )
+
+    @traced
+    async def deprive_role_bulk(self, bulk: BulkUserRole) -> BulkUserRoleResult:
+        query = (
+            delete(user_role)
+            .where(
+                user_role.c.role_id == bulk.role_id,
+                user_role.c.user_id == any_(array_param(bulk.user_ids)),
+            )
+            .returning(user_role.c.user_id)
+        )
+        changed = (await self.session.execute(query)).scalars().all()
+        await self.session.commit()
+        await claims.invalidate_users(*changed)
+        return BulkUserRoleResult(
+            role_id=bulk.role_id, requested=len(bulk.user_ids), changed=len(changed)
+        )
 
 
-@lru_cache()
 def get_users_service(db_session: AsyncSession = Depends(get_session)) -> UsersService:
     return UsersService(db_session)
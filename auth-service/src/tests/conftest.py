@@ -0,0 +1,62 @@
+import asyncio
+import uuid
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, event
+
+from db import postgres
+from models.entity import LoginHistory, Role, User
+
+
+@pytest.fixture(scope="session")
+def event_loop():
+    loop = asyncio.get_event_loop_policy().new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def statements():
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    sync_engine = postgres.engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest_asyncio.fixture
+async def user_with_history():
+    """
+    Пользователь с историей входов и ролью, которая есть еще у нескольких
+    пользователей. Возвращает его id и логин.
+    """
+    role = Role(name=f"test_{uuid.uuid4().hex[:8]}", service="test")
+    users = [
+        User(
+            login=f"test_{uuid.uuid4().hex[:16]}",
+            password="hash",
+            first_name="test",
+            last_name="test",
+        )
+        for _ in range(5)
+    ]
+    async with postgres.async_session() as session:
+        for user in users:
+            user.roles.append(role)
+        session.add_all(users)
+        await session.flush()
+        session.add_all([LoginHistory(user_id=users[0].id) for _ in range(20)])
+        await session.commit()
+        user_ids = [user.id for user in users]
+
+    yield users[0].id, users[0].login
+
+    async with postgres.async_session() as session:
+        await session.execute(delete(User).where(User.id.in_(user_ids)))
+        await session.execute(delete(Role).where(Role.id == role.id))
+        await session.commit()
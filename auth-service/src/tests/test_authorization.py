@@ -0,0 +1,92 @@
+import uuid
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from redis.asyncio import Redis
+
+from core.config import settings
+from core.keys import KeyRingAuthJWT
+from db import postgres, redis
+from main import app
+
+
+async def access_token(roles: list[str]) -> str:
+    claims = {
+        "uuid": str(uuid.uuid4()),
+        "roles": [{"name": name, "service": "auth"} for name in roles],
+    }
+    return await KeyRingAuthJWT().create_access_token(
+        subject="test", user_claims=claims
+    )
+
+
+@pytest_asyncio.fixture
+async def client(monkeypatch):
+    monkeypatch.setattr(
+        redis, "redis", Redis(host=settings.redis_host, port=settings.redis_port)
+    )
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url="http://test",
+        headers={"X-Request-Id": str(uuid.uuid4())},
+    ) as client:
+        yield client
+    await redis.redis.close()
+
+
+async def checkouts(client: httpx.AsyncClient, path: str, token: str | None):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    before = postgres.engine.pool.checkouts
+    response = await client.get(path, headers=headers)
+    return response.status_code, postgres.engine.pool.checkouts - before
+
+
+@pytest.mark.asyncio
+async def test_rejected_requests_do_not_touch_db(client):
+    path = "/api/v1/users/"
+    assert await checkouts(client, path, None) == (401, 0)
+    assert await checkouts(client, path, "broken") == (401, 0)
+    assert await checkouts(client, path, await access_token([])) == (403, 0)
+
+    role_path = f"/api/v1/roles/remove/{uuid.uuid4()}"
+    viewer = await access_token(settings.roles_view_data[-1:])
+    assert await checkouts(client, role_path, viewer) == (403, 0)
+
+    # Разрешенный запрос идет в БД.
+    admin = await access_token(settings.roles_view_data[:1])
+    status, used = await checkouts(client, path, admin)
+    assert status == 200
+    assert used >= 1
+
+
+@pytest.mark.asyncio
+async def test_revoked_only_for_services(client, monkeypatch):
+    path = "/api/v1/auth/revoked"
+    assert (await client.get(path)).status_code == 403
+    # Без настроенного секрета список не выдается и с пустым заголовком.
+    headers = {"X-Service-Token": ""}
+    assert (await client.get(path, headers=headers)).status_code == 403
+
+    monkeypatch.setattr(settings, "service_token", "service")
+    headers = {"X-Service-Token": "other"}
+    assert (await client.get(path, headers=headers)).status_code == 403
+    headers = {"X-Service-Token": "service"}
+    response = await client.get(path, headers=headers)
+    assert response.status_code == 200
+    assert "tokens" in response.json()
+
+
+@pytest.mark.asyncio
+async def test_batch_check_only_for_services(client, monkeypatch):
+    path = "/api/v1/auth/check_auth_batch"
+    body = {"tokens": ["broken"], "roles": []}
+    assert (await client.post(path, json=body)).status_code == 403
+
+    monkeypatch.setattr(settings, "service_token", "service")
+    headers = {"X-Service-Token": "service"}
+    response = await client.post(path, json=body, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["results"][0]["valid"] is False
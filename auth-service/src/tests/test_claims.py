@@ -0,0 +1,108 @@
+import uuid
+
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+
+from redis.asyncio import Redis
+
+from core.config import settings
+from schemas.users import UserRolesSchema
+from services import claims
+from services.claims import ClaimsCache
+
+
+def snapshot(login: str) -> UserRolesSchema:
+    return UserRolesSchema(
+        id=uuid.uuid4(),
+        login=login,
+        first_name="first",
+        last_name="last",
+        created_at=datetime.now(),
+    )
+
+
+class Loader:
+    def __init__(self, login: str):
+        self.login = login
+        self.calls = 0
+
+    async def __call__(self) -> UserRolesSchema:
+        self.calls += 1
+        return snapshot(self.login)
+
+
+@pytest_asyncio.fixture
+async def redis_client():
+    client = Redis(host=settings.redis_host, port=settings.redis_port)
+    yield client
+    keys = await client.keys("claims*")
+    if keys:
+        await client.delete(*keys)
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_local_then_redis_hits(redis_client):
+    load = Loader("cached")
+    cache = ClaimsCache(redis_client, 10, 60)
+    first = await cache.get("user-1", load)
+    second = await cache.get("user-1", load)
+    assert first.login == second.login == "cached"
+    assert load.calls == 1
+    assert (cache.misses, cache.local_hits) == (1, 1)
+
+    # Другой воркер берет снимок из Redis, не обращаясь к БД.
+    other = ClaimsCache(redis_client, 10, 60)
+    assert (await other.get("user-1", load)).login == "cached"
+    assert load.calls == 1
+    assert other.redis_hits == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidation(redis_client):
+    load = Loader("changed")
+    cache = ClaimsCache(redis_client, 10, 60)
+    other = ClaimsCache(redis_client, 10, 60)
+    await cache.get("user-1", load)
+    await other.get("user-2", load)
+
+    await other.invalidate_users(["user-1"])
+    await cache.get("user-1", load)
+    assert load.calls == 3
+    await other.get("user-2", load)
+    assert load.calls == 3
+
+    await cache.invalidate_all()
+    await other.get("user-2", load)
+    assert load.calls == 4
+
+
+@pytest.mark.asyncio
+async def test_missing_user_not_cached(redis_client):
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return None
+
+    cache = ClaimsCache(redis_client, 10, 60)
+    assert await cache.get("user-1", load) is None
+    assert await cache.get("user-1", load) is None
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_local_lru_is_bounded(redis_client):
+    cache = ClaimsCache(redis_client, 2, 60)
+    for number in range(3):
+        await cache.get(f"user-{number}", Loader(f"user_{number}"))
+    assert list(cache.local) == ["user-1", "user-2"]
+
+
+@pytest.mark.asyncio
+async def test_helpers_without_cache():
+    assert claims.claims_cache is None
+    await claims.invalidate_users("user-1")
+    await claims.invalidate_all()
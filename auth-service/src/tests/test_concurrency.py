@@ -0,0 +1,47 @@
+import asyncio
+
+from contextlib import asynccontextmanager
+
+import pytest
+
+from db import postgres
+from db.postgres import get_session
+from services.auth import get_auth_service
+from services.users import get_users_service
+
+
+request_session = asynccontextmanager(get_session)
+
+
+async def login_request(login: str, sessions: set):
+    # Так же, как FastAPI разрешает зависимости одного запроса.
+    async with request_session() as session:
+        sessions.add(session)
+        auth_service = get_auth_service(session)
+        assert get_users_service(session).session is session
+        user = await auth_service.get_by_login(login)
+        await asyncio.sleep(0)
+        return await auth_service.get_claims(user.uuid), user.login
+
+
+async def failing_request(login: str):
+    async with request_session() as session:
+        await get_auth_service(session).get_by_login(login)
+        raise RuntimeError
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_do_not_share_sessions(user_with_history):
+    _, login = user_with_history
+    sessions = set()
+    results = await asyncio.gather(
+        *[login_request(login, sessions) for _ in range(50)],
+        *[failing_request(login) for _ in range(10)],
+        return_exceptions=True,
+    )
+    logins = [result[1] for result in results[:50]]
+    assert logins == [login] * 50
+    assert all(isinstance(result, RuntimeError) for result in results[50:])
+    assert len(sessions) == 50
+    # Все соединения, в том числе после ошибок, вернулись в пул.
+    assert postgres.engine.pool.checkedout() == 0
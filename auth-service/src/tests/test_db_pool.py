@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from db import postgres
+from db.postgres import MeteredPool
+
+
+@pytest.mark.asyncio
+async def test_pool_reports_overflow_and_timeouts():
+    engine = create_async_engine(
+        postgres.dsn,
+        poolclass=MeteredPool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.5,
+    )
+    try:
+        first = await engine.connect()
+        second = await engine.connect()
+        await second.execute(text("SELECT 1"))
+        stats = engine.pool.stats()
+        assert stats["in_use"] == 2
+        assert stats["overflow"] == 1
+        assert stats["overflow_events"] == 1
+
+        with pytest.raises(TimeoutError):
+            await engine.connect()
+        assert engine.pool.stats()["timeouts"] == 1
+
+        # Ожидание освободившегося соединения попадает в метрики.
+        waiter = asyncio.create_task(engine.connect().start())
+        await asyncio.sleep(0.1)
+        await second.close()
+        await (await waiter).close()
+        await first.close()
+        stats = engine.pool.stats()
+        assert stats["in_use"] == 0
+        assert stats["checkouts"] == 3
+        assert stats["max_wait_seconds"] >= 0.1
+    finally:
+        await engine.dispose()
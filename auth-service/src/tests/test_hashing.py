@@ -0,0 +1,27 @@
+import pytest
+
+from core import hashing
+
+
+@pytest.mark.parametrize(
+    "method", ["scrypt", "pbkdf2", "pbkdf2:sha256", "pbkdf2:sha256:1000"]
+)
+def test_fresh_hash_does_not_need_rehash(method):
+    hasher = hashing.get_hasher(method)
+    pwhash = hasher.hash("secret")
+    assert not hasher.needs_rehash(pwhash)
+    assert hashing.verify_and_update(method, pwhash, "secret") == (True, None)
+
+
+def test_other_parameters_need_rehash():
+    pwhash = hashing.hash_password("pbkdf2:sha256:1000", "secret")
+    method = "pbkdf2:sha256:2000"
+    verified, new_hash = hashing.verify_and_update(method, pwhash, "secret")
+    assert verified
+    assert new_hash.startswith(f"{method}$")
+    assert hashing.verify_and_update(method, pwhash, "wrong") == (False, None)
+
+
+@pytest.mark.parametrize("pwhash", ["hash", "md5$salt$value", ""])
+def test_unknown_scheme_is_mismatch(pwhash):
+    assert hashing.verify_and_update("scrypt", pwhash, "hash") == (False, None)
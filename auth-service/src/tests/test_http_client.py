@@ -0,0 +1,158 @@
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+
+from aiohttp import web
+from fastapi import HTTPException
+
+from core.check_auth import CustomError
+from core.http_client import CircuitBreaker, HttpClient
+from services import oauth
+from services.oauth import StubProvider
+
+
+@pytest_asyncio.fixture
+async def userinfo():
+    """
+    Заглушка userinfo: токен ok - пользователь, bad - 401, down - 500,
+    html - ответ не JSON, slow - ответ через секунду.
+    """
+    state = {"peers": set(), "requests": 0}
+
+    async def handler(request: web.Request) -> web.Response:
+        state["peers"].add(request.transport.get_extra_info("peername"))
+        state["requests"] += 1
+        token = request.headers["Authorization"].split(" ")[1]
+        if token == "bad":
+            return web.json_response({}, status=401)
+        if token == "down":
+            return web.json_response({}, status=500)
+        if token == "html":
+            return web.Response(text="<html>")
+        if token == "slow":
+            await asyncio.sleep(1)
+        return web.json_response({"id": "1", "login": "stub_user"})
+
+    app = web.Application()
+    app.router.add_get("/info", handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    client = HttpClient(10, 2, 5, 300, 30, 2, 60)
+    yield StubProvider(f"http://127.0.0.1:{port}/info"), client, state
+    await client.close()
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_connections_are_reused(userinfo):
+    provider, client, state = userinfo
+    for _ in range(10):
+        user = await provider.userinfo(client, "ok")
+        assert user.login == "stub_user"
+    assert len(state["peers"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_rejected_token(userinfo):
+    provider, client, _ = userinfo
+    with pytest.raises(CustomError) as error:
+        await provider.userinfo(client, "bad")
+    assert error.value.status_code == 401
+    # Отказ провайдера в токене не размыкает цепь.
+    assert client.breaker(provider.url).failures == 0
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens(userinfo):
+    provider, client, state = userinfo
+    for _ in range(2):
+        with pytest.raises(HTTPException) as error:
+            await provider.userinfo(client, "down")
+        assert error.value.status_code == 502
+
+    with pytest.raises(HTTPException) as error:
+        await provider.userinfo(client, "ok")
+    assert error.value.status_code == 503
+    assert error.value.headers["Retry-After"] == "60"
+    assert state["requests"] == 2
+
+
+@pytest.mark.asyncio
+async def test_invalid_json(userinfo):
+    provider, client, _ = userinfo
+    with pytest.raises(HTTPException) as error:
+        await provider.userinfo(client, "html")
+    assert error.value.status_code == 502
+    # Подробности ошибки остаются в логе.
+    assert error.value.detail == "Ошибка внешнего сервиса."
+    assert client.breaker(provider.url).failures == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_releases_breaker(userinfo):
+    provider, client, _ = userinfo
+    breaker = client.breaker(provider.url)
+    breaker.failures = breaker.max_failures
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout - 1
+
+    probe = asyncio.create_task(provider.userinfo(client, "slow"))
+    await asyncio.sleep(0.1)
+    assert breaker.probing
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+    # Следующий запрос снова может стать пробным.
+    assert breaker.retry_after() == 0
+
+
+@pytest.mark.asyncio
+async def test_stale_request_keeps_probe_slot(userinfo):
+    provider, client, _ = userinfo
+    breaker = client.breaker(provider.url)
+    stale = asyncio.create_task(provider.userinfo(client, "slow"))
+    await asyncio.sleep(0.1)
+    breaker.failures = breaker.max_failures
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout - 1
+    probe = asyncio.create_task(provider.userinfo(client, "slow"))
+    await asyncio.sleep(0.1)
+
+    # Запрос, начатый до размыкания, не освобождает место пробы.
+    stale.cancel()
+    await asyncio.gather(stale, return_exceptions=True)
+    assert breaker.probing
+    assert breaker.retry_after() > 0
+    probe.cancel()
+    await asyncio.gather(probe, return_exceptions=True)
+    assert breaker.retry_after() == 0
+
+
+def test_breaker_probe(monkeypatch):
+    now = 0.0
+    monkeypatch.setattr("core.http_client.time.monotonic", lambda: now)
+    breaker = CircuitBreaker(1, 10)
+    breaker.failed()
+    assert breaker.retry_after() == 10
+
+    now = 11.0
+    assert breaker.retry_after() == 0
+    # Пока пробный запрос не завершился, остальные не пропускаются.
+    assert breaker.retry_after() > 0
+    breaker.failed()
+    assert breaker.retry_after() == 10
+
+    now = 22.0
+    assert breaker.retry_after() == 0
+    breaker.succeeded()
+    assert breaker.retry_after() == 0
+
+
+def test_unknown_network():
+    with pytest.raises(CustomError) as error:
+        oauth.get_provider("unknown")
+    assert error.value.status_code == 400
+    assert "yandex" in error.value.message
@@ -0,0 +1,72 @@
+import jwt
+import pytest
+
+from async_fastapi_jwt_auth.exceptions import InvalidHeaderError
+
+from core import keys
+from core.keys import KeyRing, KeyRingAuthJWT, generate_key
+
+
+@pytest.mark.parametrize("algorithm", ["RS256", "EdDSA"])
+def test_rotation(tmp_path, algorithm):
+    old_kid = generate_key(algorithm, tmp_path)
+    # Имя, которое сортируется раньше нового ключа.
+    (tmp_path / f"{old_kid}.pem").rename(tmp_path / "2000.pem")
+    new_kid = generate_key(algorithm, tmp_path)
+
+    old = KeyRing(algorithm, "", tmp_path, "2000")
+    token = jwt.encode({"sub": "user"}, old.signing_key, algorithm, old.headers)
+    assert jwt.get_unverified_header(token)["kid"] == "2000"
+
+    # Без JWT_ACTIVE_KID новый ключ не начинает подписывать сам.
+    with pytest.raises(ValueError):
+        KeyRing(algorithm, "", tmp_path)
+
+    # Новый ключ активен, токены старого по-прежнему проверяются.
+    ring = KeyRing(algorithm, "", tmp_path, new_kid)
+    assert ring.kid == new_kid
+    assert ring.decode(token)["sub"] == "user"
+
+    jwks = ring.jwks()
+    assert {key["kid"] for key in jwks["keys"]} == {"2000", new_kid}
+    public = {key.key_id: key.key for key in jwt.PyJWKSet.from_dict(jwks).keys}
+    assert jwt.decode(token, public["2000"], algorithms=[algorithm])["sub"] == "user"
+
+    (tmp_path / "2000.pem").unlink()
+    with pytest.raises(jwt.InvalidTokenError):
+        KeyRing(algorithm, "", tmp_path, new_kid).decode(token)
+
+
+def test_symmetric():
+    ring = KeyRing("HS256", "secret", "missing")
+    token = jwt.encode({"sub": "user"}, ring.signing_key, "HS256", ring.headers)
+    assert "kid" not in jwt.get_unverified_header(token)
+    assert ring.decode(token)["sub"] == "user"
+    assert ring.jwks() == {"keys": []}
+
+
+def test_missing_active_key(tmp_path):
+    generate_key("EdDSA", tmp_path)
+    with pytest.raises(ValueError):
+        KeyRing("EdDSA", "", tmp_path, "unknown")
+
+
+@pytest.mark.asyncio
+async def test_auth_jwt_uses_keyring(tmp_path, monkeypatch):
+    kid = generate_key("EdDSA", tmp_path)
+    monkeypatch.setattr(keys, "keyring", KeyRing("EdDSA", "", tmp_path))
+    authorize = KeyRingAuthJWT()
+    token = await authorize.create_access_token(
+        subject="user", user_claims={"u": "uuid"}
+    )
+    assert jwt.get_unverified_header(token) == {
+        "alg": "EdDSA", "kid": kid, "typ": "JWT"
+    }
+    claims = await authorize.get_raw_jwt(token)
+    assert (claims["sub"], claims["u"], claims["type"]) == ("user", "uuid", "access")
+
+    other = tmp_path / "other"
+    generate_key("EdDSA", other)
+    monkeypatch.setattr(keys, "keyring", KeyRing("EdDSA", "", other))
+    with pytest.raises(InvalidHeaderError):
+        await authorize.get_raw_jwt(token)
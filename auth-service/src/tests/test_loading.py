@@ -0,0 +1,45 @@
+import uuid
+
+import pytest
+
+from db import postgres
+from models.entity import User
+from services.auth import AuthService
+from services.users import UsersService
+
+
+@pytest.mark.asyncio
+async def test_get_user_loads_only_user_row(user_with_history, statements):
+    user_id, _ = user_with_history
+    async with postgres.async_session() as session:
+        user = await session.get(User, user_id)
+        assert user is not None
+        assert len(statements) == 1
+        assert len(session.identity_map) == 1
+
+
+@pytest.mark.asyncio
+async def test_get_by_login_loads_roles_without_members(
+    user_with_history, statements
+):
+    _, login = user_with_history
+    async with postgres.async_session() as session:
+        user = await AuthService(session).get_by_login(login)
+        assert len(user.roles) == 1
+        # Пользователь и его роли, без истории и других владельцев роли.
+        assert len(statements) == 2
+
+
+@pytest.mark.asyncio
+async def test_remove_user_does_not_load_relations(user_with_history, statements):
+    user_id, _ = user_with_history
+    async with postgres.async_session() as session:
+        assert await UsersService(session).remove_by_id(user_id)
+        selects = [query for query in statements if query.lstrip().startswith("SELECT")]
+        assert len(selects) == 1
+
+
+@pytest.mark.asyncio
+async def test_get_with_roles_of_deleted_user():
+    async with postgres.async_session() as session:
+        assert await UsersService(session).get_with_roles(uuid.uuid4()) is None
@@ -0,0 +1,77 @@
+import uuid
+
+import pytest
+import pytest_asyncio
+
+from fastapi import HTTPException
+from redis.asyncio import Redis
+
+from core import hashing
+from core.config import settings
+from services.login_attempts import LoginAttempts
+
+
+@pytest_asyncio.fixture
+async def attempts():
+    redis = Redis(host=settings.redis_host, port=settings.redis_port)
+    yield LoginAttempts(redis, {"login": 3, "ip": 5}, 1, 4, 60)
+    await redis.close()
+
+
+async def retry_after(attempts: LoginAttempts, login: str, ip: str) -> int:
+    try:
+        await attempts.check(login, ip)
+    except HTTPException as error:
+        assert error.status_code == 429
+        return int(error.headers["Retry-After"])
+    return 0
+
+
+def test_lockout_doubles():
+    attempts = LoginAttempts(None, {}, 1, 4, 60)
+    assert [attempts.lockout(failures, 3) for failures in range(1, 7)] == [
+        0, 0, 1, 2, 4, 4
+    ]
+
+
+@pytest.mark.asyncio
+async def test_login_lockout(attempts):
+    login, ip = uuid.uuid4().hex, uuid.uuid4().hex
+    for _ in range(2):
+        await attempts.failed(login, ip)
+    assert await retry_after(attempts, login, ip) == 0
+
+    await attempts.failed(login, ip)
+    # Логин заблокирован и с других адресов.
+    assert await retry_after(attempts, login, "other") == 1
+    await attempts.failed(login, ip)
+    assert await retry_after(attempts, login, "other") == 2
+
+    await attempts.succeeded(login)
+    await attempts.redis.delete(attempts.lock_key.format("login", login))
+    await attempts.failed(login, "other")
+    assert await retry_after(attempts, login, "other") == 0
+
+
+@pytest.mark.asyncio
+async def test_ip_lockout(attempts):
+    ip = uuid.uuid4().hex
+    for _ in range(5):
+        await attempts.failed(uuid.uuid4().hex, ip)
+    # Перебор разных логинов с одного адреса.
+    assert await retry_after(attempts, uuid.uuid4().hex, ip) == 1
+
+
+@pytest.mark.asyncio
+async def test_dummy_verify():
+    hasher = hashing.HashingExecutor("thread", 1, 4, "pbkdf2:sha256:1000")
+    try:
+        assert not await hasher.verify_dummy("password")
+        dummy_hash = hasher.dummy_hash
+        assert dummy_hash.startswith("pbkdf2:sha256:1000$")
+        assert not await hasher.verify_dummy("password")
+        assert hasher.dummy_hash == dummy_hash
+        # Хеш вычисляется один раз, дальше только проверки.
+        assert hasher.completed == 3
+    finally:
+        hasher.shutdown()
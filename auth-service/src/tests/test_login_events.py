@@ -0,0 +1,110 @@
+import asyncio
+import uuid
+
+import pytest
+
+from sqlalchemy import func, select
+
+from db import postgres
+from models.entity import LoginHistory
+from services.login_events import LoginHistoryWriter
+
+
+async def history_count(user_id) -> int:
+    async with postgres.async_session() as session:
+        query = select(func.count()).where(LoginHistory.user_id == user_id)
+        return (await session.execute(query)).scalar()
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_batches(user_with_history, statements):
+    user_id, _ = user_with_history
+    writer = LoginHistoryWriter(postgres.async_session, 3, 60, 100)
+    for _ in range(7):
+        writer.record(user_id)
+    assert writer.full.is_set()
+    await writer.flush()
+    inserts = [query for query in statements if query.startswith("INSERT")]
+    assert len(inserts) == 3
+    assert writer.written == 7
+    assert await history_count(user_id) == 27
+
+
+@pytest.mark.asyncio
+async def test_close_drains_buffer(user_with_history):
+    user_id, _ = user_with_history
+    writer = LoginHistoryWriter(postgres.async_session, 100, 60, 100)
+    task = asyncio.create_task(writer.run())
+    writer.record(user_id)
+    writer.record(user_id)
+    await asyncio.sleep(0)
+    assert await history_count(user_id) == 20
+    await writer.close(task)
+    assert writer.stats()["buffered"] == 0
+    assert await history_count(user_id) == 22
+
+
+@pytest.mark.asyncio
+async def test_writer_survives_unexpected_error(monkeypatch):
+    writer = LoginHistoryWriter(postgres.async_session, 2, 60, 100)
+    written = []
+
+    async def insert(rows):
+        if not written:
+            written.append(None)
+            raise RuntimeError("unexpected")
+        written.extend(rows)
+
+    monkeypatch.setattr(writer, "insert", insert)
+    task = asyncio.create_task(writer.run())
+    for expected in (1, 3):
+        writer.record("user")
+        writer.record("user")
+        for _ in range(100):
+            if len(written) == expected:
+                break
+            await asyncio.sleep(0.01)
+    # Пачка с ошибкой отброшена, следующая записана тем же писателем.
+    assert not task.done()
+    assert writer.dropped == 2
+    assert len(written) == 3
+    await writer.close(task)
+
+
+def test_buffer_is_bounded():
+    writer = LoginHistoryWriter(postgres.async_session, 100, 60, 5)
+    for _ in range(8):
+        writer.record("user")
+    assert len(writer.buffer) == 5
+    assert writer.dropped == 3
+
+
+@pytest.mark.asyncio
+async def test_rejected_row_does_not_block_batch(user_with_history):
+    user_id, _ = user_with_history
+    writer = LoginHistoryWriter(postgres.async_session, 10, 60, 100)
+    writer.record(user_id)
+    # Пользователь удален до записи истории - внешний ключ не пропустит.
+    writer.record(uuid.uuid4())
+    writer.record(user_id)
+    await writer.flush()
+    assert writer.buffer == []
+    assert writer.written == 2
+    assert writer.dropped == 1
+    assert await history_count(user_id) == 22
+
+
+@pytest.mark.asyncio
+async def test_requeue_is_bounded():
+    def unavailable():
+        raise OSError("connection refused")
+
+    writer = LoginHistoryWriter(unavailable, 2, 60, 3)
+    for _ in range(3):
+        writer.record("user")
+    await writer.flush()
+    writer.record("user")
+    await writer.flush()
+    assert len(writer.buffer) == 3
+    assert writer.dropped == 1
+    assert writer.failed == 2
@@ -0,0 +1,80 @@
+import uuid
+
+import pytest
+
+from redis.asyncio import Redis
+from sqlalchemy import delete, func, select
+
+from core import hashing
+from core.config import settings
+from db import postgres, redis
+from models.entity import LoginNetwork, User
+from schemas.auth import Login, NetworkUser
+from services import oauth
+from services.auth import AuthService
+
+
+@pytest.fixture
+def hasher(monkeypatch):
+    hasher = hashing.HashingExecutor("thread", 1, 4, "pbkdf2:sha256:1000")
+    monkeypatch.setattr(hashing, "hasher", hasher)
+    yield hasher
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_upsert_network_user(hasher, statements):
+    login = f"test_{uuid.uuid4().hex[:16]}"
+    user_info = NetworkUser(id="1", login=login, first_name="first")
+    try:
+        async with postgres.async_session() as session:
+            service = AuthService(session)
+            created = await service.upsert_network_user("yandex", user_info)
+            statements.clear()
+            again = await service.upsert_network_user("yandex", user_info)
+            # Существующий пользователь не обновляется, только читается.
+            assert len([s for s in statements if "INSERT" in s]) == 2
+            assert not [s for s in statements if s.startswith("UPDATE")]
+            assert again.uuid == created.uuid
+            assert again.first_name == "first"
+
+            links = await session.scalar(
+                select(func.count()).where(LoginNetwork.user_id == created.uuid)
+            )
+            assert links == 1
+            # Пароля у пользователя соцсети нет.
+            assert not await service.get(Login(login=login, password="default"))
+    finally:
+        async with postgres.async_session() as session:
+            await session.execute(delete(User).where(User.login == login))
+            await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_userinfo_cache(monkeypatch):
+    calls = []
+
+    class Provider(oauth.OAuthProvider):
+        name = "test"
+
+        def authorize_url(self) -> str:
+            return ""
+
+        async def userinfo(self, client, token: str) -> NetworkUser:
+            calls.append(token)
+            return NetworkUser(id=token, login=f"login_{token}")
+
+    monkeypatch.setitem(oauth.providers, "test", Provider())
+    monkeypatch.setattr(
+        redis, "redis", Redis(host=settings.redis_host, port=settings.redis_port)
+    )
+    token = uuid.uuid4().hex
+    try:
+        first = await oauth.get_userinfo("test", token)
+        assert await oauth.get_userinfo("test", token) == first
+        assert calls == [token]
+        assert await oauth.get_userinfo("test", "other") != first
+        # В Redis только хеш токена.
+        assert not await redis.redis.keys(f"*{token}*")
+    finally:
+        await redis.redis.close()
@@ -0,0 +1,35 @@
+import pytest
+
+from fastapi import HTTPException
+
+from db import postgres
+from services.login_history import LoginHistoryService
+
+
+@pytest.mark.asyncio
+async def test_login_history_pages_cover_all_rows(user_with_history, statements):
+    user_id, _ = user_with_history
+    seen = []
+    cursor = None
+    async with postgres.async_session() as session:
+        service = LoginHistoryService(session)
+        while True:
+            before = len(statements)
+            page, cursor = await service.get_page(user_id, 7, cursor)
+            # Каждая страница, в том числе последняя, — один запрос.
+            assert len(statements) - before == 1
+            seen.extend(page)
+            if not cursor:
+                break
+    assert len(seen) == 20
+    assert len({entry.uuid for entry in seen}) == 20
+    moments = [entry.login_datetime for entry in seen]
+    assert moments == sorted(moments, reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_invalid_cursor_is_rejected(user_with_history):
+    user_id, _ = user_with_history
+    async with postgres.async_session() as session:
+        with pytest.raises(HTTPException):
+            await LoginHistoryService(session).get_page(user_id, 7, "not-a-cursor")
@@ -0,0 +1,46 @@
+from datetime import date
+
+from db.partitions import (
+    add_months,
+    attach_partition_sql,
+    create_partition_sql,
+    expired_partitions,
+    months_between,
+    partition_name,
+)
+
+
+def test_months_wrap_over_year():
+    assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert months_between(date(2026, 11, 17), date(2027, 1, 1)) == [
+        date(2026, 11, 1),
+        date(2026, 12, 1),
+        date(2027, 1, 1),
+    ]
+
+
+def test_partition_covers_one_month():
+    sql = create_partition_sql(date(2026, 12, 1))
+    assert partition_name(date(2026, 12, 1)) == "login_history_2026_12"
+    assert "FROM ('2026-12-01') TO ('2027-01-01')" in sql
+
+
+def test_expired_partitions_keep_retention_window():
+    names = [
+        "login_history_2025_09",
+        "login_history_2025_10",
+        "login_history_2026_10",
+        "login_history_default",
+    ]
+    today = date(2026, 10, 18)
+    assert expired_partitions(names, today, 12) == ["login_history_2025_09"]
+    assert expired_partitions(names, today, 0) == []
+
+
+def test_late_partition_takes_rows_from_default():
+    create, move, attach = attach_partition_sql(date(2026, 12, 1))
+    assert create.startswith("CREATE TABLE login_history_2026_12 (LIKE")
+    assert "DELETE FROM login_history_default" in move
+    assert "login_datetime < '2027-01-01'" in move
+    assert attach.endswith("FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')")
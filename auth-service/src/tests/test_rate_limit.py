@@ -0,0 +1,98 @@
+import uuid
+
+import pytest
+
+from fastapi import HTTPException
+from redis.asyncio import Redis
+from starlette.requests import Request
+
+from core import check_auth
+from core.config import settings
+from services import rate_limit
+from services.rate_limit import HybridRateLimiter, RateLimit, client_ip, principal
+
+
+def make_request(path: str, headers: dict | None = None) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "headers": [
+            (name.lower().encode(), value.encode())
+            for name, value in (headers or {}).items()
+        ],
+        "client": ("10.0.0.1", 1234),
+    })
+
+
+def test_local_bucket(monkeypatch):
+    now = 100.0
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now)
+    limiter = HybridRateLimiter(None, 1)
+
+    assert all(limiter.acquire("key", 10, 1) == 0 for _ in range(10))
+    assert limiter.acquire("key", 10, 1) == pytest.approx(0.1)
+    assert limiter.acquire("other", 10, 1) == 0
+
+    now += 0.25
+    # За 0.25 с накопилось 2.5 запроса.
+    assert limiter.acquire("key", 10, 1) == 0
+    assert limiter.acquire("key", 10, 1) == 0
+    assert limiter.acquire("key", 10, 1) == pytest.approx(0.05)
+
+
+@pytest.mark.asyncio
+async def test_workers_share_limit():
+    redis = Redis(host=settings.redis_host, port=settings.redis_port)
+    key = uuid.uuid4().hex
+    first, second = HybridRateLimiter(redis, 1), HybridRateLimiter(redis, 1)
+    try:
+        for _ in range(7):
+            assert first.acquire(key, 10, 60) == 0
+        await first.sync()
+
+        # Второй воркер после сверки знает о чужих запросах.
+        assert second.acquire(key, 10, 60) == 0
+        await second.sync()
+        assert second.acquire(key, 10, 60) == 0
+        assert second.acquire(key, 10, 60) == 0
+        assert second.acquire(key, 10, 60) > 0
+
+        # Запросы отправляются в Redis один раз.
+        await second.sync()
+        windows = await redis.keys(f"rate_limit:{key}:*")
+        assert sum(int(count) for count in await redis.mget(windows)) == 10
+    finally:
+        await redis.close()
+
+
+@pytest.mark.asyncio
+async def test_dependency_keys(monkeypatch):
+    monkeypatch.setattr(rate_limit, "limiter", HybridRateLimiter(None, 1))
+    monkeypatch.setattr(check_auth, "decode_token", lambda token: {"u": token})
+    limit = RateLimit(times=1, seconds=60, identifier=principal)
+
+    await limit(make_request("/a", {"Authorization": "Bearer alice"}))
+    # Другой маршрут и другой пользователь с того же адреса - свои лимиты.
+    await limit(make_request("/b", {"Authorization": "Bearer alice"}))
+    await limit(make_request("/a", {"Authorization": "Bearer bob"}))
+    with pytest.raises(HTTPException) as error:
+        await limit(make_request("/a", {"Authorization": "Bearer alice"}))
+    assert error.value.status_code == 429
+    assert error.value.headers == {"Retry-After": "60"}
+
+    # Без токена ключом служит адрес клиента.
+    await limit(make_request("/a"))
+    with pytest.raises(HTTPException):
+        await limit(make_request("/a"))
+
+
+def test_forwarded_for_only_from_trusted_proxy(monkeypatch):
+    spoofed = {"X-Forwarded-For": "1.2.3.4"}
+    assert client_ip(make_request("/", spoofed)) == "10.0.0.1"
+
+    monkeypatch.setattr(settings, "trusted_proxies", "10.0.0.0/8, 172.16.0.0/12")
+    # Левый адрес подставлен клиентом, правые добавлены прокси.
+    chain = {"X-Forwarded-For": "1.2.3.4, 5.6.7.8, 172.17.0.2"}
+    assert client_ip(make_request("/", chain)) == "5.6.7.8"
+    assert client_ip(make_request("/")) == "10.0.0.1"
@@ -0,0 +1,82 @@
+import uuid
+
+import pytest
+import pytest_asyncio
+
+from redis.asyncio import Redis
+
+from core.config import settings
+from services.refresh_tokens import RefreshTokenStore
+
+
+@pytest_asyncio.fixture
+async def store():
+    redis = Redis(host=settings.redis_host, port=settings.redis_port)
+    store = RefreshTokenStore(redis, 60)
+    user_id = uuid.uuid4()
+    yield store, user_id
+    await store.revoke_all(user_id)
+    await redis.close()
+
+
+@pytest.mark.asyncio
+async def test_rotation(store):
+    store, user_id = store
+    family = store.new_family()
+    await store.start(user_id, family, "token-1")
+    assert await store.rotate(family, "token-1", "token-2")
+    assert await store.rotate(family, "token-2", "token-3")
+    assert await store.families(user_id) == {family}
+
+
+@pytest.mark.asyncio
+async def test_rotation_extends_user_families(store):
+    store, user_id = store
+    family = store.new_family()
+    await store.start(user_id, family, "token-1")
+    user_key = store.user_key.format(user_id)
+    await store.redis.expire(user_key, 5)
+    assert await store.rotate(family, "token-1", "token-2")
+    assert await store.redis.ttl(user_key) > 5
+
+    await store.revoke_all(user_id)
+    assert not await store.rotate(family, "token-2", "token-3")
+
+
+@pytest.mark.asyncio
+async def test_reuse_revokes_family(store):
+    store, user_id = store
+    family = store.new_family()
+    await store.start(user_id, family, "token-1")
+    assert await store.rotate(family, "token-1", "token-2")
+
+    assert not await store.rotate(family, "token-1", "token-3")
+    # Семейство отозвано: не действует и последний выданный токен.
+    assert not await store.rotate(family, "token-2", "token-4")
+    assert await store.families(user_id) == set()
+
+
+@pytest.mark.asyncio
+async def test_devices_are_independent(store):
+    store, user_id = store
+    phone, laptop = store.new_family(), store.new_family()
+    await store.start(user_id, phone, "phone-1")
+    await store.start(user_id, laptop, "laptop-1")
+
+    await store.revoke(phone)
+    assert not await store.rotate(phone, "phone-1", "phone-2")
+    assert await store.rotate(laptop, "laptop-1", "laptop-2")
+
+    await store.revoke_all(user_id)
+    assert not await store.rotate(laptop, "laptop-2", "laptop-3")
+    assert await store.families(user_id) == set()
+
+
+@pytest.mark.asyncio
+async def test_only_hash_is_stored(store):
+    store, user_id = store
+    family = store.new_family()
+    await store.start(user_id, family, "secret-token")
+    stored = await store.redis.hgetall(store.family_key.format(family))
+    assert b"secret-token" not in stored.values()
+    assert await store.redis.ttl(store.family_key.format(family)) <= 60
@@ -0,0 +1,67 @@
+import logging
+
+import httpx
+import pytest
+
+from fastapi import FastAPI
+
+from core import request_context
+from core.request_context import RequestContextMiddleware, RequestIdFilter
+
+
+@pytest.fixture
+def app():
+    calls = []
+    app = FastAPI()
+
+    @app.post("/login")
+    async def login() -> dict:
+        calls.append(request_context.request_id.get())
+        return {}
+
+    app.add_middleware(RequestContextMiddleware)
+    app.state.calls = calls
+    return app
+
+
+async def post(app: FastAPI, headers: dict) -> httpx.Response:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post("/login", headers=headers)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "headers, detail",
+    [
+        ({}, "X-Request-Id is required"),
+        ({"X-Request-Id": ""}, "X-Request-Id is invalid"),
+        ({"X-Request-Id": "a b"}, "X-Request-Id is invalid"),
+        ({"X-Request-Id": "a" * 129}, "X-Request-Id is invalid"),
+    ],
+)
+async def test_rejected_before_handler(app, headers, detail):
+    response = await post(app, headers)
+    assert response.status_code == 400
+    assert response.json() == {"detail": detail}
+    assert app.state.calls == []
+
+
+@pytest.mark.asyncio
+async def test_request_id_propagated(app):
+    response = await post(app, {"X-Request-Id": "0f3a9c"})
+    assert response.status_code == 200
+    assert response.headers["X-Request-Id"] == "0f3a9c"
+    assert app.state.calls == ["0f3a9c"]
+    # Вне запроса контекст сброшен.
+    assert request_context.request_id.get() == "-"
+
+
+def test_log_filter():
+    record = logging.LogRecord("test", logging.INFO, "", 0, "message", None, None)
+    token = request_context.request_id.set("0f3a9c")
+    try:
+        RequestIdFilter().filter(record)
+    finally:
+        request_context.request_id.reset(token)
+    assert record.request_id == "0f3a9c"
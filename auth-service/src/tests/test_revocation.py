@@ -0,0 +1,40 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+
+from redis.asyncio import Redis
+
+from core.check_auth import is_revoked
+from core.config import settings
+from services import revocation
+from services.cache import CacheServise
+
+
+@pytest.mark.asyncio
+async def test_unloaded_cache_checks_redis(monkeypatch):
+    redis = Redis(host=settings.redis_host, port=settings.redis_port)
+    cache = CacheServise(redis)
+    local = revocation.RevokedTokensCache(redis)
+    monkeypatch.setattr(revocation, "revoked_tokens", local)
+    token_id = str(uuid.uuid4())
+    await cache.revoke_token(token_id, int(time.time()) + 60)
+
+    # До первого снимка локальный набор пуст, но отказа быть не должно.
+    assert await is_revoked(cache, token_id)
+
+    listener = asyncio.create_task(local.run())
+    for _ in range(50):
+        if local.loaded:
+            break
+        await asyncio.sleep(0.01)
+    assert local.loaded
+    assert await is_revoked(cache, token_id)
+
+    listener.cancel()
+    await asyncio.gather(listener, return_exceptions=True)
+    # Без подписки набор устаревает: снова спрашиваем Redis.
+    assert not local.loaded
+    assert await is_revoked(cache, token_id)
+    await redis.close()
@@ -0,0 +1,149 @@
+import uuid
+
+import pytest
+import pytest_asyncio
+
+from redis.asyncio import Redis
+from sqlalchemy import delete
+
+from core.check_auth import CustomError, has_roles, introspect_tokens
+from core.config import settings
+from core.keys import KeyRingAuthJWT
+from db import postgres
+from models.entity import Role
+from services import role_catalog
+from services.cache import CacheServise
+from services.role_catalog import RoleCatalog, decode_bits, encode_bits
+
+
+async def add_role(name: str, service: str) -> Role:
+    async with postgres.async_session() as session:
+        role = Role(name, service)
+        session.add(role)
+        await session.commit()
+        return role
+
+
+@pytest_asyncio.fixture
+async def catalog():
+    tag = uuid.uuid4().hex[:8]
+    redis = Redis(host=settings.redis_host, port=settings.redis_port)
+    roles = {
+        "viewer": await add_role(f"viewer_{tag}", "movies"),
+        "editor": await add_role(f"editor_{tag}", "movies"),
+        "admin": await add_role(f"editor_{tag}", "auth"),
+    }
+    catalog = RoleCatalog(postgres.async_session, redis)
+    await catalog.load()
+    yield catalog, roles
+    async with postgres.async_session() as session:
+        ids = [role.id for role in roles.values()]
+        await session.execute(delete(Role).where(Role.id.in_(ids)))
+        await session.commit()
+    await redis.delete(RoleCatalog.version_key)
+    await redis.close()
+
+
+@pytest.mark.asyncio
+async def test_masks(catalog):
+    catalog, roles = catalog
+    viewer, editor = roles["viewer"], roles["editor"]
+    bits = await catalog.role_bits([viewer.id])
+    assert decode_bits(encode_bits(bits)) == bits == 1 << viewer.bit
+    assert catalog.allows(bits, [viewer.name])
+    assert not catalog.allows(bits, [editor.name])
+    assert not catalog.allows(bits, ["unknown"])
+
+    # Одно имя в двух сервисах: доступ ограничивается ролью нужного сервиса.
+    admin_bits = await catalog.role_bits([roles["admin"].id])
+    assert catalog.allows(admin_bits, [editor.name])
+    assert catalog.allows(admin_bits, [editor.name], "auth")
+    assert not catalog.allows(admin_bits, [editor.name], "movies")
+
+
+@pytest.mark.asyncio
+async def test_unknown_role_reloads(catalog):
+    catalog, roles = catalog
+    role = await add_role(f"late_{uuid.uuid4().hex[:8]}", "movies")
+    roles["late"] = role
+    assert await catalog.role_bits([role.id]) == 1 << role.bit
+    assert catalog.allows(1 << role.bit, [role.name])
+
+
+@pytest.mark.asyncio
+async def test_refresh_by_version(catalog):
+    catalog, roles = catalog
+    other = RoleCatalog(postgres.async_session, catalog.redis)
+    await other.load()
+    role = await add_role(f"new_{uuid.uuid4().hex[:8]}", "movies")
+    roles["new"] = role
+    await other.refresh()
+    assert str(role.id) not in other.by_id
+
+    await catalog.changed()
+    await other.refresh()
+    assert str(role.id) in other.by_id
+
+
+@pytest.mark.asyncio
+async def test_has_roles_uses_bits(catalog, monkeypatch):
+    catalog, roles = catalog
+    viewer = roles["viewer"]
+    claims = {
+        "roles": [],
+        "role_bits": encode_bits(await catalog.role_bits([viewer.id])),
+    }
+    monkeypatch.setattr(role_catalog, "catalog", catalog)
+    assert has_roles(claims, [viewer.name])
+    assert not has_roles(claims, [roles["editor"].name])
+    assert has_roles(claims, [])
+
+
+@pytest.mark.asyncio
+async def test_compact_token_before_catalog_load(catalog, monkeypatch):
+    catalog, roles = catalog
+    viewer = roles["viewer"]
+    claims = {"rb": encode_bits(await catalog.role_bits([viewer.id]))}
+    fresh = RoleCatalog(postgres.async_session, catalog.redis)
+    monkeypatch.setattr(role_catalog, "catalog", fresh)
+    # До загрузки каталога - не отказ в доступе, а временная ошибка.
+    with pytest.raises(CustomError) as error:
+        has_roles(claims, [viewer.name])
+    assert error.value.status_code == 503
+
+    await role_catalog.ensure_loaded()
+    assert fresh.loaded
+    assert has_roles(claims, [viewer.name])
+
+
+@pytest.mark.asyncio
+async def test_batch_verdict_without_catalog(catalog, monkeypatch):
+    catalog, roles = catalog
+    viewer = roles["viewer"]
+    bits = encode_bits(await catalog.role_bits([viewer.id]))
+    token = await KeyRingAuthJWT().create_access_token(
+        subject="test", user_claims={"u": str(uuid.uuid4()), "rb": bits}
+    )
+    fresh = RoleCatalog(postgres.async_session, catalog.redis)
+
+    async def load():
+        raise ConnectionError("redis is down")
+
+    monkeypatch.setattr(fresh, "load", load)
+    monkeypatch.setattr(role_catalog, "catalog", fresh)
+    results = await introspect_tokens(
+        CacheServise(catalog.redis), [token, "broken"], [viewer.name]
+    )
+    # Ошибка каталога - отказ токену с ролями, а не 503 всей пачке.
+    assert [result["valid"] for result in results] == [False, False]
+    assert results[0]["detail"].startswith("Каталог ролей недоступен")
+
+
+def test_has_roles_without_bits():
+    claims = {"roles": [{"name": "editor", "service": "auth"}]}
+    assert has_roles(claims, ["editor"])
+    assert has_roles(claims, ["editor"], "auth")
+    assert not has_roles(claims, ["editor"], "movies")
+    assert not has_roles(claims, ["viewer"])
+    superuser = {"roles": [{"name": settings.superrole_name, "service": "auth"}]}
+    assert has_roles(superuser, ["viewer"], "movies")
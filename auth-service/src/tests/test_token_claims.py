@@ -0,0 +1,62 @@
+import uuid
+
+from datetime import datetime
+
+from core.check_auth import has_roles, token_uuid
+from schemas.roles import RoleSchema
+from schemas.users import UserRolesSchema
+from services import role_catalog
+from services.auth import build_claims
+from services.role_catalog import RoleCatalog
+
+
+def make_user(*names: str) -> UserRolesSchema:
+    return UserRolesSchema(
+        id=uuid.uuid4(),
+        login="user",
+        first_name="first",
+        last_name="last",
+        created_at=datetime.now(),
+        roles=[
+            RoleSchema(id=uuid.uuid4(), name=name, service="auth") for name in names
+        ],
+    )
+
+
+def make_catalog(*names: str) -> RoleCatalog:
+    catalog = RoleCatalog(None, None)
+    catalog.by_name = {name: 1 << bit for bit, name in enumerate(names)}
+    catalog.by_service = {"auth": (1 << len(names)) - 1}
+    catalog.loaded = True
+    return catalog
+
+
+def test_profiles():
+    user = make_user("editor", "viewer")
+    full = build_claims(user, 0b11, "full")
+    assert token_uuid(full) == str(user.uuid)
+    assert [role["name"] for role in full["roles"]] == ["editor", "viewer"]
+    assert full["role_bits"] == "3"
+
+    compact = build_claims(user, 0b11, "compact")
+    assert compact == {"u": str(user.uuid), "rb": "3"}
+    assert token_uuid(compact) == str(user.uuid)
+
+    # Без маски ролей компактный токен не выпускается.
+    assert "roles" in build_claims(user, None, "compact")
+
+
+def test_compact_roles_check(monkeypatch):
+    user = make_user("editor")
+    compact = build_claims(user, 0b01, "compact")
+    full = build_claims(user, None, "full")
+
+    monkeypatch.setattr(role_catalog, "catalog", None)
+    assert not has_roles(compact, ["editor"])
+    assert has_roles(full, ["editor"])
+
+    monkeypatch.setattr(role_catalog, "catalog", make_catalog("editor", "viewer"))
+    assert has_roles(compact, ["editor"])
+    assert not has_roles(compact, ["viewer"])
+    assert has_roles(full, ["editor"])
+    assert has_roles(compact, [])
@@ -0,0 +1,76 @@
+import httpx
+import pytest
+
+from fastapi import FastAPI
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+from opentelemetry.trace import StatusCode
+
+from core import tracing
+from core.request_context import RequestContextMiddleware
+from core.tracing import TracingMiddleware, build_tracer_provider, traced
+
+
+def make_app(monkeypatch, sample_ratio: float) -> tuple[FastAPI, InMemorySpanExporter]:
+    exporter = InMemorySpanExporter()
+    provider = build_tracer_provider(sample_ratio, 8, 8)
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(tracing, "tracer", provider.get_tracer("test"))
+
+    @traced
+    async def load(item_id: str) -> dict:
+        if item_id == "broken":
+            raise RuntimeError(item_id)
+        return {"id": item_id}
+
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str) -> dict:
+        return await load(item_id)
+
+    app.add_middleware(TracingMiddleware, tracer_provider=provider)
+    app.add_middleware(RequestContextMiddleware)
+    return app, exporter
+
+
+async def get(app: FastAPI, path: str) -> httpx.Response:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path, headers={"X-Request-Id": "request-id-1234"})
+
+
+@pytest.mark.asyncio
+async def test_request_span(monkeypatch):
+    app, exporter = make_app(monkeypatch, 1.0)
+    assert (await get(app, "/items/1")).status_code == 200
+
+    child, server = exporter.get_finished_spans()
+    assert server.name == "GET /items/{item_id}"
+    assert server.attributes["http.status_code"] == 200
+    # Длина атрибутов ограничена SpanLimits.
+    assert server.attributes["http.request_id"] == "request-"
+    assert child.name == "make_app.<locals>.load"
+    assert child.parent.span_id == server.context.span_id
+
+
+@pytest.mark.asyncio
+async def test_span_ends_on_error(monkeypatch):
+    app, exporter = make_app(monkeypatch, 1.0)
+    with pytest.raises(RuntimeError):
+        await get(app, "/items/broken")
+
+    spans = exporter.get_finished_spans()
+    assert len(spans) == 2
+    assert all(span.status.status_code == StatusCode.ERROR for span in spans)
+    assert spans[1].events[0].name == "exception"
+
+
+@pytest.mark.asyncio
+async def test_unsampled_requests_are_not_exported(monkeypatch):
+    app, exporter = make_app(monkeypatch, 0.0)
+    for _ in range(10):
+        assert (await get(app, "/items/1")).status_code == 200
+    assert not exporter.get_finished_spans()
@@ -0,0 +1,152 @@
+import json
+import threading
+import time
+import uuid
+
+import pytest
+
+from sqlalchemy import delete, select
+
+from core import hashing
+from db import postgres
+from models.entity import User
+from schemas.users import UserCreateSchema, UserImportResult
+from services.user_import import UserImportService, parse_rows, read_lines
+
+
+async def stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+async def parse(fmt: str, *chunks: bytes) -> list:
+    return [row async for row in parse_rows(read_lines(stream(*chunks)), fmt)]
+
+
+def user(login: str, **fields) -> dict:
+    return {
+        "login": login,
+        "password": "secret",
+        "first_name": "first",
+        "last_name": "last",
+        **fields,
+    }
+
+
+@pytest.mark.asyncio
+async def test_ndjson_lines_split_across_chunks():
+    data = "\n".join(json.dumps(user(f"user_{i}")) for i in range(3)).encode()
+    rows = await parse("ndjson", data[:10], data[10:55], data[55:])
+    assert [line for line, _ in rows] == [1, 2, 3]
+    assert [row.login for _, row in rows] == ["user_0", "user_1", "user_2"]
+
+
+@pytest.mark.asyncio
+async def test_invalid_rows_are_reported_by_line():
+    data = "\n".join(
+        [
+            json.dumps(user("ok")),
+            "{not json",
+            json.dumps(user("x" * 40)),
+            "",
+            json.dumps({"login": "no_password"}),
+        ]
+    ).encode()
+    rows = dict(await parse("ndjson", data))
+    assert rows[1].login == "ok"
+    assert rows[2] == "Некорректный JSON"
+    assert rows[3].startswith("login:")
+    assert 4 not in rows
+    assert rows[5].startswith("password:")
+
+
+@pytest.mark.asyncio
+async def test_invalid_utf8_is_row_error():
+    data = json.dumps(user("ok")).encode() + b"\n" + b'{"login": "\xff\xfe"}\n'
+    rows = dict(await parse("ndjson", data))
+    assert rows[1].login == "ok"
+    assert rows[2] == "Строка не в кодировке UTF-8"
+
+
+@pytest.mark.asyncio
+async def test_csv_with_header():
+    data = (
+        "login,password,first_name,last_name\r\n"
+        "user_1,secret,Иван,\"Иванов, мл.\"\r\n"
+        "user_2,secret,first\r\n"
+    ).encode()
+    rows = dict(await parse("csv", data))
+    assert rows[2].last_name == "Иванов, мл."
+    assert rows[3].startswith("last_name:")
+
+
+@pytest.mark.asyncio
+async def test_hash_passwords_keeps_order():
+    hasher = hashing.HashingExecutor("thread", 3, 4, "pbkdf2:sha256:1000")
+    try:
+        passwords = [f"password_{i}" for i in range(10)]
+        hashes = await hasher.hash_passwords(passwords)
+        for password, pwhash in zip(passwords, hashes):
+            assert await hasher.check_password(pwhash, password)
+        assert await hasher.hash_passwords([]) == []
+    finally:
+        hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_import_leaves_workers_for_login(monkeypatch):
+    state = {"active": 0, "max_active": 0, "sizes": []}
+    lock = threading.Lock()
+
+    def hash_many(method: str, passwords: list[str]) -> list[str]:
+        with lock:
+            state["active"] += 1
+            state["max_active"] = max(state["max_active"], state["active"])
+            state["sizes"].append(len(passwords))
+        time.sleep(0.001)
+        with lock:
+            state["active"] -= 1
+        return passwords
+
+    monkeypatch.setattr(hashing, "hash_many", hash_many)
+    hasher = hashing.HashingExecutor("thread", 3, 2, "pbkdf2:sha256:1000")
+    try:
+        passwords = [f"password_{i}" for i in range(50)]
+        # max_pending меньше числа частей: импорт ждет, а не получает 503.
+        assert await hasher.hash_passwords(passwords) == passwords
+    finally:
+        hasher.shutdown()
+    assert state["max_active"] == 1
+    assert max(state["sizes"]) == hashing.IMPORT_CHUNK_SIZE
+
+
+@pytest.mark.asyncio
+async def test_write_batch(monkeypatch):
+    hasher = hashing.HashingExecutor("thread", 2, 4, "pbkdf2:sha256:1000")
+    monkeypatch.setattr(hashing, "hasher", hasher)
+    prefix = f"test_{uuid.uuid4().hex[:8]}"
+    existing, new = f"{prefix}_existing", f"{prefix}_new"
+    batch = [
+        (line, UserCreateSchema.model_validate(user(login)))
+        for line, login in [(1, new), (2, existing), (3, new)]
+    ]
+    result = UserImportResult()
+    try:
+        async with postgres.async_session() as session:
+            session.add(User(existing, "hash", "first", "last"))
+            await session.commit()
+            await UserImportService(session, None).write_batch(batch, result)
+
+        assert result.created == 1
+        assert [(error.line, error.detail) for error in result.errors] == [
+            (2, "Пользователь с таким login уже существует."),
+            (3, "Пользователь с таким login уже существует."),
+        ]
+        async with postgres.async_session() as session:
+            created = await session.scalar(select(User).where(User.login == new))
+        assert await hasher.check_password(created.password, "secret")
+    finally:
+        hasher.shutdown()
+        async with postgres.async_session() as session:
+            await session.execute(delete(User).where(User.login.startswith(prefix)))
+            await session.commit()
@@ -14,6 +14,9 @@ class Settings(BaseSettings):
     superuser_login: str = os.environ.get("SUPERUSER_LOGIN")
     superuser_password: str = os.environ.get("SUPERUSER_PASSWORD")
 
+    login_max_failures: int = Field(5, alias="LOGIN_MAX_FAILURES")
+    service_token: str = Field("", alias="SERVICE_TOKEN")
+
     roles_change_data: list = ["admin"]
     roles_view_data: list = ["admin", "manager"]
 
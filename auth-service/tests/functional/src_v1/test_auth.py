@@ -1,3 +1,5 @@
+import uuid
+
 import pytest
 
 from http import HTTPStatus
@@ -41,8 +43,52 @@ async def test_refresh(make_get_request):
     body, _, status = await make_get_request(path=path, headers=headers)
     assert status == HTTPStatus.OK
     assert "access_token" in body
+    assert body["refresh_token"] != refresh_token
 
     access_token = body["access_token"]
+    refresh_token = body["refresh_token"]
+
+
+@pytest.mark.asyncio
+async def test_refresh_reuse_revokes_family(make_post_request, make_get_request):
+    path = "api/v1/auth/login"
+    body = {"login": settings.superuser_login, "password": settings.superuser_password}
+    body, _, status = await make_post_request(path=path, body=body)
+    assert status == HTTPStatus.OK
+    first = body["refresh_token"]
+
+    path = "api/v1/auth/refresh"
+    body, _, status = await make_get_request(
+        path=path, headers={"Authorization": "Bearer " + first}
+    )
+    assert status == HTTPStatus.OK
+    second = body["refresh_token"]
+
+    # Повтор использованного токена отзывает и выданный взамен.
+    for token in (first, second):
+        _, _, status = await make_get_request(
+            path=path, headers={"Authorization": "Bearer " + token}
+        )
+        assert status == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_check_auth_batch(make_post_request):
+    global access_token
+    path = "api/v1/auth/check_auth_batch"
+    headers = {
+        "Content-type": "application/json",
+        "Accept": "application/json",
+    }
+    data = {"tokens": [access_token, "invalid"], "roles": []}
+    _, _, status = await make_post_request(path=path, body=data, headers=headers)
+    assert status == HTTPStatus.FORBIDDEN
+
+    headers["X-Service-Token"] = settings.service_token
+    body, _, status = await make_post_request(path=path, body=data, headers=headers)
+    assert status == HTTPStatus.OK
+    assert [result["valid"] for result in body["results"]] == [True, False]
+    assert body["results"][0]["uuid"] == settings.superuser_uuid
 
 
 @pytest.mark.asyncio
@@ -59,6 +105,34 @@ async def test_logout(make_get_request):
     assert status == HTTPStatus.NO_CONTENT
 
 
+@pytest.mark.asyncio
+async def test_revoked_after_logout(make_get_request):
+    path = "api/v1/auth/revoked"
+    headers = {
+        "Content-type": "application/json",
+        "Accept": "application/json",
+    }
+    _, _, status = await make_get_request(path=path, headers=headers)
+    assert status == HTTPStatus.FORBIDDEN
+
+    headers["X-Service-Token"] = settings.service_token
+    body, _, status = await make_get_request(path=path, headers=headers)
+    assert status == HTTPStatus.OK
+    assert isinstance(body["tokens"], dict)
+    assert len(body["tokens"]) >= 1
+
+
+@pytest.mark.asyncio
+async def test_jwks(make_get_request):
+    path = "api/v1/auth/jwks"
+    body, headers, status = await make_get_request(path=path)
+    assert status == HTTPStatus.OK
+    assert headers["Cache-Control"].startswith("public, max-age=")
+    assert isinstance(body["keys"], list)
+    for key in body["keys"]:
+        assert key["kid"] and key["use"] == "sig"
+
+
 @pytest.mark.asyncio
 async def test_protected(make_get_request):
     global access_token
@@ -85,3 +159,16 @@ async def test_refresh_before_logout(make_get_request):
     }
     body, _, status = await make_get_request(path=path, headers=headers)
     assert status == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_login_lockout(make_post_request):
+    # Несуществующий логин блокируется так же, как существующий.
+    body = {"login": str(uuid.uuid4()), "password": "wrong"}
+    for _ in range(settings.login_max_failures):
+        _, _, status = await make_post_request(path="api/v1/auth/login", body=body)
+        assert status == HTTPStatus.UNAUTHORIZED
+
+    _, headers, status = await make_post_request(path="api/v1/auth/login", body=body)
+    assert status == HTTPStatus.TOO_MANY_REQUESTS
+    assert int(headers["Retry-After"]) >= 1
@@ -1,4 +1,7 @@
+import json
+import os
 import pytest
+import uuid
 
 from http import HTTPStatus
 
@@ -87,6 +90,31 @@ async def test_create_user(make_post_request):
     created_user_uuid = body["uuid"]
 
 
+@pytest.mark.asyncio
+async def test_get_users_list_pages(make_get_request):
+    global access_token
+    path = "api/v1/users"
+    headers = {
+        "Content-type": "application/json",
+        "Accept": "application/json",
+        "Authorization": "Bearer " + access_token,
+    }
+    first, response_headers, status = await make_get_request(
+        path=path, params={"limit": 1}, headers=headers
+    )
+    assert status == HTTPStatus.OK
+    assert len(first) == 1
+    cursor = response_headers.get("X-Next-Cursor")
+    assert cursor
+
+    second, _, status = await make_get_request(
+        path=path, params={"limit": 1, "cursor": cursor}, headers=headers
+    )
+    assert status == HTTPStatus.OK
+    assert len(second) == 1
+    assert second[0]["uuid"] != first[0]["uuid"]
+
+
 @pytest.mark.asyncio
 async def test_update_user(make_post_request):
     global access_token
@@ -192,6 +220,78 @@ async def test_deprive_role_user(make_post_request):
     assert roles == []
 
 
+@pytest.mark.asyncio
+async def test_bulk_role_user(make_post_request):
+    global access_token
+    global created_user_uuid
+    global created_role_uuid
+    headers = {
+        "Content-type": "application/json",
+        "Accept": "application/json",
+        "Authorization": "Bearer " + access_token,
+    }
+    data = {
+        "role_id": created_role_uuid,
+        "user_ids": [created_user_uuid, settings.superuser_uuid],
+    }
+    path = "api/v1/users/bulk_set_role"
+    body, _, status = await make_post_request(path=path, body=data, headers=headers)
+    assert status == HTTPStatus.OK
+    assert body["requested"] == 2
+    assert body["changed"] == 2
+
+    body, _, status = await make_post_request(path=path, body=data, headers=headers)
+    assert status == HTTPStatus.OK
+    assert body["changed"] == 0
+
+    path = "api/v1/users/bulk_deprive_role"
+    body, _, status = await make_post_request(path=path, body=data, headers=headers)
+    assert status == HTTPStatus.OK
+    assert body["changed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_import_users(http_session, make_get_request):
+    global access_token
+    import_id = str(uuid.uuid4())
+    headers = {
+        "Content-type": "application/x-ndjson",
+        "Accept": "application/json",
+        "Authorization": "Bearer " + access_token,
+        "X-Request-Id": import_id,
+    }
+    rows = [
+        {
+            "login": "imported",
+            "password": "test",
+            "first_name": "test",
+            "last_name": "test",
+        },
+        {
+            "login": settings.superuser_login,
+            "password": "test",
+            "first_name": "test",
+            "last_name": "test",
+        },
+        {"login": "no_password"},
+    ]
+    data = "\n".join(json.dumps(row) for row in rows)
+    url = os.path.join(settings.service_url, "api/v1/users/import")
+    async with http_session.post(url, data=data, headers=headers) as response:
+        body = await response.json()
+        status = response.status
+    assert status == HTTPStatus.OK
+    assert body["processed"] == 3
+    assert body["created"] == 1
+    assert body["failed"] == 2
+    assert sorted(error["line"] for error in body["errors"]) == [2, 3]
+
+    path = f"api/v1/users/import/{import_id}"
+    body, _, status = await make_get_request(path=path, headers=headers)
+    assert status == HTTPStatus.OK
+    assert body == {"processed": 3, "created": 1, "failed": 2, "done": True}
+
+
 @pytest.mark.asyncio
 async def test_remove_user(make_get_request):
     global access_token
@@ -34,12 +34,28 @@ method_list = [
         },
     ),
     (f"api/v1/users/remove/{str(uuid.uuid4())}", "get", {}),
+    ("api/v1/users/import", "post", {}),
+    (f"api/v1/users/import/{str(uuid.uuid4())}", "get", {}),
     ("api/v1/users/login_history", "get", {}),
     (f"api/v1/users/login_history/{str(uuid.uuid4())}", "get", {}),
     ("api/v1/users/set_role", "post", {"user_id": "test", "role_id": "test"}),
     ("api/v1/users/deprive_role", "post", {"user_id": "test", "role_id": "test"}),
+    (
+        "api/v1/users/bulk_set_role",
+        "post",
+        {"role_id": str(uuid.uuid4()), "user_ids": [str(uuid.uuid4())]},
+    ),
+    (
+        "api/v1/users/bulk_deprive_role",
+        "post",
+        {"role_id": str(uuid.uuid4()), "user_ids": [str(uuid.uuid4())]},
+    ),
     # auth
     ("api/v1/auth/refresh", "get", {}),
     ("api/v1/auth/logout", "get", {}),
     ("api/v1/auth/protected", "get", {}),
+    # metrics
+    ("api/v1/metrics/hashing", "get", {}),
+    ("api/v1/metrics/login_history", "get", {}),
+    ("api/v1/metrics/db_pool", "get", {}),
 ]
@@ -30,7 +30,7 @@ async def all_films(
     ] = 1,
     film_service: FilmService = Depends(get_film_service),
 ) -> list[FilmBase]:
-    check_auth_and_roles(request)
+    await check_auth_and_roles(request)
     if page_size * page_number > 10000:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
@@ -59,7 +59,7 @@ async def films_search(
     ] = 1,
     film_service: FilmService = Depends(get_film_service),
 ) -> list[FilmBase]:
-    check_auth_and_roles(request)
+    await check_auth_and_roles(request)
     if page_size * page_number > 10000:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
@@ -82,7 +82,7 @@ async def film_details(
     film_id: str,
     film_service: FilmService = Depends(get_film_service),
 ) -> Film:
-    check_auth_and_roles(request)
+    await check_auth_and_roles(request)
     film = await film_service.get_by_id(film_id)
     if not film:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="film not found")
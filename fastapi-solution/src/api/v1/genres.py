@@ -21,7 +21,7 @@ async def genres(
     request: Request,
     genre_service: GenreService = Depends(get_genre_service),
 ) -> list[Genre]:
-    check_auth_and_roles(request)
+    await check_auth_and_roles(request)
     return await genre_service.get_all()
 
 
@@ -38,7 +38,7 @@ async def genre_details(
     genre_id: str,
     genre_service: GenreService = Depends(get_genre_service),
 ) -> Genre:
-    check_auth_and_roles(request)
+    await check_auth_and_roles(request)
     genre = await genre_service.get_by_id(genre_id)
     if not genre:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="genre not found")
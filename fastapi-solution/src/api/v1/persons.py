@@ -30,7 +30,7 @@ async def persons(
     ] = 1,
     person_service: PersonService = Depends(get_person_service),
 ) -> list[PersonWithFilms]:
-    check_auth_and_roles(request)
+    await check_auth_and_roles(request)
     if page_size * page_number > 10000:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
@@ -53,7 +53,7 @@ async def person_details(
     person_id: str,
     person_service: PersonService = Depends(get_person_service),
 ) -> PersonWithFilms:
-    check_auth_and_roles(request)
+    await check_auth_and_roles(request)
     person = await person_service.get_by_id(person_id)
     if not person:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="person not found")
@@ -79,7 +79,7 @@ async def person_films(
     ] = 1,
     person_service: PersonService = Depends(get_person_service),
 ) -> list[FilmBase]:
-    check_auth_and_roles(request)
+    await check_auth_and_roles(request)
     if page_size * page_number > 10000:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
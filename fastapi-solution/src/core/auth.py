@@ -1,18 +1,204 @@
 import aiohttp
+import asyncio
 import json
+import jwt
+import logging
+import time
 
+from abc import ABC, abstractmethod
 from fastapi import Request, HTTPException
 from http import HTTPStatus
 
 from core.config import settings
 
 
+logger = logging.getLogger(__name__)
+
+
+class AuthSync(ABC):
+    """
+    Данные auth, которые воркер держит у себя: первая синхронизация до
+    приема запросов, дальше раз в auth_sync_interval в фоне.
+    """
+
+    description: str
+
+    @abstractmethod
+    async def sync(self, session: aiohttp.ClientSession) -> None:
+        pass
+
+    async def try_sync(self, session: aiohttp.ClientSession) -> bool:
+        try:
+            await self.sync(session)
+        except (
+            aiohttp.ClientError, asyncio.TimeoutError, ValueError, jwt.PyJWTError
+        ) as error:
+            # Сбой синхронизации не должен останавливать фоновую задачу.
+            logger.warning("Не удалось получить %s: %s", self.description, error)
+            return False
+        return True
+
+    async def sync_once(self) -> bool:
+        async with aiohttp.ClientSession(timeout=sync_timeout()) as session:
+            return await self.try_sync(session)
+
+    async def run(self) -> None:
+        async with aiohttp.ClientSession(timeout=sync_timeout()) as session:
+            while True:
+                await asyncio.sleep(settings.auth_sync_interval)
+                await self.try_sync(session)
+
+
+def sync_timeout() -> aiohttp.ClientTimeout:
+    return aiohttp.ClientTimeout(total=settings.auth_sync_timeout)
+
+
+class RevokedTokens(AuthSync):
+    """
+    Локальное представление отозванных в сервисе авторизации токенов.
+
+    Хранит jti -> exp и периодически синхронизируется с auth,
+    чтобы проверка токена не требовала сетевых запросов. До первой
+    успешной синхронизации токены проверяет сам auth.
+    """
+
+    description = "отозванные токены"
+
+    def __init__(self):
+        self.tokens: dict[str, int] = {}
+        self.synced = False
+
+    def is_revoked(self, token_id: str) -> bool:
+        exp = self.tokens.get(token_id)
+        return exp is not None and exp > time.time()
+
+    async def sync(self, session: aiohttp.ClientSession) -> None:
+        headers = {"X-Service-Token": settings.auth_service_token}
+        async with session.get(
+            settings.auth_url + "/revoked", headers=headers
+        ) as response:
+            response.raise_for_status()
+            data = await response.json()
+        self.tokens = data["tokens"]
+        self.synced = True
+
+
+revoked_tokens = RevokedTokens()
+
+
+class SigningKeys(AuthSync):
+    """
+    Открытые ключи подписи токенов из JWKS сервиса авторизации по kid.
+
+    При симметричной подписи (HS*) ключ один - общий SECRET. Токен с
+    неизвестным kid (ключ активирован после последней синхронизации)
+    вызывает внеочередное чтение JWKS, не чаще раза в
+    auth_jwks_refresh_interval секунд.
+    """
+
+    description = "ключи подписи"
+
+    def __init__(self):
+        self.keys: dict[str, object] = {}
+        self.synced_at = float("-inf")
+        self.lock = asyncio.Lock()
+
+    @property
+    def symmetric(self) -> bool:
+        return settings.authjwt_algorithm.startswith("HS")
+
+    def get(self, token: str):
+        if self.symmetric:
+            return settings.authjwt_secret_key
+        kid = jwt.get_unverified_header(token).get("kid")
+        if kid not in self.keys:
+            raise jwt.InvalidTokenError(f"Неизвестный ключ подписи: {kid}")
+        return self.keys[kid]
+
+    async def sync(self, session: aiohttp.ClientSession) -> None:
+        async with session.get(settings.auth_url + "/jwks") as response:
+            response.raise_for_status()
+            data = await response.json()
+        self.keys = {key.key_id: key.key for key in jwt.PyJWKSet.from_dict(data).keys}
+        self.synced_at = time.monotonic()
+
+    async def ensure_key(self, token: str) -> None:
+        if self.symmetric:
+            return
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except jwt.InvalidTokenError:
+            return
+        if kid in self.keys:
+            return
+        async with self.lock:
+            since = time.monotonic() - self.synced_at
+            if kid in self.keys or since < settings.auth_jwks_refresh_interval:
+                return
+            # Неудачная попытка тоже откладывает следующую.
+            self.synced_at = time.monotonic()
+            await self.sync_once()
+
+
+signing_keys = SigningKeys()
+
+
+async def initial_sync() -> None:
+    """Первая синхронизация с auth до приема запросов."""
+    await revoked_tokens.sync_once()
+    if not signing_keys.symmetric:
+        await signing_keys.sync_once()
+
+
+def verify_token(token: str, roles: list = []) -> dict | None:
+    """
+    Локальная проверка токена. Возвращает None, если проверить его
+    на месте нельзя: список отозванных токенов еще не получен или в
+    компактном токене вместо списка ролей маска, которую знает только auth.
+    """
+    try:
+        claims = jwt.decode(
+            token, signing_keys.get(token), algorithms=[settings.authjwt_algorithm]
+        )
+    except jwt.InvalidTokenError as error:
+        raise HTTPException(status_code=HTTPStatus.UNAUTHORIZED, detail=str(error))
+    if claims.get("type") != "access":
+        raise HTTPException(
+            status_code=HTTPStatus.UNAUTHORIZED, detail="Only access tokens are allowed"
+        )
+    if not revoked_tokens.synced:
+        return None
+    if revoked_tokens.is_revoked(claims["jti"]):
+        raise HTTPException(
+            status_code=HTTPStatus.UNAUTHORIZED,
+            detail="Ранее был зарегистрирован выход из системы.",
+        )
+    if not roles:
+        return claims
+    if "roles" not in claims:
+        return None
+
+    user_roles = {role["name"] for role in claims["roles"]}
+    if settings.superrole_name in user_roles or user_roles.intersection(roles):
+        return claims
+    raise HTTPException(
+        status_code=HTTPStatus.UNAUTHORIZED,
+        detail="Данный ресурс не доступен для вашей роли.",
+    )
+
+
 async def check_auth_and_roles(request: Request, roles: list = []):
     token = request.headers.get("Authorization")
     if not token:
         raise HTTPException(
             status_code=HTTPStatus.UNAUTHORIZED, detail="Bearer token not found"
         )
+    if settings.auth_verify_mode == "local":
+        await signing_keys.ensure_key(token.removeprefix("Bearer "))
+        if verify_token(token.removeprefix("Bearer "), roles) is not None:
+            return True
+        # Роли компактного токена проверяет сам auth.
+
     timeout = aiohttp.ClientTimeout(total=20)
     async with aiohttp.ClientSession(
         headers=request.headers, timeout=timeout
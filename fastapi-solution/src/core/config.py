@@ -19,6 +19,19 @@ class Settings(BaseSettings):
     redis_port: int = Field(6379, alias="REDIS_PORT")
 
     auth_url: str = Field("http://auth:8200", alias="AUTH_URL")
+    # local - проверка токена на месте, remote - запрос в /check_auth
+    auth_verify_mode: str = Field("remote", alias="AUTH_VERIFY_MODE")
+    auth_sync_interval: int = Field(10, alias="AUTH_SYNC_INTERVAL")
+    auth_sync_timeout: int = 5
+    # Не чаще раза в столько секунд JWKS перечитывается из-за неизвестного kid
+    auth_jwks_refresh_interval: int = Field(30, alias="AUTH_JWKS_REFRESH_INTERVAL")
+    # Секрет для служебных эндпоинтов auth (X-Service-Token)
+    auth_service_token: str = Field("", alias="SERVICE_TOKEN")
+
+    authjwt_secret_key: str = Field("secret", alias="SECRET")
+    # HS256 - общий SECRET, RS256 или EdDSA - открытые ключи из JWKS auth
+    authjwt_algorithm: str = Field("HS256", alias="JWT_ALGORITHM")
+    superrole_name: str = Field("superrole", alias="SUPERROLE_NAME")
 
 
 settings = Settings()
@@ -1,3 +1,4 @@
+import asyncio
 import uvicorn
 from elasticsearch import AsyncElasticsearch
 from fastapi import FastAPI
@@ -6,6 +7,7 @@ from redis.asyncio import Redis
 from contextlib import asynccontextmanager
 
 from api.v1 import films, genres, persons
+from core.auth import initial_sync, revoked_tokens, signing_keys
 from core.config import settings
 from db import elastic, redis
 
@@ -14,7 +16,16 @@ from db import elastic, redis
 async def lifespan(app: FastAPI):
     redis.redis = Redis(host=settings.redis_host, port=settings.redis_port)
     elastic.es = AsyncElasticsearch(hosts=[f"{settings.es_host}:{settings.es_port}"])
+    tasks = []
+    if settings.auth_verify_mode == "local":
+        await initial_sync()
+        tasks.append(asyncio.create_task(revoked_tokens.run()))
+        if not signing_keys.symmetric:
+            tasks.append(asyncio.create_task(signing_keys.run()))
     yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
     await redis.redis.close()
     await elastic.es.close()
 
@@ -1,8 +1,10 @@
 import asyncio
 import json
+import jwt
 import pytest
 import pytest_asyncio
 import os
+import time
 import uuid
 
 from aiohttp import ClientSession, RequestInfo
@@ -86,12 +88,26 @@ def es_clearing(es_client: AsyncElasticsearch):
     return inner
 
 
+@pytest.fixture(scope="session")
+def access_token() -> str:
+    claims = {
+        "sub": "test",
+        "jti": str(uuid.uuid4()),
+        "type": "access",
+        "exp": int(time.time()) + 3600,
+        "uuid": str(uuid.uuid4()),
+        "roles": [],
+    }
+    return jwt.encode(claims, test_settings.auth_secret, algorithm="HS256")
+
+
 @pytest_asyncio.fixture
-def make_get_request(http_session: ClientSession):
+def make_get_request(http_session: ClientSession, access_token: str):
     async def inner(path: str, params: dict = {}) -> RequestInfo:
         api_path = "api/v1/"
         url = os.path.join(test_settings.service_url, api_path, path)
-        async with http_session.get(url, params=params) as response:
+        headers = {"Authorization": "Bearer " + access_token}
+        async with http_session.get(url, params=params, headers=headers) as response:
             body = await response.json(content_type=None)
             headers = response.headers
             status = response.status
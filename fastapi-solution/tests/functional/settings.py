@@ -26,6 +26,8 @@ class TestSettings(BaseSettings):
 
     service_url: str = Field("http://127.0.0.1:8000", alias="SERVICE_URL")
 
+    auth_secret: str = Field("secret", alias="SECRET")
+
     download_limit: int = 200
     max_tries: int = 7
     max_time: int = 25